@@ -0,0 +1,70 @@
+"""
+Graph size, graph construction time and run time of the ACER Q-retrace targets: the previous implementation (one
+set of operations per step, with batch_to_seq and seq_to_batch) against the tf.scan implementation of
+acer_simple.q_retrace.
+
+    python benchmarks/bench_acer_retrace.py --n-steps 20 50 100 --n-envs 16
+"""
+import argparse
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from stable_baselines.a2c.utils import batch_to_seq, seq_to_batch
+from stable_baselines.acer.acer_simple import q_retrace
+
+
+def q_retrace_unrolled(rewards, dones, q_i, values, rho_i, n_envs, n_steps, gamma):
+    """
+    the previous implementation of the Q-retrace targets, unrolled over the steps
+    """
+    rho_bar = batch_to_seq(tf.minimum(1.0, rho_i), n_envs, n_steps, True)
+    reward_seq = batch_to_seq(rewards, n_envs, n_steps, True)
+    done_seq = batch_to_seq(dones, n_envs, n_steps, True)
+    q_is = batch_to_seq(q_i, n_envs, n_steps, True)
+    value_sequence = batch_to_seq(values, n_envs, n_steps + 1, True)
+    qret = value_sequence[-1]
+    qrets = []
+    for i in range(n_steps - 1, -1, -1):
+        qret = reward_seq[i] + gamma * qret * (1.0 - done_seq[i])
+        qrets.append(qret)
+        qret = (rho_bar[i] * (qret - q_is[i])) + value_sequence[i]
+    return seq_to_batch(qrets[::-1], flat=True)
+
+
+def _bench(retrace_fn, n_envs, n_steps, n_runs):
+    rng = np.random.RandomState(0)
+    sizes = [n_envs * n_steps] * 3 + [n_envs * (n_steps + 1), n_envs * n_steps]
+    with tf.Graph().as_default() as graph, tf.Session() as sess:
+        start_time = time.time()
+        placeholders = [tf.placeholder(tf.float32, [size]) for size in sizes]
+        qret = retrace_fn(*placeholders, n_envs=n_envs, n_steps=n_steps, gamma=0.99)
+        build_time = time.time() - start_time
+        n_ops = len(graph.get_operations())
+        feed_dict = {placeholder: rng.rand(size) for placeholder, size in zip(placeholders, sizes)}
+        sess.run(qret, feed_dict)
+        start_time = time.time()
+        for _ in range(n_runs):
+            sess.run(qret, feed_dict)
+        run_time = (time.time() - start_time) / n_runs
+    return n_ops, build_time, run_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-steps", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--n-envs", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    print("{:>8} {:>10} {:>8} {:>12} {:>12}".format("n_steps", "impl", "ops", "build (ms)", "run (ms)"))
+    for n_steps in args.n_steps:
+        for name, retrace_fn in [("unrolled", q_retrace_unrolled), ("scan", q_retrace)]:
+            n_ops, build_time, run_time = _bench(retrace_fn, args.n_envs, n_steps, args.runs)
+            print("{:>8} {:>10} {:>8} {:>12.1f} {:>12.3f}".format(n_steps, name, n_ops, build_time * 1000,
+                                                                 run_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Training step times of ACKTR with the eigen decompositions of the K-FAC factors in the TensorFlow session (queue
+runner) or on the NumPy eigen worker thread (kfac.KfacEigenWorker, the default).
+
+The percentiles of the step times show the spikes of the steps that wait for an eigen decomposition.
+
+    python benchmarks/bench_acktr_eigen.py --env BreakoutNoFrameskip-v4 --n-envs 8 --updates 300
+"""
+import argparse
+import time
+
+import numpy as np
+
+from stable_baselines import ACKTR
+from stable_baselines.common.cmd_util import make_atari_env
+from stable_baselines.common.vec_env import VecFrameStack
+
+
+def _bench(env_id, n_envs, n_updates, kfac_eigen_worker):
+    if "NoFrameskip" in env_id:
+        env = VecFrameStack(make_atari_env(env_id, n_envs, seed=0), 4)
+        model = ACKTR("CnnPolicy", env, kfac_eigen_worker=kfac_eigen_worker)
+    else:
+        env = env_id
+        model = ACKTR("MlpPolicy", env_id, kfac_eigen_worker=kfac_eigen_worker)
+    step_times = []
+    last_time = [None]
+
+    def _callback(_locals, _globals):
+        now = time.time()
+        if last_time[0] is not None:
+            step_times.append(now - last_time[0])
+        last_time[0] = now
+
+    model.learn(total_timesteps=n_updates * model.n_envs * model.n_steps, callback=_callback)
+    if not isinstance(env, str):
+        env.close()
+    # the first updates are the cold start, without K-FAC
+    return np.array(step_times[len(step_times) // 5:]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env", default="CartPole-v1")
+    parser.add_argument("--n-envs", type=int, default=8, help="the number of environments (Atari only)")
+    parser.add_argument("--updates", type=int, default=300)
+    args = parser.parse_args()
+
+    print("{:>14} {:>10} {:>10} {:>10} {:>10}".format("eigen decomp", "mean (ms)", "p50 (ms)", "p99 (ms)",
+                                                     "max (ms)"))
+    for name, kfac_eigen_worker in [("queue runner", False), ("eigen worker", True)]:
+        step_times = _bench(args.env, args.n_envs, args.updates, kfac_eigen_worker)
+        print("{:>14} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}".format(
+            name, step_times.mean(), np.percentile(step_times, 50), np.percentile(step_times, 99), step_times.max()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Throughput of the Atari preprocessing: the chain of wrappers of make_atari and wrap_deepmind, the fused wrapper
+(AtariPreprocessing) and the preprocessing batched across the environments (VecAtariPreprocessing).
+
+The environments are stepped with random actions in the main process (DummyVecEnv), so the timings include the
+emulator, which is the same for every implementation.
+
+    python benchmarks/bench_atari_preprocessing.py --env BreakoutNoFrameskip-v4 --n-envs 1 8 --frame-stack
+"""
+import argparse
+import time
+
+import gym
+import numpy as np
+
+from stable_baselines.common.atari_wrappers import make_atari, wrap_deepmind, AtariPreprocessing, \
+    VecAtariPreprocessing
+from stable_baselines.common.vec_env import DummyVecEnv
+
+
+def _make_env(preprocessing, env_id, seed, wrapper_kwargs):
+    if preprocessing == "wrappers":
+        env = make_atari(env_id)
+        env.seed(seed)
+        return wrap_deepmind(env, **wrapper_kwargs)
+    env = gym.make(env_id)
+    env.seed(seed)
+    if preprocessing == "batched":
+        return AtariPreprocessing(env, warp_frame=False)
+    return AtariPreprocessing(env, **wrapper_kwargs)
+
+
+def _bench(preprocessing, env_id, n_envs, n_steps, wrapper_kwargs):
+    env = DummyVecEnv([lambda seed=seed: _make_env(preprocessing, env_id, seed, wrapper_kwargs)
+                       for seed in range(n_envs)])
+    if preprocessing == "batched":
+        env = VecAtariPreprocessing(env, **wrapper_kwargs)
+    rng = np.random.RandomState(0)
+    actions = rng.randint(env.action_space.n, size=(n_steps, n_envs))
+    env.reset()
+    start_time = time.time()
+    for step_actions in actions:
+        env.step(step_actions)
+    elapsed = time.time() - start_time
+    env.close()
+    return n_steps * n_envs / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env", default="BreakoutNoFrameskip-v4")
+    parser.add_argument("--n-envs", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--steps", type=int, default=2000, help="steps per environment")
+    parser.add_argument("--frame-stack", action="store_true")
+    parser.add_argument("--scale", action="store_true")
+    args = parser.parse_args()
+    wrapper_kwargs = dict(frame_stack=args.frame_stack, scale=args.scale)
+
+    print("{:>8} {:>10} {:>12} {:>10}".format("n_envs", "wrappers", "fused", "batched"))
+    for n_envs in args.n_envs:
+        throughputs = [_bench(preprocessing, args.env, n_envs, args.steps, wrapper_kwargs)
+                       for preprocessing in ("wrappers", "fused", "batched")]
+        print("{:>8} {:>10.0f} {:>12.0f} {:>10.0f}   (steps/s, fused x{:.2f}, batched x{:.2f})".format(
+            n_envs, throughputs[0], throughputs[1], throughputs[2], throughputs[1] / throughputs[0],
+            throughputs[2] / throughputs[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Scaling benchmark of the shared memory data parallel training (common.data_parallel) of PPO1 and TRPO.
+
+Every worker collects the same number of timesteps (weak scaling), so with a perfect scaling the total throughput
+grows linearly with the number of workers.
+
+    python benchmarks/bench_data_parallel.py --algo ppo1 --workers 1 2 4 8
+"""
+import argparse
+import time
+
+import numpy as np
+
+from stable_baselines import PPO1, TRPO
+from stable_baselines.common.data_parallel import launch_data_parallel
+
+ALGOS = {"ppo1": (PPO1, "timesteps_per_actorbatch"), "trpo": (TRPO, "timesteps_per_batch")}
+
+
+def _train(rank, algo, env_id, batch_size, n_iterations):
+    model_class, batch_size_name = ALGOS[algo]
+    model = model_class("MlpPolicy", env_id, **{batch_size_name: batch_size})
+    # the first iteration includes the graph warm up
+    model.learn(total_timesteps=batch_size, seed=rank)
+    start_time = time.time()
+    model.learn(total_timesteps=batch_size * n_iterations, seed=rank)
+    return time.time() - start_time, model.get_parameters_flat()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algo", choices=sorted(ALGOS.keys()), default="ppo1")
+    parser.add_argument("--env", default="CartPole-v1")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=2048, help="timesteps per worker and per iteration")
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    print("{:>8} {:>10} {:>14} {:>10} {:>10}".format("workers", "time (s)", "timesteps/s", "speedup", "in sync"))
+    base_throughput = None
+    for n_workers in args.workers:
+        results = launch_data_parallel(_train, n_workers, args=(args.algo, args.env, args.batch_size,
+                                                                args.iterations))
+        elapsed = max(elapsed for elapsed, _ in results)
+        throughput = n_workers * args.batch_size * args.iterations / elapsed
+        if base_throughput is None:
+            base_throughput = throughput / n_workers
+        in_sync = all(np.array_equal(params, results[0][1]) for _, params in results)
+        print("{:>8} {:>10.2f} {:>14.0f} {:>10.2f} {:>10}".format(n_workers, elapsed, throughput,
+                                                                 throughput / base_throughput, str(in_sync)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Import times of the parts of stable-baselines, measured with ``python -X importtime`` in a fresh interpreter for each
+import, and whether they import TensorFlow.
+
+The VecEnvs and the Monitor (what an env worker process needs) must not import TensorFlow, --check exits with an
+error if they do, so the benchmark can run in CI:
+
+    python benchmarks/bench_import_time.py --repeat 5 --check
+"""
+import argparse
+import subprocess
+import sys
+
+import numpy as np
+
+# (statement, must not import TensorFlow)
+IMPORTS = [
+    ("import stable_baselines", True),
+    ("import stable_baselines.common.vec_env", True),
+    ("from stable_baselines.common.vec_env import SubprocVecEnv", True),
+    ("from stable_baselines.bench import Monitor", True),
+    ("from stable_baselines.common import set_global_seeds", False),
+    ("from stable_baselines import PPO2", False),
+    ("import stable_baselines; _ = [getattr(stable_baselines, name) for name in "
+     "['A2C', 'ACER', 'ACKTR', 'DDPG', 'DQN', 'GAIL', 'PPO1', 'PPO2', 'TRPO']]", False),
+]
+
+
+def parse_importtime(stderr):
+    """
+    parses the output of ``python -X importtime``
+
+    :param stderr: (str) the standard error of the interpreter
+    :return: (dict) the cumulative import time of each top level module (in seconds)
+    """
+    times = {}
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # the nested imports are indented
+        if not name.startswith(" ") or name[1:2] != " ":
+            times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def _run_importtime(code):
+    """
+    runs some code in a new interpreter with ``-X importtime``
+
+    :param code: (str) the code
+    :return: (str, dict) the standard output, and the import times (see parse_importtime)
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, universal_newlines=True)
+    if process.returncode != 0:
+        raise RuntimeError("Error: '{}' failed:\n{}".format(code, process.stderr[-2000:]))
+    return process.stdout, parse_importtime(process.stderr)
+
+
+def time_import(statement, startup_modules=()):
+    """
+    runs an import statement in a new interpreter
+
+    :param statement: (str) the import statement
+    :param startup_modules: ([str]) the modules imported by the interpreter startup, not counted
+    :return: (float, bool) the total import time (in seconds) and whether TensorFlow was imported
+    """
+    stdout, times = _run_importtime(statement + "; import sys; print('tensorflow' in sys.modules)")
+    total = sum(time for name, time in times.items() if name not in startup_modules)
+    return total, stdout.strip().splitlines()[-1] == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="the number of fresh interpreters per import")
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if a part that must not import TensorFlow does")
+    args = parser.parse_args()
+
+    if sys.version_info < (3, 7):
+        raise RuntimeError("Error: python -X importtime needs python 3.7 or later")
+    _, startup_times = _run_importtime("pass")
+    failures = []
+    print("{:>10} {:>10} {:>11}  {}".format("min (ms)", "mean (ms)", "tensorflow", "import"))
+    for statement, tf_free in IMPORTS:
+        results = [time_import(statement, set(startup_times)) for _ in range(args.repeat)]
+        times = np.array([total for total, _ in results]) * 1000
+        imports_tf = any(tf_imported for _, tf_imported in results)
+        print("{:>10.1f} {:>10.1f} {:>11}  {}".format(times.min(), times.mean(), "yes" if imports_tf else "no",
+                                                     statement))
+        if tf_free and imports_tf:
+            failures.append(statement)
+
+    if failures:
+        print("\nThese imports must not import TensorFlow:\n" + "\n".join(failures))
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+ACKTR update time with the K-FAC factors decomposed and applied one by one, or batched by size
+(KfacOptimizer(batch_factors=True)), for the Atari CNN policy and a MuJoCo sized MLP policy.
+
+The ACKTR losses and optimizer are built on synthetic spaces (no environment is needed). The update runs the
+eigen decompositions in the training step (synchronous K-FAC), and the preconditioning is also timed alone.
+
+    python benchmarks/bench_kfac_batch_factors.py --policies cnn mlp --n-batch 160
+"""
+import argparse
+import time
+
+import numpy as np
+import tensorflow as tf
+from gym import spaces
+
+from stable_baselines.acktr import kfac
+from stable_baselines.common.policies import CnnPolicy, MlpPolicy
+
+POLICIES = {
+    # Atari: 84x84x4 frames, 6 actions
+    "cnn": (CnnPolicy, spaces.Box(low=0, high=255, shape=(84, 84, 4), dtype=np.uint8), spaces.Discrete(6)),
+    # MuJoCo (HalfCheetah): 17 observations, 6 actions
+    "mlp": (MlpPolicy, spaces.Box(low=-np.inf, high=np.inf, shape=(17,), dtype=np.float32),
+            spaces.Box(low=-1, high=1, shape=(6,), dtype=np.float32)),
+}
+
+
+def _bench(policy_name, batch_factors, n_batch, n_runs):
+    policy_class, ob_space, ac_space = POLICIES[policy_name]
+    with tf.Graph().as_default() as graph, tf.Session() as sess:
+        start_time = time.time()
+        model = policy_class(sess, ob_space, ac_space, 1, n_batch, n_batch, reuse=False)
+        params = tf.trainable_variables()
+        action_ph = model.pdtype.sample_placeholder([None])
+        advs_ph = tf.placeholder(tf.float32, [None])
+        rewards_ph = tf.placeholder(tf.float32, [None])
+        # the losses of ACKTR
+        neglogpac = model.proba_distribution.neglogp(action_ph)
+        train_loss = tf.reduce_mean(advs_ph * neglogpac) + \
+            0.25 * tf.reduce_mean(tf.square(tf.squeeze(model.value_fn) - rewards_ph))
+        sample_net = model.value_fn + tf.random_normal(tf.shape(model.value_fn))
+        joint_fisher = -tf.reduce_mean(neglogpac) - tf.reduce_mean(
+            tf.pow(model.value_fn - tf.stop_gradient(sample_net), 2))
+        grads = tf.gradients(train_loss, params)
+
+        optim = kfac.KfacOptimizer(learning_rate=0.25, clip_kl=0.001, momentum=0.9, kfac_update=1, epsilon=0.01,
+                                   stats_decay=0.99, cold_iter=0, verbose=0, batch_factors=batch_factors)
+        optim.compute_and_apply_stats(joint_fisher, var_list=params)
+        train_op, _ = optim.apply_gradients(list(zip(grads, params)))
+        precond_grads = optim.get_kfac_precond_updates(grads, params)
+        build_time = time.time() - start_time
+        n_eigen_ops = len([op for op in graph.get_operations() if op.type.startswith("SelfAdjointEig")])
+
+        sess.run(tf.global_variables_initializer())
+        rng = np.random.RandomState(0)
+        if isinstance(ac_space, spaces.Discrete):
+            actions = rng.randint(ac_space.n, size=n_batch)
+        else:
+            actions = rng.randn(n_batch, ac_space.shape[0])
+        feed_dict = {model.obs_ph: rng.randint(0, 255, size=(n_batch,) + ob_space.shape) if policy_name == "cnn"
+                     else rng.randn(n_batch, ob_space.shape[0]),
+                     action_ph: actions, advs_ph: rng.randn(n_batch), rewards_ph: rng.randn(n_batch)}
+        # past the cold start, with the statistics accumulated
+        for _ in range(optim._stats_accum_iter + 2):
+            sess.run(train_op, feed_dict)
+        times = []
+        for ops in [train_op, precond_grads]:
+            start_time = time.time()
+            for _ in range(n_runs):
+                sess.run(ops, feed_dict)
+            times.append((time.time() - start_time) / n_runs)
+    return build_time, n_eigen_ops, times[0], times[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--policies", nargs="+", choices=sorted(POLICIES.keys()), default=["cnn", "mlp"])
+    parser.add_argument("--n-batch", type=int, default=160, help="the batch size (n_envs * n_steps)")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    print("{:>6} {:>8} {:>10} {:>10} {:>12} {:>14}".format("policy", "batched", "build (s)", "eigen ops",
+                                                          "update (ms)", "precond (ms)"))
+    for policy_name in args.policies:
+        for batch_factors in [False, True]:
+            build_time, n_eigen_ops, update_time, precond_time = _bench(policy_name, batch_factors, args.n_batch,
+                                                                        args.runs)
+            print("{:>6} {:>8} {:>10.2f} {:>10} {:>12.2f} {:>14.2f}".format(
+                policy_name, str(batch_factors), build_time, n_eigen_ops, update_time * 1000, precond_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Graph build time, graph size and training throughput of the LSTM policies, with the LSTM unrolled over the steps
+(one cell per step) or run with tf.scan (the default).
+
+Like A2C and PPO2, each measure builds a step model (1 step) and a train model (n_steps) sharing their variables,
+and the throughput is the number of samples per second of a gradient computation on the train model.
+
+    python benchmarks/bench_lstm_policy.py --n-steps 20 50 100 --n-envs 8 --layer-norm
+"""
+import argparse
+import time
+
+import numpy as np
+import tensorflow as tf
+from gym import spaces
+
+from stable_baselines.common.policies import MlpLstmPolicy, MlpLnLstmPolicy
+
+
+def _bench(policy_class, lstm_unroll, n_envs, n_steps, n_lstm, n_runs):
+    ob_space = spaces.Box(low=-1, high=1, shape=(32,), dtype=np.float32)
+    ac_space = spaces.Discrete(4)
+    n_batch = n_envs * n_steps
+    with tf.Graph().as_default() as graph, tf.Session() as sess:
+        start_time = time.time()
+        policy_class(sess, ob_space, ac_space, n_envs, 1, n_envs, n_lstm=n_lstm, reuse=False, lstm_unroll=lstm_unroll)
+        train_model = policy_class(sess, ob_space, ac_space, n_envs, n_steps, n_batch, n_lstm=n_lstm, reuse=True,
+                                   lstm_unroll=lstm_unroll)
+        loss = tf.reduce_mean(tf.square(train_model.value_fn)) + \
+            tf.reduce_mean(train_model.proba_distribution.entropy())
+        grads = tf.gradients(loss, tf.trainable_variables())
+        build_time = time.time() - start_time
+        n_ops = len(graph.get_operations())
+        graph_size = graph.as_graph_def().ByteSize()
+
+        sess.run(tf.global_variables_initializer())
+        rng = np.random.RandomState(0)
+        feed_dict = {train_model.obs_ph: rng.rand(n_batch, 32),
+                     train_model.masks_ph: (rng.rand(n_batch) < 0.05).astype(np.float32),
+                     train_model.states_ph: np.zeros((n_envs, 2 * n_lstm))}
+        sess.run(grads, feed_dict)
+        start_time = time.time()
+        for _ in range(n_runs):
+            sess.run(grads, feed_dict)
+        throughput = n_batch * n_runs / (time.time() - start_time)
+    return build_time, n_ops, graph_size, throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-steps", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--n-envs", type=int, default=8)
+    parser.add_argument("--n-lstm", type=int, default=256)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--layer-norm", action="store_true")
+    args = parser.parse_args()
+    policy_class = MlpLnLstmPolicy if args.layer_norm else MlpLstmPolicy
+
+    print("{:>8} {:>10} {:>11} {:>8} {:>12} {:>14}".format("n_steps", "lstm", "build (s)", "ops", "graph (KB)",
+                                                         "samples/s"))
+    for n_steps in args.n_steps:
+        for name, lstm_unroll in [("unrolled", True), ("scan", False)]:
+            build_time, n_ops, graph_size, throughput = _bench(policy_class, lstm_unroll, args.n_envs, n_steps,
+                                                               args.n_lstm, args.runs)
+            print("{:>8} {:>10} {:>11.2f} {:>8} {:>12.0f} {:>14.0f}".format(n_steps, name, build_time, n_ops,
+                                                                         graph_size / 1024, throughput))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Startup time of SubprocVecEnv (creation of the workers and first reset) with the 'fork', 'forkserver' and 'spawn'
+start methods, for 8, 32 and 128 workers.
+
+--tensorflow creates a TensorFlow session in the main process first, like a training script (the forked workers
+then inherit the TensorFlow runtime).
+
+    python benchmarks/bench_subproc_startup.py --env CartPole-v1 --n-workers 8 32 128 --tensorflow
+"""
+import argparse
+import multiprocessing
+import time
+
+import gym
+
+from stable_baselines.common.vec_env import SubprocVecEnv
+
+
+def _make_env(env_id, rank):
+    def _thunk():
+        env = gym.make(env_id)
+        env.seed(rank)
+        return env
+    return _thunk
+
+
+def _bench(env_id, n_workers, start_method):
+    start_time = time.time()
+    env = SubprocVecEnv([_make_env(env_id, rank) for rank in range(n_workers)], start_method=start_method)
+    env.reset()
+    startup_time = time.time() - start_time
+    start_time = time.time()
+    env.restart_worker(n_workers - 1)
+    restart_time = time.time() - start_time
+    env.close()
+    return startup_time, restart_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env", default="CartPole-v1")
+    parser.add_argument("--n-workers", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--start-methods", nargs="+", default=multiprocessing.get_all_start_methods())
+    parser.add_argument("--tensorflow", action="store_true", help="start a TensorFlow session in the main process")
+    args = parser.parse_args()
+
+    if args.tensorflow:
+        import tensorflow as tf
+        sess = tf.Session()
+        sess.run(tf.reduce_sum(tf.random_normal((256, 256))))
+
+    print("{:>12} {:>10} {:>13} {:>13}".format("start method", "workers", "startup (s)", "restart (ms)"))
+    for n_workers in args.n_workers:
+        for start_method in args.start_methods:
+            startup_time, restart_time = _bench(args.env, n_workers, start_method)
+            print("{:>12} {:>10} {:>13.2f} {:>13.1f}".format(start_method, n_workers, startup_time,
+                                                             restart_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,24 @@
 import gym
 import numpy as np
 
-from stable_baselines.a2c import A2C
-from stable_baselines.acer import ACER
-from stable_baselines.acktr import ACKTR
-from stable_baselines.ddpg import DDPG
-from stable_baselines.deepq import DQN
-from stable_baselines.gail import GAIL
-from stable_baselines.ppo1 import PPO1
-from stable_baselines.ppo2 import PPO2
-from stable_baselines.trpo_mpi import TRPO
+from stable_baselines.common.lazy_import import lazy_module
 
 __version__ = "2.1.1"
 
+# the algorithms (and so TensorFlow) are only imported on first access, e.g. `from stable_baselines import PPO2`,
+# a process that only uses the VecEnvs or the Monitor never imports TensorFlow
+lazy_module(__name__, {
+    'A2C': 'stable_baselines.a2c',
+    'ACER': 'stable_baselines.acer',
+    'ACKTR': 'stable_baselines.acktr',
+    'DDPG': 'stable_baselines.ddpg',
+    'DQN': 'stable_baselines.deepq',
+    'GAIL': 'stable_baselines.gail',
+    'PPO1': 'stable_baselines.ppo1',
+    'PPO2': 'stable_baselines.ppo2',
+    'TRPO': 'stable_baselines.trpo_mpi',
+})
+
 
 # patch Gym spaces to add equality functions, if not implemented
 # See https://github.com/openai/gym/issues/1171
@@ -8,7 +8,7 @@ from stable_baselines import logger
 from stable_baselines.common import explained_variance, tf_util, ActorCriticRLModel, SetVerbosity, TensorboardWriter
 from stable_baselines.common.policies import LstmPolicy, ActorCriticPolicy
 from stable_baselines.common.runners import AbstractEnvRunner
-from stable_baselines.a2c.utils import discount_with_dones, Scheduler, find_trainable_variables, mse, \
+from stable_baselines.a2c.utils import discounted_returns, Scheduler, find_trainable_variables, mse, \
     total_episode_reward_logger
 
 
@@ -181,23 +181,15 @@ class A2C(ActorCriticRLModel):
             td_map[self.train_model.states_ph] = states
             td_map[self.train_model.masks_ph] = masks
 
+        run_kwargs = self.profiling.start_step()
         if writer is not None:
-            # run loss backprop with summary, but once every 10 runs save the metadata (memory, compute time, ...)
-            if (1 + update) % 10 == 0:
-                run_options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
-                run_metadata = tf.RunMetadata()
-                summary, policy_loss, value_loss, policy_entropy, _ = self.sess.run(
-                    [self.summary, self.pg_loss, self.vf_loss, self.entropy, self.apply_backprop],
-                    td_map, options=run_options, run_metadata=run_metadata)
-                writer.add_run_metadata(run_metadata, 'step%d' % (update * (self.n_batch + 1)))
-            else:
-                summary, policy_loss, value_loss, policy_entropy, _ = self.sess.run(
-                    [self.summary, self.pg_loss, self.vf_loss, self.entropy, self.apply_backprop], td_map)
+            summary, policy_loss, value_loss, policy_entropy, _ = self.sess.run(
+                [self.summary, self.pg_loss, self.vf_loss, self.entropy, self.apply_backprop], td_map, **run_kwargs)
             writer.add_summary(summary, update * (self.n_batch + 1))
-
         else:
             policy_loss, value_loss, policy_entropy, _ = self.sess.run(
-                [self.pg_loss, self.vf_loss, self.entropy, self.apply_backprop], td_map)
+                [self.pg_loss, self.vf_loss, self.entropy, self.apply_backprop], td_map, **run_kwargs)
+        self.profiling.end_step(run_kwargs, update * (self.n_batch + 1), writer)
 
         return policy_loss, value_loss, policy_entropy
 
@@ -270,6 +262,9 @@ class A2CRunner(AbstractEnvRunner):
         """
         A runner to learn the policy of an environment for an a2c model
 
+        The rollouts are written in preallocated [n_envs, n_steps, ...] arrays: the arrays returned by run() are only
+        valid until the next call.
+
         :param env: (Gym environment) The environment to learn from
         :param model: (Model) The model to learn
         :param n_steps: (int) The number of steps to run for each environment
@@ -277,6 +272,14 @@ class A2CRunner(AbstractEnvRunner):
         """
         super(A2CRunner, self).__init__(env=env, model=model, n_steps=n_steps)
         self.gamma = gamma
+        n_envs = env.num_envs
+        self.mb_obs = np.zeros((n_envs, n_steps) + self.obs.shape[1:], dtype=self.obs.dtype)
+        self.mb_rewards = np.zeros((n_envs, n_steps), dtype=np.float32)
+        self.mb_returns = np.zeros((n_envs, n_steps), dtype=np.float32)
+        self.mb_values = np.zeros((n_envs, n_steps), dtype=np.float32)
+        self.mb_dones = np.zeros((n_envs, n_steps + 1), dtype=np.bool_)
+        # the shape of the actions is only known after the first step
+        self.mb_actions = None
 
     def run(self):
         """
@@ -285,14 +288,17 @@ class A2CRunner(AbstractEnvRunner):
         :return: ([float], [float], [float], [bool], [float], [float])
                  observations, states, rewards, masks, actions, values
         """
-        mb_obs, mb_rewards, mb_actions, mb_values, mb_dones = [], [], [], [], []
         mb_states = self.states
-        for _ in range(self.n_steps):
+        for step in range(self.n_steps):
             actions, values, states, _ = self.model.step(self.obs, self.states, self.dones)
-            mb_obs.append(np.copy(self.obs))
-            mb_actions.append(actions)
-            mb_values.append(values)
-            mb_dones.append(self.dones)
+            if self.mb_actions is None:
+                # the discrete actions are integers
+                dtype = np.float32 if isinstance(self.env.action_space, gym.spaces.Box) else np.int32
+                self.mb_actions = np.zeros((self.mb_obs.shape[0], self.n_steps) + np.shape(actions)[1:], dtype=dtype)
+            self.mb_obs[:, step] = self.obs
+            self.mb_actions[:, step] = actions
+            self.mb_values[:, step] = values
+            self.mb_dones[:, step] = self.dones
             clipped_actions = actions
             # Clip the actions to avoid out of bound error
             if isinstance(self.env.action_space, gym.spaces.Box):
@@ -301,31 +307,18 @@ class A2CRunner(AbstractEnvRunner):
             self.states = states
             self.dones = dones
             self.obs = obs
-            mb_rewards.append(rewards)
-        mb_dones.append(self.dones)
-        # batch of steps to batch of rollouts
-        mb_obs = np.asarray(mb_obs, dtype=self.obs.dtype).swapaxes(1, 0).reshape(self.batch_ob_shape)
-        mb_rewards = np.asarray(mb_rewards, dtype=np.float32).swapaxes(0, 1)
-        mb_actions = np.asarray(mb_actions, dtype=np.int32).swapaxes(0, 1)
-        mb_values = np.asarray(mb_values, dtype=np.float32).swapaxes(0, 1)
-        mb_dones = np.asarray(mb_dones, dtype=np.bool).swapaxes(0, 1)
-        mb_masks = mb_dones[:, :-1]
-        mb_dones = mb_dones[:, 1:]
-        true_rewards = np.copy(mb_rewards)
-        last_values = self.model.value(self.obs, self.states, self.dones).tolist()
-        # discount/bootstrap off value fn
-        for n, (rewards, dones, value) in enumerate(zip(mb_rewards, mb_dones, last_values)):
-            rewards = rewards.tolist()
-            dones = dones.tolist()
-            if dones[-1] == 0:
-                rewards = discount_with_dones(rewards + [value], dones + [0], self.gamma)[:-1]
-            else:
-                rewards = discount_with_dones(rewards, dones, self.gamma)
-            mb_rewards[n] = rewards
+            self.mb_rewards[:, step] = rewards
+        self.mb_dones[:, -1] = self.dones
+        mb_masks = self.mb_dones[:, :-1]
+        mb_dones = self.mb_dones[:, 1:]
+        last_values = self.model.value(self.obs, self.states, self.dones)
+        # discount/bootstrap off value fn, for all the environments at once
+        discounted_returns(self.mb_rewards, mb_dones, last_values, self.gamma, out=self.mb_returns)
 
         # convert from [n_env, n_steps, ...] to [n_steps * n_env, ...]
-        mb_rewards = mb_rewards.reshape(-1, *mb_rewards.shape[2:])
-        mb_actions = mb_actions.reshape(-1, *mb_actions.shape[2:])
-        mb_values = mb_values.reshape(-1, *mb_values.shape[2:])
-        mb_masks = mb_masks.reshape(-1, *mb_masks.shape[2:])
-        return mb_obs, mb_states, mb_rewards, mb_masks, mb_actions, mb_values, true_rewards
+        mb_obs = self.mb_obs.reshape(self.batch_ob_shape)
+        mb_returns = self.mb_returns.reshape(-1)
+        mb_actions = self.mb_actions.reshape(-1, *self.mb_actions.shape[2:])
+        mb_values = self.mb_values.reshape(-1)
+        mb_masks = mb_masks.reshape(-1)
+        return mb_obs, mb_states, mb_returns, mb_masks, mb_actions, mb_values, self.mb_rewards
@@ -181,35 +181,84 @@ def seq_to_batch(tensor_sequence, flat=False):
         return tf.reshape(tf.stack(values=tensor_sequence, axis=1), [-1])
 
 
-def lstm(input_tensor, mask_tensor, cell_state_hidden, scope, n_hidden, init_scale=1.0, layer_norm=False):
+def batch_to_time_major(tensor_batch, n_batch, n_steps, flat=False):
     """
-    Creates an Long Short Term Memory (LSTM) cell for TensorFlow
+    Transform a batch of Tensors into a single time major Tensor, the equivalent of batch_to_seq for tf.scan and
+    tf.while_loop (the number of operations does not depend on n_steps)
+
+    :param tensor_batch: (TensorFlow Tensor) The input tensor to unroll
+    :param n_batch: (int) The number of batch to run (n_envs * n_steps)
+    :param n_steps: (int) The number of steps to run for each environment
+    :param flat: (bool) If the input Tensor is flat
+    :return: (TensorFlow Tensor) time major Tensor of shape [n_steps, n_batch] (flat) or [n_steps, n_batch, n_hidden]
+    """
+    if flat:
+        return tf.transpose(tf.reshape(tensor_batch, [n_batch, n_steps]), [1, 0])
+    return tf.transpose(tf.reshape(tensor_batch, [n_batch, n_steps, -1]), [1, 0, 2])
+
+
+def time_major_to_batch(tensor_sequence, flat=False):
+    """
+    Transform a time major Tensor into a batch of Tensors, the equivalent of seq_to_batch for tf.scan and
+    tf.while_loop
+
+    :param tensor_sequence: (TensorFlow Tensor) The time major tensor to batch
+    :param flat: (bool) If the input Tensor is flat
+    :return: (TensorFlow Tensor) batch of Tensors for recurrent policies
+    """
+    if flat:
+        return tf.reshape(tf.transpose(tensor_sequence, [1, 0]), [-1])
+    n_hidden = tensor_sequence.get_shape()[-1].value
+    return tf.reshape(tf.transpose(tensor_sequence, [1, 0, 2]), [-1, n_hidden])
+
+
+def _lstm_variables(scope, n_input, n_hidden, init_scale, layer_norm):
+    """
+    Creates the variables of a LSTM cell, shared by lstm and scan_lstm (the checkpoints of both are compatible)
 
-    :param input_tensor: (TensorFlow Tensor) The input tensor for the LSTM cell
-    :param mask_tensor: (TensorFlow Tensor) The mask tensor for the LSTM cell
-    :param cell_state_hidden: (TensorFlow Tensor) The state tensor for the LSTM cell
     :param scope: (str) The TensorFlow variable scope
+    :param n_input: (int) The number of inputs
     :param n_hidden: (int) The number of hidden neurons
     :param init_scale: (int) The initialization scale
     :param layer_norm: (bool) Whether to apply Layer Normalization or not
-    :return: (TensorFlow Tensor) LSTM cell
+    :return: ([TensorFlow Tensor]) the input and hidden weights, the bias, and the gains and biases of the layer
+        normalizations (None without layer normalization)
     """
-    _, n_input = [v.value for v in input_tensor[0].get_shape()]
     with tf.variable_scope(scope):
         weight_x = tf.get_variable("wx", [n_input, n_hidden * 4], initializer=ortho_init(init_scale))
         weight_h = tf.get_variable("wh", [n_hidden, n_hidden * 4], initializer=ortho_init(init_scale))
         bias = tf.get_variable("b", [n_hidden * 4], initializer=tf.constant_initializer(0.0))
+        if not layer_norm:
+            return weight_x, weight_h, bias, None, None, None, None, None, None
 
-        if layer_norm:
-            # Gain and bias of layer norm
-            gain_x = tf.get_variable("gx", [n_hidden * 4], initializer=tf.constant_initializer(1.0))
-            bias_x = tf.get_variable("bx", [n_hidden * 4], initializer=tf.constant_initializer(0.0))
+        # Gain and bias of layer norm
+        gain_x = tf.get_variable("gx", [n_hidden * 4], initializer=tf.constant_initializer(1.0))
+        bias_x = tf.get_variable("bx", [n_hidden * 4], initializer=tf.constant_initializer(0.0))
+
+        gain_h = tf.get_variable("gh", [n_hidden * 4], initializer=tf.constant_initializer(1.0))
+        bias_h = tf.get_variable("bh", [n_hidden * 4], initializer=tf.constant_initializer(0.0))
 
-            gain_h = tf.get_variable("gh", [n_hidden * 4], initializer=tf.constant_initializer(1.0))
-            bias_h = tf.get_variable("bh", [n_hidden * 4], initializer=tf.constant_initializer(0.0))
+        gain_c = tf.get_variable("gc", [n_hidden], initializer=tf.constant_initializer(1.0))
+        bias_c = tf.get_variable("bc", [n_hidden], initializer=tf.constant_initializer(0.0))
+    return weight_x, weight_h, bias, gain_x, bias_x, gain_h, bias_h, gain_c, bias_c
 
-            gain_c = tf.get_variable("gc", [n_hidden], initializer=tf.constant_initializer(1.0))
-            bias_c = tf.get_variable("bc", [n_hidden], initializer=tf.constant_initializer(0.0))
+
+def lstm(input_tensor, mask_tensor, cell_state_hidden, scope, n_hidden, init_scale=1.0, layer_norm=False):
+    """
+    Creates an Long Short Term Memory (LSTM) cell for TensorFlow
+
+    :param input_tensor: (TensorFlow Tensor) The input tensor for the LSTM cell
+    :param mask_tensor: (TensorFlow Tensor) The mask tensor for the LSTM cell
+    :param cell_state_hidden: (TensorFlow Tensor) The state tensor for the LSTM cell
+    :param scope: (str) The TensorFlow variable scope
+    :param n_hidden: (int) The number of hidden neurons
+    :param init_scale: (int) The initialization scale
+    :param layer_norm: (bool) Whether to apply Layer Normalization or not
+    :return: (TensorFlow Tensor) LSTM cell
+    """
+    _, n_input = [v.value for v in input_tensor[0].get_shape()]
+    weight_x, weight_h, bias, gain_x, bias_x, gain_h, bias_h, gain_c, bias_c = \
+        _lstm_variables(scope, n_input, n_hidden, init_scale, layer_norm)
 
     cell_state, hidden = tf.split(axis=1, num_or_size_splits=2, value=cell_state_hidden)
     for idx, (_input, mask) in enumerate(zip(input_tensor, mask_tensor)):
@@ -235,6 +284,60 @@ def lstm(input_tensor, mask_tensor, cell_state_hidden, scope, n_hidden, init_sca
     return input_tensor, cell_state_hidden
 
 
+def scan_lstm(input_tensor, mask_tensor, cell_state_hidden, scope, n_hidden, init_scale=1.0, layer_norm=False):
+    """
+    Creates a Long Short Term Memory (LSTM) cell for TensorFlow, run over the steps with tf.scan: the number of
+    operations does not depend on the number of steps, and the input projection of all the steps is a single matmul.
+    It has the same variables as lstm, and gives the same outputs.
+
+    :param input_tensor: (TensorFlow Tensor) The time major input tensor for the LSTM cell ([n_steps, n_env, n_input],
+        see batch_to_time_major)
+    :param mask_tensor: (TensorFlow Tensor) The time major mask tensor for the LSTM cell ([n_steps, n_env, 1])
+    :param cell_state_hidden: (TensorFlow Tensor) The state tensor for the LSTM cell
+    :param scope: (str) The TensorFlow variable scope
+    :param n_hidden: (int) The number of hidden neurons
+    :param init_scale: (int) The initialization scale
+    :param layer_norm: (bool) Whether to apply Layer Normalization or not
+    :return: (TensorFlow Tensor, TensorFlow Tensor) the time major hidden states ([n_steps, n_env, n_hidden]) and the
+        final state of the LSTM cell
+    """
+    n_input = input_tensor.get_shape()[-1].value
+    weight_x, weight_h, bias, gain_x, bias_x, gain_h, bias_h, gain_c, bias_c = \
+        _lstm_variables(scope, n_input, n_hidden, init_scale, layer_norm)
+
+    input_shape = tf.shape(input_tensor)
+    input_gates = tf.matmul(tf.reshape(input_tensor, [-1, n_input]), weight_x)
+    if layer_norm:
+        input_gates = _ln(input_gates, gain_x, bias_x)
+    input_gates = tf.reshape(input_gates, [input_shape[0], input_shape[1], n_hidden * 4])
+
+    def _lstm_step(carry, step_inputs):
+        cell_state, hidden = carry
+        step_input_gates, mask = step_inputs
+        cell_state = cell_state * (1 - mask)
+        hidden = hidden * (1 - mask)
+        if layer_norm:
+            gates = step_input_gates + _ln(tf.matmul(hidden, weight_h), gain_h, bias_h) + bias
+        else:
+            gates = step_input_gates + tf.matmul(hidden, weight_h) + bias
+        in_gate, forget_gate, out_gate, cell_candidate = tf.split(axis=1, num_or_size_splits=4, value=gates)
+        in_gate = tf.nn.sigmoid(in_gate)
+        forget_gate = tf.nn.sigmoid(forget_gate)
+        out_gate = tf.nn.sigmoid(out_gate)
+        cell_candidate = tf.tanh(cell_candidate)
+        cell_state = forget_gate * cell_state + in_gate * cell_candidate
+        if layer_norm:
+            hidden = out_gate * tf.tanh(_ln(cell_state, gain_c, bias_c))
+        else:
+            hidden = out_gate * tf.tanh(cell_state)
+        return cell_state, hidden
+
+    cell_state, hidden = tf.split(axis=1, num_or_size_splits=2, value=cell_state_hidden)
+    cell_states, hiddens = tf.scan(_lstm_step, (input_gates, mask_tensor), initializer=(cell_state, hidden))
+    cell_state_hidden = tf.concat(axis=1, values=[cell_states[-1], hiddens[-1]])
+    return hiddens, cell_state_hidden
+
+
 def _ln(input_tensor, gain, bias, epsilon=1e-5, axes=None):
     """
     Apply layer normalisation.
@@ -298,6 +401,28 @@ def discount_with_dones(rewards, dones, gamma):
     return discounted[::-1]
 
 
+def discounted_returns(rewards, dones, last_values, gamma, out=None):
+    """
+    The bootstrapped n-step discounted returns of several environments at once (vectorized discount_with_dones)
+
+    :param rewards: (np.ndarray) the rewards, of shape [n_envs, n_steps]
+    :param dones: (np.ndarray) whether each step ended an episode, of shape [n_envs, n_steps]
+    :param last_values: (np.ndarray) the values of the observations after the last step (used to bootstrap the
+        environments whose last step did not end an episode), of shape [n_envs]
+    :param gamma: (float) The discount value
+    :param out: (np.ndarray) the array to write the returns to (if None, a new array), can be rewards
+    :return: (np.ndarray) the discounted returns, of shape [n_envs, n_steps]
+    """
+    if out is None:
+        out = np.empty(rewards.shape, dtype=np.float32)
+    not_dones = 1.0 - np.asarray(dones, dtype=np.float32)
+    ret = np.asarray(last_values, dtype=np.float32)
+    for step in reversed(range(rewards.shape[1])):
+        ret = rewards[:, step] + gamma * ret * not_dones[:, step]
+        out[:, step] = ret
+    return out
+
+
 def find_trainable_variables(key):
     """
     Returns the trainable variables within a given scope
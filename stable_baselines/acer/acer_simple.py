@@ -5,8 +5,8 @@ import tensorflow as tf
 from gym.spaces import Discrete, Box
 
 from stable_baselines import logger
-from stable_baselines.a2c.utils import batch_to_seq, seq_to_batch, Scheduler, find_trainable_variables, EpisodeStats, \
-    get_by_index, check_shape, avg_norm, gradient_add, q_explained_variance, total_episode_reward_logger
+from stable_baselines.a2c.utils import batch_to_time_major, time_major_to_batch, Scheduler, find_trainable_variables, \
+    EpisodeStats, get_by_index, check_shape, avg_norm, gradient_add, q_explained_variance, total_episode_reward_logger
 from stable_baselines.acer.buffer import Buffer
 from stable_baselines.common import ActorCriticRLModel, tf_util, SetVerbosity, TensorboardWriter
 from stable_baselines.common.runners import AbstractEnvRunner
@@ -23,13 +23,17 @@ def strip(var, n_envs, n_steps, flat=False):
     :param flat: (bool) If the input Tensor is flat
     :return: (TensorFlow Tensor) the input tensor, without the last step in the batch
     """
-    out_vars = batch_to_seq(var, n_envs, n_steps + 1, flat)
-    return seq_to_batch(out_vars[:-1], flat)
+    # the batch is ordered by environment, then by step
+    if flat:
+        return tf.reshape(tf.reshape(var, [n_envs, n_steps + 1])[:, :-1], [-1])
+    n_hidden = var.get_shape()[-1].value
+    return tf.reshape(tf.reshape(var, [n_envs, n_steps + 1, -1])[:, :-1], [-1, n_hidden])
 
 
 def q_retrace(rewards, dones, q_i, values, rho_i, n_envs, n_steps, gamma):
     """
-    Calculates the target Q-retrace
+    Calculates the target Q-retrace, with a backward tf.scan over the steps (the number of operations does not depend
+    on n_steps). The target is not differentiated (the losses of ACER stop its gradient).
 
     :param rewards: ([TensorFlow Tensor]) The rewards
     :param dones: ([TensorFlow Tensor])
@@ -41,22 +45,26 @@ def q_retrace(rewards, dones, q_i, values, rho_i, n_envs, n_steps, gamma):
     :param gamma: (float) The discount value
     :return: ([TensorFlow Tensor]) the target Q-retrace
     """
-    rho_bar = batch_to_seq(tf.minimum(1.0, rho_i), n_envs, n_steps, True)  # list of len steps, shape [n_envs]
-    reward_seq = batch_to_seq(rewards, n_envs, n_steps, True)  # list of len steps, shape [n_envs]
-    done_seq = batch_to_seq(dones, n_envs, n_steps, True)  # list of len steps, shape [n_envs]
-    q_is = batch_to_seq(q_i, n_envs, n_steps, True)
-    value_sequence = batch_to_seq(values, n_envs, n_steps + 1, True)
+    rho_bar = batch_to_time_major(tf.minimum(1.0, rho_i), n_envs, n_steps, True)  # shape [n_steps, n_envs]
+    reward_seq = batch_to_time_major(rewards, n_envs, n_steps, True)  # shape [n_steps, n_envs]
+    done_seq = batch_to_time_major(dones, n_envs, n_steps, True)  # shape [n_steps, n_envs]
+    q_is = batch_to_time_major(q_i, n_envs, n_steps, True)
+    value_sequence = batch_to_time_major(values, n_envs, n_steps + 1, True)
     final_value = value_sequence[-1]
-    qret = final_value
-    qrets = []
-    for i in range(n_steps - 1, -1, -1):
-        check_shape([qret, done_seq[i], reward_seq[i], rho_bar[i], q_is[i], value_sequence[i]], [[n_envs]] * 6)
-        qret = reward_seq[i] + gamma * qret * (1.0 - done_seq[i])
-        qrets.append(qret)
-        qret = (rho_bar[i] * (qret - q_is[i])) + value_sequence[i]
-    qrets = qrets[::-1]
-    qret = seq_to_batch(qrets, flat=True)
-    return qret
+
+    def _retrace_step(carry, step_inputs):
+        # carry: the target of the next step and the bootstrapped value of the next step
+        _, next_value = carry
+        reward, done, rho, q_value, value = step_inputs
+        qret = reward + gamma * next_value * (1.0 - done)
+        return qret, (rho * (qret - q_value)) + value
+
+    # the steps are scanned backward (tf.reverse instead of the reverse argument of tf.scan, for older TensorFlow)
+    step_inputs = tuple(tf.reverse(tensor, axis=[0])
+                        for tensor in [reward_seq, done_seq, rho_bar, q_is, value_sequence[:-1]])
+    qrets, _ = tf.scan(_retrace_step, step_inputs, initializer=(final_value, final_value), back_prop=False)
+    check_shape([qrets], [[n_steps, n_envs]])
+    return time_major_to_batch(tf.reverse(qrets, axis=[0]), flat=True)
 
 
 class ACER(ActorCriticRLModel):
@@ -68,7 +76,8 @@ class ACER(ActorCriticRLModel):
     :param gamma: (float) The discount value
     :param n_steps: (int) The number of steps to run for each environment per update
         (i.e. batch size is n_steps * n_env where n_env is number of environment copies running in parallel)
-    :param num_procs: (int) The number of threads for TensorFlow operations
+    :param num_procs: (int) The number of threads for TensorFlow operations (at most the TensorFlow threads of the
+        thread budget, if one is set)
     :param q_coef: (float) The weight for the loss on the Q value
     :param ent_coef: (float) The weight for the entropic loss
     :param max_grad_norm: (float) The clipping value for the maximum gradient
@@ -425,20 +434,14 @@ class ACER(ActorCriticRLModel):
             td_map[self.polyak_model.states_ph] = states
             td_map[self.polyak_model.masks_ph] = masks
 
+        run_kwargs = self.profiling.start_step()
         if writer is not None:
-            # run loss backprop with summary, but once every 10 runs save the metadata (memory, compute time, ...)
-            if (1 + (steps / self.n_batch)) % 10 == 0:
-                run_options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
-                run_metadata = tf.RunMetadata()
-                step_return = self.sess.run([self.summary] + self.run_ops, td_map, options=run_options,
-                                            run_metadata=run_metadata)
-                writer.add_run_metadata(run_metadata, 'step%d' % steps)
-            else:
-                step_return = self.sess.run([self.summary] + self.run_ops, td_map)
+            step_return = self.sess.run([self.summary] + self.run_ops, td_map, **run_kwargs)
             writer.add_summary(step_return[0], steps)
             step_return = step_return[1:]
         else:
-            step_return = self.sess.run(self.run_ops, td_map)
+            step_return = self.sess.run(self.run_ops, td_map, **run_kwargs)
+        self.profiling.end_step(run_kwargs, steps, writer)
 
         return self.names_ops, step_return[1:]  # strip off _train
 
@@ -24,7 +24,8 @@ class ACKTR(ActorCriticRLModel):
     :param policy: (ActorCriticPolicy or str) The policy model to use (MlpPolicy, CnnPolicy, CnnLstmPolicy, ...)
     :param env: (Gym environment or str) The environment to learn from (if registered in Gym, can be str)
     :param gamma: (float) Discount factor
-    :param nprocs: (int) The number of threads for TensorFlow operations
+    :param nprocs: (int) The number of threads for TensorFlow operations (at most the TensorFlow threads of the
+        thread budget, if one is set)
     :param n_steps: (int) The number of steps to run for each environment
     :param ent_coef: (float) The weight for the entropic loss
     :param vf_coef: (float) The weight for the loss on the value function
@@ -37,11 +38,15 @@ class ACKTR(ActorCriticRLModel):
     :param verbose: (int) the verbosity level: 0 none, 1 training information, 2 tensorflow debug
     :param tensorboard_log: (str) the log location for tensorboard (if None, no logging)
     :param _init_setup_model: (bool) Whether or not to build the network at the creation of the instance
+    :param kfac_eigen_worker: (bool) compute the eigen decompositions of the K-FAC factors with NumPy on a background
+        thread (kfac.KfacEigenWorker), instead of in the TensorFlow session on a queue runner
+    :param kfac_batch_factors: (bool) decompose the K-FAC factors of the same size together, and precondition the
+        gradients of the same shape with batched matmuls
     """
 
     def __init__(self, policy, env, gamma=0.99, nprocs=1, n_steps=20, ent_coef=0.01, vf_coef=0.25, vf_fisher_coef=1.0,
                  learning_rate=0.25, max_grad_norm=0.5, kfac_clip=0.001, lr_schedule='linear', verbose=0,
-                 tensorboard_log=None, _init_setup_model=True):
+                 tensorboard_log=None, _init_setup_model=True, kfac_eigen_worker=True, kfac_batch_factors=False):
 
         super(ACKTR, self).__init__(policy=policy, env=env, verbose=verbose, requires_vec_env=True,
                                     _init_setup_model=_init_setup_model)
@@ -57,6 +62,8 @@ class ACKTR(ActorCriticRLModel):
         self.lr_schedule = lr_schedule
         self.nprocs = nprocs
         self.tensorboard_log = tensorboard_log
+        self.kfac_eigen_worker = kfac_eigen_worker
+        self.kfac_batch_factors = kfac_batch_factors
 
         self.graph = None
         self.sess = None
@@ -172,7 +179,9 @@ class ACKTR(ActorCriticRLModel):
                         self.optim = optim = kfac.KfacOptimizer(learning_rate=pg_lr_ph, clip_kl=self.kfac_clip,
                                                                 momentum=0.9, kfac_update=1,
                                                                 epsilon=0.01, stats_decay=0.99,
-                                                                async_eigen_decomp=True, cold_iter=10,
+                                                                async_eigen_decomp=not self.kfac_eigen_worker,
+                                                                eigen_worker=self.kfac_eigen_worker, cold_iter=10,
+                                                                batch_factors=self.kfac_batch_factors,
                                                                 max_grad_norm=self.max_grad_norm, verbose=self.verbose)
 
                         optim.compute_and_apply_stats(self.joint_fisher, var_list=params)
@@ -213,22 +222,15 @@ class ACKTR(ActorCriticRLModel):
             td_map[self.train_model.states_ph] = states
             td_map[self.train_model.masks_ph] = masks
 
+        run_kwargs = self.profiling.start_step()
         if writer is not None:
-            # run loss backprop with summary, but once every 10 runs save the metadata (memory, compute time, ...)
-            if (1 + update) % 10 == 0:
-                run_options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
-                run_metadata = tf.RunMetadata()
-                summary, policy_loss, value_loss, policy_entropy, _ = self.sess.run(
-                    [self.summary, self.pg_loss, self.vf_loss, self.entropy, self.train_op],
-                    td_map, options=run_options, run_metadata=run_metadata)
-                writer.add_run_metadata(run_metadata, 'step%d' % (update * (self.n_batch + 1)))
-            else:
-                summary, policy_loss, value_loss, policy_entropy, _ = self.sess.run(
-                    [self.summary, self.pg_loss, self.vf_loss, self.entropy, self.train_op], td_map)
+            summary, policy_loss, value_loss, policy_entropy, _ = self.sess.run(
+                [self.summary, self.pg_loss, self.vf_loss, self.entropy, self.train_op], td_map, **run_kwargs)
             writer.add_summary(summary, update * (self.n_batch + 1))
         else:
             policy_loss, value_loss, policy_entropy, _ = self.sess.run(
-                [self.pg_loss, self.vf_loss, self.entropy, self.train_op], td_map)
+                [self.pg_loss, self.vf_loss, self.entropy, self.train_op], td_map, **run_kwargs)
+        self.profiling.end_step(run_kwargs, update * (self.n_batch + 1), writer)
 
         return policy_loss, value_loss, policy_entropy
 
@@ -269,12 +271,19 @@ class ACKTR(ActorCriticRLModel):
 
             t_start = time.time()
             coord = tf.train.Coordinator()
-            enqueue_threads = self.q_runner.create_threads(self.sess, coord=coord, start=True)
+            enqueue_threads = []
+            eigen_worker = None
+            if self.q_runner is not None:
+                enqueue_threads = self.q_runner.create_threads(self.sess, coord=coord, start=True)
+            else:
+                eigen_worker = kfac.KfacEigenWorker(self.optim, self.sess)
             for update in range(1, total_timesteps // self.n_batch + 1):
                 # true_reward is the reward without discount
                 obs, states, rewards, masks, actions, values, true_reward = runner.run()
                 policy_loss, value_loss, policy_entropy = self._train_step(obs, states, rewards, masks, actions, values,
                                                                            update, writer)
+                if eigen_worker is not None:
+                    eigen_worker.step()
                 n_seconds = time.time() - t_start
                 fps = int((update * self.n_batch) / n_seconds)
 
@@ -296,10 +305,15 @@ class ACKTR(ActorCriticRLModel):
                     logger.record_tabular("policy_loss", float(policy_loss))
                     logger.record_tabular("value_loss", float(value_loss))
                     logger.record_tabular("explained_variance", float(explained_var))
+                    if eigen_worker is not None:
+                        for key, value in eigen_worker.get_stats().items():
+                            logger.record_tabular("kfac_" + key, value)
                     logger.dump_tabular()
 
             coord.request_stop()
             coord.join(enqueue_threads)
+            if eigen_worker is not None:
+                eigen_worker.close()
 
         return self
 
@@ -314,6 +328,8 @@ class ACKTR(ActorCriticRLModel):
             "max_grad_norm": self.max_grad_norm,
             "learning_rate": self.learning_rate,
             "kfac_clip": self.kfac_clip,
+            "kfac_eigen_worker": self.kfac_eigen_worker,
+            "kfac_batch_factors": self.kfac_batch_factors,
             "lr_schedule": self.lr_schedule,
             "verbose": self.verbose,
             "policy": self.policy,
@@ -1,4 +1,7 @@
 import re
+import time
+import queue
+import threading
 from functools import reduce
 
 import tensorflow as tf
@@ -15,7 +18,8 @@ class KfacOptimizer:
                  full_stats_init=False, cold_iter=100, cold_lr=None, async_eigen_decomp=False,
                  async_stats=False, epsilon=1e-2, stats_decay=0.95, blockdiag_bias=False,
                  channel_fac=False, factored_damping=False, approx_t2=False,
-                 use_float64=False, weight_decay_dict=None, max_grad_norm=0.5, verbose=1):
+                 use_float64=False, weight_decay_dict=None, max_grad_norm=0.5, verbose=1, eigen_worker=False,
+                 eigen_interval=None, batch_factors=False):
         """
         Kfac Optimizer for ACKTR models
         link: https://arxiv.org/pdf/1708.05144.pdf
@@ -28,7 +32,7 @@ class KfacOptimizer:
         :param full_stats_init: (bool) whether or not to fully initalize stats
         :param cold_iter: (int) Cold start learning rate for how many steps
         :param cold_lr: (float) Cold start learning rate
-        :param async_eigen_decomp: (bool) Use async eigen decomposition
+        :param async_eigen_decomp: (bool) Use async eigen decomposition (in the TensorFlow session, on a queue runner)
         :param async_stats: (bool) Asynchronous stats update
         :param epsilon: (float) epsilon value for small numbers
         :param stats_decay: (float) the stats decay rate
@@ -40,7 +44,15 @@ class KfacOptimizer:
         :param weight_decay_dict: (dict) custom weight decay coeff for a given gradient
         :param max_grad_norm: (float) The maximum value for the gradient clipping
         :param verbose: (int) verbosity level
+        :param eigen_worker: (bool) compute the eigen decompositions outside of the TensorFlow session, with NumPy on
+            a background thread (see KfacEigenWorker), instead of in the graph
+        :param eigen_interval: (int) the number of training steps between two snapshots of the factor statistics for
+            the eigen worker (if None, kfac_update)
+        :param batch_factors: (bool) decompose the factors of the same size with a single batched eigen decomposition,
+            and precondition the gradients of the same shape (with one factor on each side) with batched matmuls
         """
+        if eigen_worker and async_eigen_decomp:
+            raise ValueError("Error: the eigen worker and the async eigen decomposition can not be used together")
         self.max_grad_norm = max_grad_norm
         self._lr = learning_rate
         self._momentum = momentum
@@ -48,6 +60,9 @@ class KfacOptimizer:
         self._channel_fac = channel_fac
         self._kfac_update = kfac_update
         self._async_eigen_decomp = async_eigen_decomp
+        self._eigen_worker = eigen_worker
+        self._eigen_interval = eigen_interval or kfac_update
+        self._batch_factors = batch_factors
         self._async_stats = async_stats
         self._epsilon = epsilon
         self._stats_decay = stats_decay
@@ -85,6 +100,9 @@ class KfacOptimizer:
         self.param_vars = []
         self.stats = {}
         self.stats_eigen = {}
+        self.eigen_stats_list = []
+        self.eigen_placeholders = []
+        self.eigen_assign_op = None
 
     def get_factors(self, gradients, varlist):
         """
@@ -596,6 +614,20 @@ class KfacOptimizer:
             self.stats_eigen = stats_eigen
         return self.stats_eigen
 
+    def _group_stats(self, stats_vars):
+        """
+        groups the factor statistics decomposed together: by size with batch_factors, else one by one
+
+        :param stats_vars: ([TensorFlow Tensor]) the factor statistics
+        :return: ([[TensorFlow Tensor]]) the groups of statistics
+        """
+        if not self._batch_factors:
+            return [[stats_var] for stats_var in stats_vars]
+        groups = {}
+        for stats_var in stats_vars:
+            groups.setdefault(stats_var.get_shape()[1].value, []).append(stats_var)
+        return list(groups.values())
+
     def compute_stats_eigen(self):
         """
         compute the eigen decomp using copied var stats to avoid concurrent read/write from other queue
@@ -605,22 +637,24 @@ class KfacOptimizer:
         # TODO: figure out why this op has delays (possibly moving eigenvectors around?)
         with tf.device('/cpu:0'):
             stats_eigen = self.stats_eigen
-            computed_eigen = {}
             eigen_reverse_lookup = {}
             update_ops = []
             # sync copied stats
             with tf.control_dependencies([]):
-                for stats_var in stats_eigen:
-                    if stats_var not in computed_eigen:
-                        eigen_decomposition = tf.self_adjoint_eig(stats_var)
-                        eigen_values = eigen_decomposition[0]
-                        eigen_vectors = eigen_decomposition[1]
+                for group in self._group_stats(stats_eigen):
+                    if len(group) == 1:
+                        eigen_decomposition = tf.self_adjoint_eig(group[0])
+                        decompositions = [(eigen_decomposition[0], eigen_decomposition[1])]
+                    else:
+                        # a single batched decomposition for the factors of the same size
+                        eigen_decomposition = tf.self_adjoint_eig(tf.stack(group))
+                        decompositions = zip(tf.unstack(eigen_decomposition[0]), tf.unstack(eigen_decomposition[1]))
+                    for stats_var, (eigen_values, eigen_vectors) in zip(group, decompositions):
                         if self._use_float64:
                             eigen_values = tf.cast(eigen_values, tf.float64)
                             eigen_vectors = tf.cast(eigen_vectors, tf.float64)
                         update_ops.append(eigen_values)
                         update_ops.append(eigen_vectors)
-                        computed_eigen[stats_var] = {'e': eigen_values, 'Q': eigen_vectors}
                         eigen_reverse_lookup[eigen_values] = stats_eigen[stats_var]['e']
                         eigen_reverse_lookup[eigen_vectors] = stats_eigen[stats_var]['Q']
 
@@ -658,6 +692,24 @@ class KfacOptimizer:
                     0.), [tf.convert_to_tensor('updated kfac factors')]))
         return update_ops
 
+    def _setup_eigen_assign(self):
+        """
+        creates the placeholders and the operation setting all the eigen values and vectors at once, used by the
+        eigen worker (the factor step is incremented like in apply_stats_eigen)
+        """
+        self.eigen_stats_list = list(self.stats_eigen)
+        self.eigen_placeholders = []
+        assign_ops = []
+        with tf.device('/cpu:0'):
+            for stats_var in self.eigen_stats_list:
+                for key in ['e', 'Q']:
+                    eigen_var = self.stats_eigen[stats_var][key]
+                    placeholder = tf.placeholder(eigen_var.dtype.base_dtype, eigen_var.get_shape())
+                    self.eigen_placeholders.append(placeholder)
+                    assign_ops.append(tf.assign(eigen_var, placeholder, use_locking=True))
+        with tf.control_dependencies(assign_ops):
+            self.eigen_assign_op = tf.assign_add(self.factor_step, 1)
+
     def get_kfac_precond_updates(self, gradlist, varlist):
         """
         return the KFAC updates
@@ -674,141 +726,35 @@ class KfacOptimizer:
         counter = 0
 
         grad_dict = {var: grad for grad, var in zip(gradlist, varlist)}
+        # with batch_factors, the gradients preconditioned together, by shape and weight decay
+        batched_grads = {}
 
         for grad, var in zip(gradlist, varlist):
-            grad_reshape = False
-
             fprop_factored_fishers = self.stats[var]['fprop_concat_stats']
             bprop_factored_fishers = self.stats[var]['bprop_concat_stats']
 
             if (len(fprop_factored_fishers) + len(bprop_factored_fishers)) > 0:
                 counter += 1
                 grad_shape = grad.get_shape()
-                if len(grad.get_shape()) > 2:
-                    # reshape conv kernel parameters
-                    kernel_width = int(grad.get_shape()[0])
-                    kernel_height = int(grad.get_shape()[1])
-                    n_channels = int(grad.get_shape()[2])
-                    depth = int(grad.get_shape()[3])
-
-                    if len(fprop_factored_fishers) > 1 and self._channel_fac:
-                        # reshape conv kernel parameters into tensor
-                        grad = tf.reshape(grad, [kernel_width * kernel_height, n_channels, depth])
-                    else:
-                        # reshape conv kernel parameters into 2D grad
-                        grad = tf.reshape(grad, [-1, depth])
-                    grad_reshape = True
-                elif len(grad.get_shape()) == 1:
-                    # reshape bias or 1D parameters
-
-                    grad = tf.expand_dims(grad, 0)
-                    grad_reshape = True
-
-                if (self.stats[var]['assnBias'] is not None) and not self._blockdiag_bias:
-                    # use homogeneous coordinates only works for 2D grad.
-                    # TODO: figure out how to factorize bias grad
-                    # stack bias grad
-                    var_assn_bias = self.stats[var]['assnBias']
-                    grad = tf.concat(
-                        [grad, tf.expand_dims(grad_dict[var_assn_bias], 0)], 0)
-
-                # project gradient to eigen space and reshape the eigenvalues
-                # for broadcasting
-                eig_vals = []
-
-                for idx, stats in enumerate(self.stats[var]['fprop_concat_stats']):
-                    eigen_vectors = self.stats_eigen[stats]['Q']
-                    eigen_values = detect_min_val(self.stats_eigen[stats][
-                                                      'e'], var, name='act', debug=KFAC_DEBUG)
-
-                    eigen_vectors, eigen_values = factor_reshape(eigen_vectors, eigen_values,
-                                                                 grad, fac_idx=idx, f_type='act')
-                    eig_vals.append(eigen_values)
-                    grad = gmatmul(eigen_vectors, grad, transpose_a=True, reduce_dim=idx)
-
-                for idx, stats in enumerate(self.stats[var]['bprop_concat_stats']):
-                    eigen_vectors = self.stats_eigen[stats]['Q']
-                    eigen_values = detect_min_val(self.stats_eigen[stats][
-                                                      'e'], var, name='grad', debug=KFAC_DEBUG)
-
-                    eigen_vectors, eigen_values = factor_reshape(eigen_vectors, eigen_values,
-                                                                 grad, fac_idx=idx, f_type='grad')
-                    eig_vals.append(eigen_values)
-                    grad = gmatmul(grad, eigen_vectors, transpose_b=False, reduce_dim=idx)
-
-                # whiten using eigenvalues
-                weight_decay_coeff = 0.
-                if var in self._weight_decay_dict:
-                    weight_decay_coeff = self._weight_decay_dict[var]
-                    if KFAC_DEBUG:
-                        print(('weight decay coeff for %s is %f' % (var.name, weight_decay_coeff)))
-
-                if self._factored_damping:
-                    if KFAC_DEBUG:
-                        print(('use factored damping for %s' % var.name))
-                    coeffs = 1.
-                    num_factors = len(eig_vals)
-                    # compute the ratio of two trace norm of the left and right
-                    # KFac matrices, and their generalization
-                    if len(eig_vals) == 1:
-                        damping = self._epsilon + weight_decay_coeff
-                    else:
-                        damping = tf.pow(
-                            self._epsilon + weight_decay_coeff, 1. / num_factors)
-                    eig_vals_tnorm_avg = [tf.reduce_mean(
-                        tf.abs(e)) for e in eig_vals]
-                    for eigen_val, e_tnorm in zip(eig_vals, eig_vals_tnorm_avg):
-                        eig_tnorm_neg_list = [
-                            item for item in eig_vals_tnorm_avg if item != e_tnorm]
-                        if len(eig_vals) == 1:
-                            adjustment = 1.
-                        elif len(eig_vals) == 2:
-                            adjustment = tf.sqrt(
-                                e_tnorm / eig_tnorm_neg_list[0])
-                        else:
-                            eig_tnorm_neg_list_prod = reduce(
-                                lambda x, y: x * y, eig_tnorm_neg_list)
-                            adjustment = tf.pow(
-                                tf.pow(e_tnorm, num_factors - 1.) / eig_tnorm_neg_list_prod, 1. / num_factors)
-                        coeffs *= (eigen_val + adjustment * damping)
+                grad = self._reshape_precond_grad(grad, var, grad_dict)
+
+                if self._batch_factors and len(grad.get_shape()) == 2 and len(fprop_factored_fishers) == 1 and \
+                        len(bprop_factored_fishers) == 1 and not self._factored_damping:
+                    key = (tuple(grad.get_shape().as_list()), self._weight_decay_dict.get(var, 0.))
+                    batched_grads.setdefault(key, []).append((grad, var, grad_shape))
                 else:
-                    coeffs = 1.
-                    damping = (self._epsilon + weight_decay_coeff)
-                    for eigen_val in eig_vals:
-                        coeffs *= eigen_val
-                    coeffs += damping
-
-                grad /= coeffs
-
-                # project gradient back to euclidean space
-                for idx, stats in enumerate(self.stats[var]['fprop_concat_stats']):
-                    eigen_vectors = self.stats_eigen[stats]['Q']
-                    grad = gmatmul(eigen_vectors, grad, transpose_a=False, reduce_dim=idx)
-
-                for idx, stats in enumerate(self.stats[var]['bprop_concat_stats']):
-                    eigen_vectors = self.stats_eigen[stats]['Q']
-                    grad = gmatmul(grad, eigen_vectors, transpose_b=True, reduce_dim=idx)
-
-                if (self.stats[var]['assnBias'] is not None) and not self._blockdiag_bias:
-                    # use homogeneous coordinates only works for 2D grad.
-                    # TODO: figure out how to factorize bias grad
-                    # un-stack bias grad
-                    var_assn_bias = self.stats[var]['assnBias']
-                    c_plus_one = int(grad.get_shape()[0])
-                    grad_assn_bias = tf.reshape(tf.slice(grad,
-                                                         begin=[
-                                                             c_plus_one - 1, 0],
-                                                         size=[1, -1]), var_assn_bias.get_shape())
-                    grad_assn_weights = tf.slice(grad,
-                                                 begin=[0, 0],
-                                                 size=[c_plus_one - 1, -1])
-                    grad_dict[var_assn_bias] = grad_assn_bias
-                    grad = grad_assn_weights
-
-                if grad_reshape:
-                    grad = tf.reshape(grad, grad_shape)
-
-                grad_dict[var] = grad
+                    grad = self._precondition_grad(grad, var)
+                    self._set_precond_grad(grad, var, grad_shape, grad_dict)
+
+        for (_, weight_decay_coeff), group in batched_grads.items():
+            if len(group) == 1:
+                grad, var, _ = group[0]
+                precond_grads = [self._precondition_grad(grad, var)]
+            else:
+                precond_grads = self._precondition_grads_batched([grad for grad, _, _ in group],
+                                                                 [var for _, var, _ in group], weight_decay_coeff)
+            for (_, var, grad_shape), grad in zip(group, precond_grads):
+                self._set_precond_grad(grad, var, grad_shape, grad_dict)
 
         if self.verbose >= 1:
             print(('projecting %d gradient matrices' % counter))
@@ -837,6 +783,187 @@ class KfacOptimizer:
 
         return updatelist
 
+    def _reshape_precond_grad(self, grad, var, grad_dict):
+        """
+        reshapes a gradient to the 2D (or 3D with channel_fac) layout of its factors, with its bias in homogeneous
+        coordinates
+
+        :param grad: (TensorFlow Tensor) the gradient
+        :param var: (TensorFlow Tensor) the parameter
+        :param grad_dict: (dict) the gradients of the parameters
+        :return: (TensorFlow Tensor) the reshaped gradient
+        """
+        if len(grad.get_shape()) > 2:
+            # reshape conv kernel parameters
+            kernel_width = int(grad.get_shape()[0])
+            kernel_height = int(grad.get_shape()[1])
+            n_channels = int(grad.get_shape()[2])
+            depth = int(grad.get_shape()[3])
+
+            if len(self.stats[var]['fprop_concat_stats']) > 1 and self._channel_fac:
+                # reshape conv kernel parameters into tensor
+                grad = tf.reshape(grad, [kernel_width * kernel_height, n_channels, depth])
+            else:
+                # reshape conv kernel parameters into 2D grad
+                grad = tf.reshape(grad, [-1, depth])
+        elif len(grad.get_shape()) == 1:
+            # reshape bias or 1D parameters
+
+            grad = tf.expand_dims(grad, 0)
+
+        if (self.stats[var]['assnBias'] is not None) and not self._blockdiag_bias:
+            # use homogeneous coordinates only works for 2D grad.
+            # TODO: figure out how to factorize bias grad
+            # stack bias grad
+            var_assn_bias = self.stats[var]['assnBias']
+            grad = tf.concat(
+                [grad, tf.expand_dims(grad_dict[var_assn_bias], 0)], 0)
+        return grad
+
+    def _precondition_grad(self, grad, var):
+        """
+        preconditions a reshaped gradient with the eigen decompositions of its factors
+
+        :param grad: (TensorFlow Tensor) the reshaped gradient
+        :param var: (TensorFlow Tensor) the parameter
+        :return: (TensorFlow Tensor) the preconditioned gradient
+        """
+        # project gradient to eigen space and reshape the eigenvalues
+        # for broadcasting
+        eig_vals = []
+
+        for idx, stats in enumerate(self.stats[var]['fprop_concat_stats']):
+            eigen_vectors = self.stats_eigen[stats]['Q']
+            eigen_values = detect_min_val(self.stats_eigen[stats][
+                                              'e'], var, name='act', debug=KFAC_DEBUG)
+
+            eigen_vectors, eigen_values = factor_reshape(eigen_vectors, eigen_values,
+                                                         grad, fac_idx=idx, f_type='act')
+            eig_vals.append(eigen_values)
+            grad = gmatmul(eigen_vectors, grad, transpose_a=True, reduce_dim=idx)
+
+        for idx, stats in enumerate(self.stats[var]['bprop_concat_stats']):
+            eigen_vectors = self.stats_eigen[stats]['Q']
+            eigen_values = detect_min_val(self.stats_eigen[stats][
+                                              'e'], var, name='grad', debug=KFAC_DEBUG)
+
+            eigen_vectors, eigen_values = factor_reshape(eigen_vectors, eigen_values,
+                                                         grad, fac_idx=idx, f_type='grad')
+            eig_vals.append(eigen_values)
+            grad = gmatmul(grad, eigen_vectors, transpose_b=False, reduce_dim=idx)
+
+        # whiten using eigenvalues
+        weight_decay_coeff = 0.
+        if var in self._weight_decay_dict:
+            weight_decay_coeff = self._weight_decay_dict[var]
+            if KFAC_DEBUG:
+                print(('weight decay coeff for %s is %f' % (var.name, weight_decay_coeff)))
+
+        if self._factored_damping:
+            if KFAC_DEBUG:
+                print(('use factored damping for %s' % var.name))
+            coeffs = 1.
+            num_factors = len(eig_vals)
+            # compute the ratio of two trace norm of the left and right
+            # KFac matrices, and their generalization
+            if len(eig_vals) == 1:
+                damping = self._epsilon + weight_decay_coeff
+            else:
+                damping = tf.pow(
+                    self._epsilon + weight_decay_coeff, 1. / num_factors)
+            eig_vals_tnorm_avg = [tf.reduce_mean(
+                tf.abs(e)) for e in eig_vals]
+            for eigen_val, e_tnorm in zip(eig_vals, eig_vals_tnorm_avg):
+                eig_tnorm_neg_list = [
+                    item for item in eig_vals_tnorm_avg if item != e_tnorm]
+                if len(eig_vals) == 1:
+                    adjustment = 1.
+                elif len(eig_vals) == 2:
+                    adjustment = tf.sqrt(
+                        e_tnorm / eig_tnorm_neg_list[0])
+                else:
+                    eig_tnorm_neg_list_prod = reduce(
+                        lambda x, y: x * y, eig_tnorm_neg_list)
+                    adjustment = tf.pow(
+                        tf.pow(e_tnorm, num_factors - 1.) / eig_tnorm_neg_list_prod, 1. / num_factors)
+                coeffs *= (eigen_val + adjustment * damping)
+        else:
+            coeffs = 1.
+            damping = (self._epsilon + weight_decay_coeff)
+            for eigen_val in eig_vals:
+                coeffs *= eigen_val
+            coeffs += damping
+
+        grad /= coeffs
+
+        # project gradient back to euclidean space
+        for idx, stats in enumerate(self.stats[var]['fprop_concat_stats']):
+            eigen_vectors = self.stats_eigen[stats]['Q']
+            grad = gmatmul(eigen_vectors, grad, transpose_a=False, reduce_dim=idx)
+
+        for idx, stats in enumerate(self.stats[var]['bprop_concat_stats']):
+            eigen_vectors = self.stats_eigen[stats]['Q']
+            grad = gmatmul(grad, eigen_vectors, transpose_b=True, reduce_dim=idx)
+        return grad
+
+    def _precondition_grads_batched(self, grads, variables, weight_decay_coeff):
+        """
+        preconditions 2D gradients of the same shape, with one factor on each side, with batched matmuls
+        (the same operations as _precondition_grad without factored damping)
+
+        :param grads: ([TensorFlow Tensor]) the reshaped gradients
+        :param variables: ([TensorFlow Tensor]) the parameters
+        :param weight_decay_coeff: (float) the weight decay of the parameters
+        :return: ([TensorFlow Tensor]) the preconditioned gradients
+        """
+        act_stats = [self.stats[var]['fprop_concat_stats'][0] for var in variables]
+        grad_stats = [self.stats[var]['bprop_concat_stats'][0] for var in variables]
+        act_vectors = tf.stack([self.stats_eigen[stats]['Q'] for stats in act_stats])
+        act_values = tf.stack([detect_min_val(self.stats_eigen[stats]['e'], var, name='act', debug=KFAC_DEBUG)
+                               for stats, var in zip(act_stats, variables)])
+        grad_vectors = tf.stack([self.stats_eigen[stats]['Q'] for stats in grad_stats])
+        grad_values = tf.stack([detect_min_val(self.stats_eigen[stats]['e'], var, name='grad', debug=KFAC_DEBUG)
+                                for stats, var in zip(grad_stats, variables)])
+
+        # project gradient to eigen space
+        grads = tf.matmul(tf.matmul(act_vectors, tf.stack(grads), transpose_a=True), grad_vectors)
+        # whiten using eigenvalues
+        grads /= tf.expand_dims(act_values, 2) * tf.expand_dims(grad_values, 1) + (self._epsilon + weight_decay_coeff)
+        # project gradient back to euclidean space
+        grads = tf.matmul(tf.matmul(act_vectors, grads), grad_vectors, transpose_b=True)
+        return tf.unstack(grads)
+
+    def _set_precond_grad(self, grad, var, grad_shape, grad_dict):
+        """
+        splits the bias from a preconditioned gradient, reshapes it to the shape of its parameter and sets it in the
+        gradients of the parameters
+
+        :param grad: (TensorFlow Tensor) the preconditioned gradient
+        :param var: (TensorFlow Tensor) the parameter
+        :param grad_shape: (TensorShape) the shape of the gradient of the parameter
+        :param grad_dict: (dict) the gradients of the parameters
+        """
+        if (self.stats[var]['assnBias'] is not None) and not self._blockdiag_bias:
+            # use homogeneous coordinates only works for 2D grad.
+            # TODO: figure out how to factorize bias grad
+            # un-stack bias grad
+            var_assn_bias = self.stats[var]['assnBias']
+            c_plus_one = int(grad.get_shape()[0])
+            grad_assn_bias = tf.reshape(tf.slice(grad,
+                                                 begin=[
+                                                     c_plus_one - 1, 0],
+                                                 size=[1, -1]), var_assn_bias.get_shape())
+            grad_assn_weights = tf.slice(grad,
+                                         begin=[0, 0],
+                                         size=[c_plus_one - 1, -1])
+            grad_dict[var_assn_bias] = grad_assn_bias
+            grad = grad_assn_weights
+
+        if len(grad_shape) != 2:
+            grad = tf.reshape(grad, grad_shape)
+
+        grad_dict[var] = grad
+
     @classmethod
     def compute_gradients(cls, loss, var_list=None):
         """
@@ -858,7 +985,8 @@ class KfacOptimizer:
         apply the kfac gradient
 
         :param grads: ([TensorFlow Tensor]) the gradient
-        :return: ([function], QueueRunner) Update functions, queue operation runner
+        :return: ([function], QueueRunner) Update functions, queue operation runner (None without the async eigen
+            decomposition)
         """
         grad, varlist = list(zip(*grads))
 
@@ -885,6 +1013,8 @@ class KfacOptimizer:
                 return queue.dequeue()
 
             queue_runner = tf.train.QueueRunner(queue, [enqueue_op])
+        elif self._eigen_worker:
+            self._setup_eigen_assign()
 
         update_ops = []
         global_step_op = tf.assign_add(self.global_step, 1)
@@ -896,14 +1026,18 @@ class KfacOptimizer:
             assert self._update_stats_op is not None
             update_ops.append(self._update_stats_op)
             dependency_list = []
-            if not self._async_eigen_decomp:
+            if not self._async_eigen_decomp and not self._eigen_worker:
                 dependency_list.append(self._update_stats_op)
 
             with tf.control_dependencies(dependency_list):
                 def no_op_wrapper():
                     return tf.group(*[tf.assign_add(self.cold_step, 1)])
 
-                if not self._async_eigen_decomp:
+                if self._eigen_worker:
+                    # the eigen worker sets the eigen values and vectors between the training steps
+                    update_factor_ops = tf.cond(tf.greater_equal(self.stats_step, self._stats_accum_iter),
+                                                tf.no_op, no_op_wrapper)
+                elif not self._async_eigen_decomp:
                     # synchronous eigen-decomp updates
                     update_factor_ops = tf.cond(tf.logical_and(tf.equal(tf.mod(self.stats_step, self._kfac_update),
                                                                         tf.convert_to_tensor(0)),
@@ -1004,3 +1138,158 @@ class KfacOptimizer:
         grads = self.compute_gradients(loss, var_list=var_list)
         self.compute_and_apply_stats(loss_sampled, var_list=var_list)
         return self.apply_gradients(grads)
+
+
+class KfacEigenWorker(object):
+    def __init__(self, optimizer, sess):
+        """
+        Computes the eigen decompositions of the K-FAC factors with NumPy (LAPACK) on a background thread, off the
+        critical path of the training steps, for a KfacOptimizer created with eigen_worker=True.
+
+        step() is called after every training step: every eigen_interval steps (once the statistics are accumulated),
+        the factor statistics are snapshotted and handed to the thread, and a finished set of decompositions is
+        swapped in as a whole between two training steps. Only one snapshot is decomposed at a time: the snapshots
+        due while the thread is busy are skipped. A decomposition that fails (e.g. non finite statistics) is raised by
+        the next call to step() or sync(), the thread keeps running.
+
+        :param optimizer: (KfacOptimizer) the optimizer, after apply_gradients
+        :param sess: (TensorFlow Session) the session of the optimizer
+        """
+        if optimizer.eigen_assign_op is None:
+            raise ValueError("Error: the K-FAC optimizer was not created with eigen_worker=True, or apply_gradients "
+                             "was not called")
+        self.optimizer = optimizer
+        self.sess = sess
+        self.interval = optimizer._eigen_interval
+        self._dtypes = [placeholder.dtype.as_numpy_dtype for placeholder in optimizer.eigen_placeholders]
+        # the indices of the statistics decomposed together (by size with batch_factors)
+        stats_indices = {stats_var: idx for idx, stats_var in enumerate(optimizer.eigen_stats_list)}
+        self._groups = [[stats_indices[stats_var] for stats_var in group]
+                        for group in optimizer._group_stats(optimizer.eigen_stats_list)]
+        self._requests = queue.Queue(maxsize=1)
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._done.set()
+        # the last finished decompositions, waiting to be swapped in: (eigen values and vectors, snapshot step, time)
+        self._ready = None
+        # the error of the last failed decomposition, raised by step() or sync()
+        self._error = None
+        self.n_steps = 0
+        self.n_updates = 0
+        self.n_skipped = 0
+        self.last_latency = None
+        self.last_staleness = None
+        self.total_latency = 0.
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """
+        the loop of the background thread
+        """
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            snapshot_step, stats = request
+            try:
+                start_time = time.time()
+                eigen_list = self._decompose(stats)
+                with self._lock:
+                    self._ready = (eigen_list, snapshot_step, time.time() - start_time)
+            except Exception as error:  # pylint: disable=broad-except
+                with self._lock:
+                    self._error = error
+            finally:
+                self._done.set()
+
+    def _decompose(self, stats):
+        """
+        computes the eigen decompositions of the factor statistics
+
+        :param stats: ([np.ndarray]) the factor statistics
+        :return: ([np.ndarray]) the eigen values and eigen vectors of each statistic, cast for the eigen placeholders
+        """
+        eigen_list = [None] * (2 * len(stats))
+        for group in self._groups:
+            group_stats = np.stack([stats[idx] for idx in group])
+            if not np.all(np.isfinite(group_stats)):
+                raise ValueError("Error: the K-FAC factor statistics are not finite")
+            # numpy releases the GIL in LAPACK, the training steps keep running meanwhile
+            eigen_values, eigen_vectors = np.linalg.eigh(group_stats)
+            for i, idx in enumerate(group):
+                eigen_list[2 * idx] = eigen_values[i]
+                eigen_list[2 * idx + 1] = eigen_vectors[i]
+        return [array.astype(dtype, copy=False) for array, dtype in zip(eigen_list, self._dtypes)]
+
+    def _raise_error(self):
+        """
+        raises the error of the last failed decomposition, if any
+        """
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError("Error: the eigen decomposition of the K-FAC factors failed: {}".format(error)) \
+                from error
+
+    def _swap(self):
+        """
+        sets the finished decompositions (if any) in the eigen variables of the optimizer
+        """
+        with self._lock:
+            ready, self._ready = self._ready, None
+        if ready is None:
+            return
+        eigen_list, snapshot_step, latency = ready
+        self.sess.run(self.optimizer.eigen_assign_op, dict(zip(self.optimizer.eigen_placeholders, eigen_list)))
+        self.n_updates += 1
+        self.last_latency = latency
+        self.total_latency += latency
+        # the number of training steps since the snapshot of the statistics
+        self.last_staleness = self.n_steps - snapshot_step
+
+    def step(self):
+        """
+        to call after every training step: swaps in the finished decompositions, and snapshots the factor
+        statistics when due
+        """
+        self.n_steps += 1
+        self._raise_error()
+        self._swap()
+        if self.n_steps % self.interval != 0:
+            return
+        if not self._done.is_set():
+            self.n_skipped += 1
+            return
+        if self.sess.run(self.optimizer.stats_step) < self.optimizer._stats_accum_iter:
+            return
+        stats = self.sess.run(self.optimizer.eigen_stats_list)
+        self._done.clear()
+        self._requests.put((self.n_steps, stats))
+
+    def sync(self):
+        """
+        waits for the decompositions in progress, and swaps them in
+        """
+        self._done.wait()
+        self._raise_error()
+        self._swap()
+
+    def get_stats(self):
+        """
+        :return: (dict) the number of eigen updates and of skipped snapshots, the latency of the last decomposition
+            (in seconds), the mean latency, and the staleness of the current eigen basis (in training steps); the
+            latency and the staleness are NaN before the first eigen update
+        """
+        # numeric values only, the logger output formats (e.g. tensorboard) need floats
+        last_latency = np.nan if self.last_latency is None else self.last_latency
+        last_staleness = np.nan if self.last_staleness is None else self.last_staleness
+        return dict(eigen_updates=self.n_updates, eigen_skipped=self.n_skipped, eigen_latency=last_latency,
+                    eigen_mean_latency=self.total_latency / max(self.n_updates, 1), eigen_staleness=last_staleness)
+
+    def close(self):
+        """
+        stops the background thread
+        """
+        self._requests.put(None)
+        self._thread.join()
@@ -9,7 +9,6 @@ from glob import glob
 
 import gym
 from gym.core import Wrapper
-import pandas
 
 
 class Monitor(Wrapper):
@@ -167,6 +166,9 @@ def load_results(path):
     :param path: (str) the path to the log file
     :return: (Pandas DataFrame) the logged data
     """
+    # pandas is only imported here, the env workers wrapped in a Monitor do not need it
+    import pandas
+
     # get both csv and (old) json files
     monitor_files = (glob(os.path.join(path, "*monitor.json")) + glob(os.path.join(path, "*monitor.csv")))
     if not monitor_files:
@@ -206,6 +208,8 @@ def test_monitor():
     """
     test the monitor wrapper
     """
+    import pandas
+
     env = gym.make("CartPole-v1")
     env.seed(0)
     mon_file = "/tmp/stable_baselines-test-%s.monitor.csv" % uuid.uuid4()
@@ -1,9 +1,18 @@
 # flake8: noqa F403
-from stable_baselines.common.console_util import fmt_row, fmt_item, colorize
-from stable_baselines.common.dataset import Dataset
-from stable_baselines.common.math_util import discount, discount_with_boundaries, explained_variance, \
-    explained_variance_2d, flatten_arrays, unflatten_vector
-from stable_baselines.common.misc_util import zipsame, unpack, EzPickle, set_global_seeds, pretty_eta, RunningAvg,\
-    boolean_flag, get_wrapper_by_name, relatively_safe_pickle_dump, pickle_load
-from stable_baselines.common.base_class import BaseRLModel, ActorCriticRLModel, OffPolicyRLModel, SetVerbosity, \
-    TensorboardWriter
+from stable_baselines.common.lazy_import import lazy_module
+
+# imported on first access: misc_util, base_class (TensorFlow) and math_util (scipy) are not needed by the VecEnvs
+lazy_module(__name__, dict(
+    [(name, 'stable_baselines.common.console_util') for name in ['fmt_row', 'fmt_item', 'colorize']] +
+    [(name, 'stable_baselines.common.dataset') for name in ['Dataset']] +
+    [(name, 'stable_baselines.common.math_util') for name in ['discount', 'discount_with_boundaries',
+                                                               'explained_variance', 'explained_variance_2d',
+                                                               'flatten_arrays', 'unflatten_vector']] +
+    [(name, 'stable_baselines.common.misc_util') for name in ['zipsame', 'unpack', 'EzPickle', 'set_global_seeds',
+                                                               'pretty_eta', 'RunningAvg', 'boolean_flag',
+                                                               'get_wrapper_by_name', 'relatively_safe_pickle_dump',
+                                                               'pickle_load']] +
+    [(name, 'stable_baselines.common.base_class') for name in ['BaseRLModel', 'ActorCriticRLModel',
+                                                                'OffPolicyRLModel', 'SetVerbosity',
+                                                                'TensorboardWriter']]
+))
@@ -4,6 +4,9 @@ import numpy as np
 import gym
 from gym import spaces
 import cv2
+
+from stable_baselines.common.vec_env import VecEnvWrapper
+
 cv2.ocl.setUseOpenCL(False)
 
 
@@ -274,6 +277,234 @@ class LazyFrames(object):
         return self._force()[i]
 
 
+class _NoopMaxAndSkipEnv(gym.Wrapper):
+    def __init__(self, env, noop_max=30, skip=4):
+        """
+        NoopResetEnv and MaxAndSkipEnv in a single wrapper, with a preallocated max-pooled frame.
+        The returned frames are only valid until the next step.
+
+        :param env: (Gym Environment) the atari environment (without frame skipping)
+        :param noop_max: (int) the maximum value of no-ops to run at reset
+        :param skip: (int) number of `skip`-th frame
+        """
+        gym.Wrapper.__init__(self, env)
+        assert env.unwrapped.get_action_meanings()[0] == 'NOOP'
+        self.noop_max = noop_max
+        self.override_num_noops = None
+        self._skip = skip
+        self._obs_buffer = np.zeros((2,) + env.observation_space.shape, dtype=env.observation_space.dtype)
+        self._max_frame = np.zeros(env.observation_space.shape, dtype=env.observation_space.dtype)
+
+    def reset(self, **kwargs):
+        self.env.reset(**kwargs)
+        if self.override_num_noops is not None:
+            noops = self.override_num_noops
+        else:
+            noops = self.unwrapped.np_random.randint(1, self.noop_max + 1)
+        assert noops > 0
+        obs = None
+        for _ in range(noops):
+            obs, _, done, _ = self.env.step(0)
+            if done:
+                obs = self.env.reset(**kwargs)
+        return obs
+
+    def step(self, action):
+        total_reward = 0.0
+        done = None
+        info = None
+        for i in range(self._skip):
+            obs, reward, done, info = self.env.step(action)
+            if i >= self._skip - 2:
+                self._obs_buffer[i - self._skip + 2] = obs
+            total_reward += reward
+            if done:
+                break
+        # like MaxAndSkipEnv, the frames of the previous step are used if the episode ended early
+        np.maximum(self._obs_buffer[0], self._obs_buffer[1], out=self._max_frame)
+        return self._max_frame, total_reward, done, info
+
+
+class AtariPreprocessing(gym.Wrapper):
+    def __init__(self, env, noop_max=30, frame_skip=4, episode_life=True, clip_rewards=True, frame_stack=False,
+                 scale=False, warp_frame=True, monitor_kwargs=None):
+        """
+        The preprocessing of make_atari and wrap_deepmind in a single wrapper (no-op reset, frame skipping with max
+        pooling, episodic life, fire reset, grayscale and resize to 84x84, scaling, reward clipping and frame
+        stacking), with preallocated buffers for the intermediate frames.
+        The observations and rewards are the same as with wrap_deepmind(make_atari(env_id)).
+
+        :param env: (Gym Environment) the atari environment (NoFrameskip)
+        :param noop_max: (int) the maximum value of no-ops to run at reset
+        :param frame_skip: (int) number of `skip`-th frame
+        :param episode_life: (bool) make end-of-life == end-of-episode
+        :param clip_rewards: (bool) clip the rewards to {+1, 0, -1} by their sign
+        :param frame_stack: (bool) stack the 4 last frames (LazyFrames)
+        :param scale: (bool) scale the observations to [0, 1]
+        :param warp_frame: (bool) warp the frames to 84x84 grayscale, if False the observations are the max pooled
+            RGB frames and the rewards are not clipped (to warp, clip and stack the frames of all the environments at
+            once with VecAtariPreprocessing, see cmd_util.make_atari_env)
+        :param monitor_kwargs: (dict) if not None, the arguments of a bench.Monitor placed after the frame skipping,
+            like in cmd_util.make_atari_env
+        """
+        inner_env = _NoopMaxAndSkipEnv(env, noop_max=noop_max, skip=frame_skip)
+        if monitor_kwargs is not None:
+            from stable_baselines.bench import Monitor
+            inner_env = Monitor(inner_env, **monitor_kwargs)
+        gym.Wrapper.__init__(self, inner_env)
+        self.episode_life = episode_life
+        self.fire_reset = 'FIRE' in env.unwrapped.get_action_meanings()
+        if self.fire_reset:
+            assert env.unwrapped.get_action_meanings()[1] == 'FIRE'
+            assert len(env.unwrapped.get_action_meanings()) >= 3
+        self.warp_frame = warp_frame
+        self.clip_rewards = clip_rewards and warp_frame
+        self.scale = scale and warp_frame
+        self.n_frames = 4 if frame_stack and warp_frame else 1
+        self.frames = deque([], maxlen=self.n_frames)
+        self.lives = 0
+        self.was_real_done = True
+        self.width = 84
+        self.height = 84
+        self._gray = np.zeros(env.observation_space.shape[:2], dtype=env.observation_space.dtype)
+
+        if not warp_frame:
+            self.observation_space = env.observation_space
+        elif self.scale:
+            # same spaces as ScaledFloatFrame and FrameStack
+            self.observation_space = spaces.Box(low=0, high=1.0 if self.n_frames == 1 else 255,
+                                                shape=(self.height, self.width, self.n_frames), dtype=np.float32)
+        else:
+            self.observation_space = spaces.Box(low=0, high=255, shape=(self.height, self.width, self.n_frames),
+                                                dtype=env.observation_space.dtype)
+
+    def _life_reset(self, **kwargs):
+        if not self.episode_life or self.was_real_done:
+            obs = self.env.reset(**kwargs)
+        else:
+            # no-op step to advance from terminal/lost life state
+            obs, _, _, _ = self.env.step(0)
+        self.lives = self.unwrapped.ale.lives()
+        return obs
+
+    def _life_step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        if self.episode_life:
+            self.was_real_done = done
+            lives = self.unwrapped.ale.lives()
+            if 0 < lives < self.lives:
+                done = True
+            self.lives = lives
+        return obs, reward, done, info
+
+    def _warp(self, frame):
+        """
+        returns the observed frame (a new array, as the frames can be shared by several LazyFrames)
+
+        :param frame: (np.ndarray) the max pooled RGB frame
+        :return: (np.ndarray) the observed frame
+        """
+        if not self.warp_frame:
+            return frame.copy()
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY, dst=self._gray)
+        frame = cv2.resize(gray, (self.width, self.height), interpolation=cv2.INTER_AREA)[:, :, None]
+        if self.scale:
+            frame = frame.astype(np.float32) / 255.0
+        return frame
+
+    def _get_ob(self):
+        if self.n_frames == 1:
+            return self.frames[-1]
+        return LazyFrames(list(self.frames))
+
+    def reset(self, **kwargs):
+        obs = self._life_reset(**kwargs)
+        if self.fire_reset:
+            obs, _, done, _ = self._life_step(1)
+            if done:
+                self._life_reset(**kwargs)
+            obs, _, done, _ = self._life_step(2)
+            if done:
+                self._life_reset(**kwargs)
+        frame = self._warp(obs)
+        for _ in range(self.n_frames):
+            self.frames.append(frame)
+        return self._get_ob()
+
+    def step(self, action):
+        obs, reward, done, info = self._life_step(action)
+        if self.clip_rewards:
+            reward = np.sign(reward)
+        self.frames.append(self._warp(obs))
+        return self._get_ob(), reward, done, info
+
+
+class VecAtariPreprocessing(VecEnvWrapper):
+    def __init__(self, venv, clip_rewards=True, frame_stack=False, scale=False):
+        """
+        Grayscale, resize to 84x84, scaling, reward clipping and frame stacking of the frames of all the environments
+        at once, for environments wrapped with AtariPreprocessing(env, warp_frame=False) (see cmd_util.make_atari_env).
+        The observations and rewards are the same as with wrap_deepmind, the observations are arrays instead of
+        LazyFrames.
+
+        :param venv: (VecEnv) the environments, returning the max pooled RGB frames
+        :param clip_rewards: (bool) clip the rewards to {+1, 0, -1} by their sign
+        :param frame_stack: (bool) stack the 4 last frames
+        :param scale: (bool) scale the observations to [0, 1]
+        """
+        self.n_frames = 4 if frame_stack else 1
+        self.clip_rewards = clip_rewards
+        self.scale = scale
+        self.width = 84
+        self.height = 84
+        n_envs = venv.num_envs
+        frame_shape = venv.observation_space.shape
+        dtype = np.float32 if scale else venv.observation_space.dtype
+        # the frames of all the environments are converted to grayscale with a single call, as one tall image
+        self._gray = np.zeros((n_envs * frame_shape[0], frame_shape[1]), dtype=venv.observation_space.dtype)
+        self._resized = np.zeros((n_envs, self.height, self.width), dtype=venv.observation_space.dtype)
+        self.stackedobs = np.zeros((n_envs, self.height, self.width, self.n_frames), dtype=dtype)
+        high = 1.0 if scale and self.n_frames == 1 else 255
+        observation_space = spaces.Box(low=0, high=high, shape=(self.height, self.width, self.n_frames), dtype=dtype)
+        VecEnvWrapper.__init__(self, venv, observation_space=observation_space)
+
+    def _warp(self, frames):
+        """
+        converts the RGB frames to 84x84 grayscale frames, in the last frame of the stacks
+
+        :param frames: (np.ndarray) the RGB frames of the environments
+        """
+        gray = cv2.cvtColor(frames.reshape((-1,) + frames.shape[2:]), cv2.COLOR_RGB2GRAY, dst=self._gray)
+        gray = gray.reshape(frames.shape[:3])
+        for i in range(len(frames)):
+            self._resized[i] = cv2.resize(gray[i], (self.width, self.height), interpolation=cv2.INTER_AREA)
+        if self.scale:
+            np.divide(self._resized, np.float32(255.0), out=self.stackedobs[..., -1], dtype=np.float32)
+        else:
+            self.stackedobs[..., -1] = self._resized
+
+    def reset(self):
+        self._warp(self.venv.reset())
+        # the stacks start with copies of the first frame, like FrameStack
+        self.stackedobs[...] = self.stackedobs[..., -1:]
+        return self.stackedobs.copy()
+
+    def step_wait(self):
+        frames, rewards, dones, infos = self.venv.step_wait()
+        if self.n_frames > 1:
+            self.stackedobs[..., :-1] = self.stackedobs[..., 1:]
+        self._warp(frames)
+        for i in np.nonzero(dones)[0]:
+            # the environment was reset, the frame is the first frame of the new episode
+            self.stackedobs[i] = self.stackedobs[i, ..., -1:]
+        if self.clip_rewards:
+            rewards = np.sign(rewards)
+        return self.stackedobs.copy(), rewards, dones, infos
+
+    def close(self):
+        self.venv.close()
+
+
 def make_atari(env_id):
     """
     Create a wrapped atari envrionment
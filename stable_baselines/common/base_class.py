@@ -7,8 +7,10 @@ import numpy as np
 import gym
 import tensorflow as tf
 
-from stable_baselines.common import set_global_seeds
+from stable_baselines.common import set_global_seeds, tf_util
 from stable_baselines.common.policies import LstmPolicy, get_policy_from_name, ActorCriticPolicy
+from stable_baselines.common.save_util import save_checkpoint, load_checkpoint, is_checkpoint
+from stable_baselines.common.profiling import ProfilingPolicy
 from stable_baselines.common.vec_env import VecEnvWrapper, VecEnv, DummyVecEnv
 from stable_baselines import logger
 
@@ -23,9 +25,11 @@ class BaseRLModel(ABC):
     :param verbose: (int) the verbosity level: 0 none, 1 training information, 2 tensorflow debug
     :param requires_vec_env: (bool) Does this model require a vectorized environment
     :param policy_base: (BasePolicy) the base policy used by this method
+    :param supports_vec_env: (bool) Whether the model can also learn from a vectorized environment with more than one
+        environment (only for models that do not require a vectorized environment)
     """
 
-    def __init__(self, policy, env, verbose=0, *, requires_vec_env, policy_base):
+    def __init__(self, policy, env, verbose=0, *, requires_vec_env, policy_base, supports_vec_env=False):
         if isinstance(policy, str):
             self.policy = get_policy_from_name(policy_base, policy)
         else:
@@ -33,10 +37,14 @@ class BaseRLModel(ABC):
         self.env = env
         self.verbose = verbose
         self._requires_vec_env = requires_vec_env
+        self._supports_vec_env = supports_vec_env
         self.observation_space = None
         self.action_space = None
         self.n_envs = None
         self._vectorize_action = False
+        self._param_load_ops = None
+        self._flat_param_ops = None
+        self.profiling = ProfilingPolicy()
 
         if env is not None:
             if isinstance(env, str):
@@ -52,14 +60,16 @@ class BaseRLModel(ABC):
                 else:
                     raise ValueError("Error: the model requires a vectorized environment, please use a VecEnv wrapper.")
             else:
+                self.n_envs = 1
                 if isinstance(env, VecEnv):
                     if env.num_envs == 1:
                         self.env = _UnvecWrapper(env)
                         self._vectorize_action = True
+                    elif supports_vec_env:
+                        self.n_envs = env.num_envs
                     else:
                         raise ValueError("Error: the model requires a non vectorized environment or a single vectorized"
                                          " environment.")
-                self.n_envs = 1
 
     def get_env(self):
         """
@@ -99,20 +109,42 @@ class BaseRLModel(ABC):
         else:
             # for models that dont want vectorized environment, check if they make sense and adapt them.
             # Otherwise tell the user about this issue
+            self._vectorize_action = False
+            n_envs = 1
             if isinstance(env, VecEnv):
                 if env.num_envs == 1:
                     env = _UnvecWrapper(env)
                     self._vectorize_action = True
+                elif self._supports_vec_env:
+                    assert not issubclass(self.policy, LstmPolicy) or self.n_envs == env.num_envs, \
+                        "Error: the environment passed must have the same number of environments as the model was " \
+                        "trained on. This is due to the Lstm policy not being capable of changing the number of " \
+                        "environments."
+                    n_envs = env.num_envs
                 else:
                     raise ValueError("Error: the model requires a non vectorized environment or a single vectorized "
                                      "environment.")
-            else:
-                self._vectorize_action = False
 
-            self.n_envs = 1
+            self.n_envs = n_envs
 
         self.env = env
 
+    def set_profiling(self, mode='off', interval=100, chrome_trace=False, trace_dir=None, tensorboard=True):
+        """
+        Sets which training steps are run with full tracing (memory, compute time, ... of every operation).
+        By default, no step is traced: tracing is expensive and skews the timings of the traced steps.
+
+        :param mode: (str) 'off' (no tracing), 'sampled' (one traced step every 'interval' steps) or 'always'
+        :param interval: (int) the number of training steps between two traced steps, in 'sampled' mode
+        :param chrome_trace: (bool) export the traced steps as Chrome trace timelines (chrome://tracing)
+        :param trace_dir: (str) the directory of the Chrome traces (if None, the logger directory)
+        :param tensorboard: (bool) add the traced steps to the tensorboard run metadata, when tensorboard is enabled
+        :return: (BaseRLModel) the model itself
+        """
+        self.profiling = ProfilingPolicy(mode=mode, interval=interval, chrome_trace=chrome_trace, trace_dir=trace_dir,
+                                         tensorboard=tensorboard)
+        return self
+
     @abstractmethod
     def setup_model(self):
         """
@@ -196,14 +228,134 @@ class BaseRLModel(ABC):
         # data, param = cls._load_from_file(load_path)
         raise NotImplementedError()
 
+    def _get_step_policy(self):
+        """
+        returns the policy object used for the predictions (the step model)
+
+        :return: (BasePolicy) the step policy
+        """
+        step_model = getattr(self, "step_model", None)
+        if step_model is None:
+            raise NotImplementedError("Error: {} does not expose a step policy.".format(self.__class__.__name__))
+        return step_model
+
+    def export_policy(self, save_path):
+        """
+        Export a minimal, policy-only version of the model: the variables are folded into constants and only the
+        subgraph needed for the predictions is kept (no optimizers, target networks, buffers or summaries).
+        It can be restored with ``stable_baselines.common.frozen_policy.load_policy``.
+
+        :param save_path: (str) the save location
+        """
+        # prevent import loops
+        from stable_baselines.common.frozen_policy import export_policy
+
+        export_policy(self, save_path)
+
+    def _setup_load_operations(self):
+        """
+        Create the placeholders and the grouped assign operation used to set the parameters of the model.
+        They are only created once per graph, so loading parameters does not grow the graph.
+        """
+        if self._param_load_ops is not None and self._param_load_ops[0] is self.graph:
+            return
+        with self.graph.as_default():
+            with tf.variable_scope("load_parameters", reuse=False):
+                placeholders = [tf.placeholder(param.dtype.base_dtype, shape=param.get_shape(),
+                                               name=param.op.name.replace("/", "_") + "_ph")
+                                for param in self.params]
+                assign_op = tf.group(*[tf.assign(param, placeholder)
+                                       for param, placeholder in zip(self.params, placeholders)])
+        self._param_load_ops = (self.graph, placeholders, assign_op)
+
+    def load_parameters(self, params):
+        """
+        Set the parameters of the model (e.g. for periodic weight refreshes from a trainer).
+        The values are fed through placeholders to an assign operation created only once, so the graph and the memory
+        do not grow with the number of loads.
+
+        :param params: ([np.ndarray] or dict) the parameter values, in the same order as the parameters of the model,
+            or a dictionary mapping the variable names to their values
+        """
+        self._setup_load_operations()
+        _, placeholders, assign_op = self._param_load_ops
+        if isinstance(params, dict):
+            missing = [param.name for param in self.params if param.name not in params]
+            if len(missing) > 0:
+                raise ValueError("Error: missing values for the parameters {}".format(missing))
+            params = [params[param.name] for param in self.params]
+        elif len(params) != len(self.params):
+            raise ValueError("Error: got {} parameter values, but the model has {} parameters"
+                             .format(len(params), len(self.params)))
+        self.sess.run(assign_op, feed_dict=dict(zip(placeholders, params)))
+
+    def _setup_flat_operations(self):
+        """
+        Create the operations used to get and set all the parameters of the model as one flat vector.
+        They are only created once per graph.
+        """
+        if self._flat_param_ops is not None and self._flat_param_ops[0] is self.graph:
+            return
+        with self.graph.as_default():
+            with tf.variable_scope("flat_parameters", reuse=False):
+                get_flat = tf_util.GetFlat(self.params, sess=self.sess)
+                set_from_flat = tf_util.SetFromFlat(self.params, sess=self.sess)
+        self._flat_param_ops = (self.graph, get_flat, set_from_flat)
+
+    def get_parameters_flat(self, out=None):
+        """
+        Get all the parameters of the model as one contiguous float32 vector (e.g. to broadcast the weights to actor
+        processes without pickling)
+
+        :param out: (np.ndarray or buffer) optional writable buffer (e.g. shared memory or mmap) to write the
+            parameters into, it must hold exactly the number of parameters as float32
+        :return: (np.ndarray) the flat parameters (a view on ``out`` when it is given)
+        """
+        self._setup_flat_operations()
+        flat_params = self._flat_param_ops[1]()
+        if out is None:
+            return flat_params
+        out = self._flat_buffer(out, flat_params.size)
+        np.copyto(out, flat_params)
+        return out
+
+    def set_parameters_flat(self, buf):
+        """
+        Set all the parameters of the model from one contiguous float32 vector, as returned by get_parameters_flat
+
+        :param buf: (np.ndarray or buffer) the flat parameters (e.g. shared memory or mmap), it is not copied
+        """
+        self._setup_flat_operations()
+        set_from_flat = self._flat_param_ops[2]
+        set_from_flat(self._flat_buffer(buf, int(set_from_flat.theta.get_shape()[0])))
+
+    @staticmethod
+    def _flat_buffer(buf, size):
+        """
+        returns a float32 vector view on a buffer, without copying it
+
+        :param buf: (np.ndarray or buffer) the buffer
+        :param size: (int) the expected number of float32 values
+        :return: (np.ndarray) the float32 view
+        """
+        if isinstance(buf, np.ndarray):
+            if buf.dtype != np.float32:
+                raise ValueError("Error: the flat parameter buffer must be float32, got {}".format(buf.dtype))
+            view = buf.reshape(-1)
+        else:
+            view = np.frombuffer(buf, dtype=np.float32)
+        if view.size != size:
+            raise ValueError("Error: the flat parameter buffer holds {} values, but the model has {} parameters"
+                             .format(view.size, size))
+        return view
+
     @staticmethod
     def _save_to_file(save_path, data=None, params=None):
         _, ext = os.path.splitext(save_path)
         if ext == "":
             save_path += ".pkl"
 
-        with open(save_path, "wb") as file:
-            cloudpickle.dump((data, params), file)
+        save_checkpoint(save_path, data=data, params=params)
 
     @staticmethod
     def _load_from_file(load_path):
@@ -213,6 +365,10 @@ class BaseRLModel(ABC):
             else:
                 raise ValueError("Error: the file {} could not be found".format(load_path))
 
+        if is_checkpoint(load_path):
+            return load_checkpoint(load_path)
+
+        # legacy format: everything in a single cloudpickle blob
         with open(load_path, "rb") as file:
             data, params = cloudpickle.load(file)
 
@@ -290,11 +446,13 @@ class ActorCriticRLModel(BaseRLModel):
     :param verbose: (int) the verbosity level: 0 none, 1 training information, 2 tensorflow debug
     :param policy_base: (BasePolicy) the base policy used by this method (default=ActorCriticPolicy)
     :param requires_vec_env: (bool) Does this model require a vectorized environment
+    :param supports_vec_env: (bool) Whether the model can also learn from a vectorized environment with more than one
+        environment (only for models that do not require a vectorized environment)
     """
     def __init__(self, policy, env, _init_setup_model, verbose=0, policy_base=ActorCriticPolicy,
-                 requires_vec_env=False):
+                 requires_vec_env=False, supports_vec_env=False):
         super(ActorCriticRLModel, self).__init__(policy, env, verbose=verbose, requires_vec_env=requires_vec_env,
-                                                 policy_base=policy_base)
+                                                 policy_base=policy_base, supports_vec_env=supports_vec_env)
 
         self.sess = None
         self.initial_state = None
@@ -360,10 +518,7 @@ class ActorCriticRLModel(BaseRLModel):
         model.set_env(env)
         model.setup_model()
 
-        restores = []
-        for param, loaded_p in zip(model.params, params):
-            restores.append(param.assign(loaded_p))
-        model.sess.run(restores)
+        model.load_parameters(params)
 
         return model
 
@@ -4,42 +4,76 @@ Helpers for scripts like run_atari.py.
 
 import os
 
-from mpi4py import MPI
 import gym
 from gym.wrappers import FlattenDictWrapper
 
 from stable_baselines import logger
 from stable_baselines.bench import Monitor
 from stable_baselines.common import set_global_seeds
-from stable_baselines.common.atari_wrappers import make_atari, wrap_deepmind
+from stable_baselines.common.atari_wrappers import make_atari, wrap_deepmind, AtariPreprocessing, \
+    VecAtariPreprocessing
+from stable_baselines.common.comm import get_default_comm
 from stable_baselines.common.vec_env.subproc_vec_env import SubprocVecEnv
 
 
-def make_atari_env(env_id, num_env, seed, wrapper_kwargs=None, start_index=0, allow_early_resets=True):
+def make_atari_env(env_id, num_env, seed, wrapper_kwargs=None, start_index=0, allow_early_resets=True,
+                   preprocessing='wrappers', start_method=None):
     """
     Create a wrapped, monitored SubprocVecEnv for Atari.
-    
+    The workers follow the thread budget, if one is set (see common.thread_budget.configure_thread_budget).
+
+    The observations and rewards are the same with every preprocessing:
+
+    - 'wrappers': the chain of wrappers of make_atari and wrap_deepmind, in each worker
+    - 'fused': the same preprocessing in a single wrapper with preallocated buffers (AtariPreprocessing), in each worker
+    - 'batched': the workers only skip the frames and handle the lives and the fire reset, the frames of all the
+      environments are warped, scaled and stacked at once in the main process (VecAtariPreprocessing). This sends the
+      RGB frames between the processes, the stacked observations are arrays and not LazyFrames.
+
     :param env_id: (str) the environment ID
     :param num_env: (int) the number of environment you wish to have in subprocesses
     :param seed: (int) the inital seed for RNG
     :param wrapper_kwargs: (dict) the parameters for wrap_deepmind function
     :param start_index: (int) start rank index
     :param allow_early_resets: (bool) allows early reset of the environment
+    :param preprocessing: (str) the implementation of the preprocessing: 'wrappers', 'fused' or 'batched'
+    :param start_method: (str) the start method of the worker processes, see SubprocVecEnv
     :return: (Gym Environment) The atari environment
     """
+    if preprocessing not in ('wrappers', 'fused', 'batched'):
+        raise ValueError("Error: unknown preprocessing '{}', expected 'wrappers', 'fused' or 'batched'"
+                         .format(preprocessing))
     if wrapper_kwargs is None:
         wrapper_kwargs = {}
+    env_kwargs = dict(wrapper_kwargs)
+    vec_kwargs = {}
+    if preprocessing == 'batched':
+        vec_kwargs = dict(clip_rewards=env_kwargs.pop('clip_rewards', True),
+                          frame_stack=env_kwargs.pop('frame_stack', False), scale=env_kwargs.pop('scale', False))
+        env_kwargs['warp_frame'] = False
+
+    # the logger of the main process, the workers are not forked from it with the 'spawn' and 'forkserver' methods
+    log_dir = logger.get_dir()
 
     def make_env(rank):
         def _thunk():
+            monitor_kwargs = dict(filename=log_dir and os.path.join(log_dir, str(rank)),
+                                  allow_early_resets=allow_early_resets)
+            if preprocessing != 'wrappers':
+                env = gym.make(env_id)
+                assert 'NoFrameskip' in env.spec.id
+                env.seed(seed + rank)
+                return AtariPreprocessing(env, monitor_kwargs=monitor_kwargs, **env_kwargs)
             env = make_atari(env_id)
             env.seed(seed + rank)
-            env = Monitor(env, logger.get_dir() and os.path.join(logger.get_dir(), str(rank)),
-                          allow_early_resets=allow_early_resets)
+            env = Monitor(env, **monitor_kwargs)
             return wrap_deepmind(env, **wrapper_kwargs)
         return _thunk
     set_global_seeds(seed)
-    return SubprocVecEnv([make_env(i + start_index) for i in range(num_env)])
+    env = SubprocVecEnv([make_env(i + start_index) for i in range(num_env)], start_method=start_method)
+    if preprocessing == 'batched':
+        env = VecAtariPreprocessing(env, **vec_kwargs)
+    return env
 
 
 def make_mujoco_env(env_id, seed, allow_early_resets=True):
@@ -51,7 +85,7 @@ def make_mujoco_env(env_id, seed, allow_early_resets=True):
     :param allow_early_resets: (bool) allows early reset of the environment
     :return: (Gym Environment) The mujoco environment
     """
-    rank = MPI.COMM_WORLD.Get_rank()
+    rank = get_default_comm().Get_rank()
     set_global_seeds(seed + 10000 * rank)
     env = gym.make(env_id)
     env = Monitor(env, os.path.join(logger.get_dir(), str(rank)), allow_early_resets=allow_early_resets)
@@ -0,0 +1,404 @@
+"""
+Communicators used for the data parallel algorithms (PPO1, TRPO, DDPG, HER, GAIL, ...).
+
+They implement the subset of the mpi4py communicator API used by stable baselines, so the algorithms can run:
+
+- in a single process, without MPI (SingleProcessComm, the collectives are short-circuited)
+- in several processes of the same machine, through shared memory (SharedMemoryComm)
+- in several processes launched with mpirun (MpiComm, mpi4py is only imported for this backend)
+"""
+import os
+import pickle
+import functools
+import multiprocessing
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+SUM = "sum"
+MAX = "max"
+MIN = "min"
+
+_NUMPY_OPS = {SUM: np.add, MAX: np.maximum, MIN: np.minimum}
+# number of banks of the shared memory ring of SharedMemoryGroup
+_N_BANKS = 2
+# environment variables set by the usual MPI launchers (Open MPI, MPICH, MVAPICH, PMIx)
+_MPI_LAUNCHER_VARIABLES = ("OMPI_COMM_WORLD_SIZE", "PMI_SIZE", "PMIX_RANK", "MV2_COMM_WORLD_SIZE",
+                           "MPI_LOCALNRANKS")
+
+_DEFAULT_COMM = None
+
+
+class BaseComm(ABC):
+    """
+    The base class of the communicators, with the mpi4py names: the methods starting with an upper case letter work
+    in place on numpy buffers, the lower case ones on python objects.
+    """
+
+    @abstractmethod
+    def Get_rank(self):
+        """
+        returns the rank of the current process
+
+        :return: (int) the rank
+        """
+        pass
+
+    @abstractmethod
+    def Get_size(self):
+        """
+        returns the number of processes
+
+        :return: (int) the number of processes
+        """
+        pass
+
+    @abstractmethod
+    def Allreduce(self, sendbuf, recvbuf, op=SUM):
+        """
+        Reduce a numpy array over all the processes
+
+        :param sendbuf: (np.ndarray) the local array
+        :param recvbuf: (np.ndarray) the array receiving the result
+        :param op: (str) the reduction operation (SUM, MAX or MIN)
+        """
+        pass
+
+    def Iallreduce(self, sendbuf, recvbuf, op=SUM):
+        """
+        Start reducing a numpy array over all the processes, the default implementation is blocking
+
+        :param sendbuf: (np.ndarray) the local array
+        :param recvbuf: (np.ndarray) the array receiving the result
+        :param op: (str) the reduction operation (SUM, MAX or MIN)
+        :return: (Request) the request, Request.Wait() blocks until recvbuf holds the result
+        """
+        self.Allreduce(sendbuf, recvbuf, op=op)
+        return _CompletedRequest()
+
+    @abstractmethod
+    def Bcast(self, buf, root=0):
+        """
+        Broadcast a numpy array in place from the root process
+
+        :param buf: (np.ndarray) the array, read on the root and written on the other processes
+        :param root: (int) the rank of the root process
+        """
+        pass
+
+    @abstractmethod
+    def allgather(self, obj):
+        """
+        Gather a python object from all the processes
+
+        :param obj: (Any) the local object (must be picklable)
+        :return: ([Any]) the objects of all the processes, ordered by rank
+        """
+        pass
+
+    def allreduce(self, obj, op=SUM):
+        """
+        Reduce a python object (number or numpy array) over all the processes
+
+        :param obj: (Any) the local object
+        :param op: (str) the reduction operation (SUM, MAX or MIN)
+        :return: (Any) the result
+        """
+        return functools.reduce(_NUMPY_OPS[op], self.allgather(obj))
+
+    @abstractmethod
+    def bcast(self, obj, root=0):
+        """
+        Broadcast a python object from the root process
+
+        :param obj: (Any) the object (only used on the root process)
+        :param root: (int) the rank of the root process
+        :return: (Any) the object of the root process
+        """
+        pass
+
+    def Barrier(self):
+        """
+        Wait for all the processes
+        """
+        pass
+
+    def Abort(self, errorcode=1):
+        """
+        Terminate all the processes
+
+        :param errorcode: (int) the exit code
+        """
+        os._exit(errorcode)
+
+
+class _CompletedRequest(object):
+    """
+    A request that is already completed
+    """
+
+    def Wait(self):
+        pass
+
+
+class SingleProcessComm(BaseComm):
+    """
+    Communicator of a single process: the collectives are short-circuited
+    """
+
+    def Get_rank(self):
+        return 0
+
+    def Get_size(self):
+        return 1
+
+    def Allreduce(self, sendbuf, recvbuf, op=SUM):
+        if recvbuf is not sendbuf:
+            recvbuf[...] = np.reshape(sendbuf, np.shape(recvbuf))
+
+    def Bcast(self, buf, root=0):
+        pass
+
+    def allgather(self, obj):
+        return [obj]
+
+    def allreduce(self, obj, op=SUM):
+        return obj
+
+    def bcast(self, obj, root=0):
+        return obj
+
+
+class MpiComm(BaseComm):
+    def __init__(self, comm=None):
+        """
+        Communicator using MPI (mpi4py is imported when the communicator is created)
+
+        :param comm: (MPI Communicators) if None, MPI.COMM_WORLD
+        """
+        from mpi4py import MPI
+        self.comm = MPI.COMM_WORLD if comm is None else comm
+        self._ops = {SUM: MPI.SUM, MAX: MPI.MAX, MIN: MPI.MIN}
+
+    def _op(self, op):
+        return self._ops.get(op, op) if isinstance(op, str) else op
+
+    def Get_rank(self):
+        return self.comm.Get_rank()
+
+    def Get_size(self):
+        return self.comm.Get_size()
+
+    def Allreduce(self, sendbuf, recvbuf, op=SUM):
+        self.comm.Allreduce(sendbuf, recvbuf, op=self._op(op))
+
+    def Iallreduce(self, sendbuf, recvbuf, op=SUM):
+        if not hasattr(self.comm, "Iallreduce"):
+            # MPI implementation without non-blocking collectives
+            return super(MpiComm, self).Iallreduce(sendbuf, recvbuf, op=op)
+        return self.comm.Iallreduce(sendbuf, recvbuf, op=self._op(op))
+
+    def Bcast(self, buf, root=0):
+        self.comm.Bcast(buf, root=root)
+
+    def allgather(self, obj):
+        return self.comm.allgather(obj)
+
+    def allreduce(self, obj, op=SUM):
+        return self.comm.allreduce(obj, op=self._op(op))
+
+    def bcast(self, obj, root=0):
+        return self.comm.bcast(obj, root=root)
+
+    def Barrier(self):
+        self.comm.Barrier()
+
+    def Abort(self, errorcode=1):
+        self.comm.Abort(errorcode)
+
+
+class SharedMemoryGroup(object):
+    def __init__(self, n_workers, buffer_size=2 ** 20, object_buffer_size=2 ** 16, start_method=None):
+        """
+        The shared memory of a group of processes on the same machine, create it in the parent process and pass it
+        to the worker processes, which get their communicator with get_comm(rank)
+
+        The memory is a ring of two banks with one slot per process: a collective step writes the local data in the
+        slot of the process in the current bank, waits on the barrier and reads the other slots. The next step uses
+        the other bank, so a single barrier per step is enough: a bank is only written again once every process has
+        passed the barrier of the next step, i.e. has finished reading it.
+
+        :param n_workers: (int) the number of processes
+        :param buffer_size: (int) the number of float64 elements exchanged per process and per step of a collective
+            (larger arrays are exchanged in several steps)
+        :param object_buffer_size: (int) the maximum size in bytes of a pickled python object
+        :param start_method: (str) the multiprocessing start method of the worker processes (if None, the default)
+        """
+        ctx = multiprocessing.get_context(start_method)
+        self.n_workers = n_workers
+        self.buffer_size = buffer_size
+        self.object_buffer_size = object_buffer_size
+        self.array_buffer = ctx.RawArray('d', _N_BANKS * n_workers * buffer_size)
+        self.object_buffer = ctx.RawArray('B', _N_BANKS * n_workers * object_buffer_size)
+        self.object_sizes = ctx.RawArray('q', _N_BANKS * n_workers)
+        self.barrier = ctx.Barrier(n_workers)
+
+    def get_comm(self, rank):
+        """
+        returns the communicator of a process of the group
+
+        :param rank: (int) the rank of the process
+        :return: (SharedMemoryComm) the communicator
+        """
+        return SharedMemoryComm(self, rank)
+
+
+class SharedMemoryComm(BaseComm):
+    def __init__(self, group, rank):
+        """
+        Communicator of processes on the same machine, the data is exchanged through shared memory.
+        The numpy arrays are exchanged as float64.
+
+        :param group: (SharedMemoryGroup) the shared memory of the group
+        :param rank: (int) the rank of the process
+        """
+        assert 0 <= rank < group.n_workers, "Error: the rank must be between 0 and {}".format(group.n_workers - 1)
+        self.group = group
+        self.rank = rank
+        self.size = group.n_workers
+        self._slots = np.frombuffer(group.array_buffer, dtype=np.float64).reshape(_N_BANKS, self.size,
+                                                                                  group.buffer_size)
+        self._object_slots = np.frombuffer(group.object_buffer, dtype=np.uint8).reshape(_N_BANKS, self.size,
+                                                                                        group.object_buffer_size)
+        self._object_sizes = np.frombuffer(group.object_sizes, dtype=np.int64).reshape(_N_BANKS, self.size)
+        # every process does the same sequence of steps, so they all use the same bank at each step
+        self._n_steps = 0
+
+    def Get_rank(self):
+        return self.rank
+
+    def Get_size(self):
+        return self.size
+
+    def _next_bank(self):
+        bank = self._n_steps % _N_BANKS
+        self._n_steps += 1
+        return bank
+
+    def _chunks(self, size):
+        for start in range(0, size, self.group.buffer_size):
+            yield start, min(start + self.group.buffer_size, size)
+
+    def Allreduce(self, sendbuf, recvbuf, op=SUM):
+        send_flat = np.ravel(sendbuf)
+        result = np.empty(send_flat.shape, dtype=np.float64)
+        for start, end in self._chunks(send_flat.size):
+            slots = self._slots[self._next_bank()]
+            slots[self.rank, :end - start] = send_flat[start:end]
+            self.group.barrier.wait()
+            # every process reduces the slots in the same order, so they all get the same result
+            _NUMPY_OPS[op].reduce(slots[:, :end - start], axis=0, out=result[start:end])
+        recvbuf[...] = result.reshape(np.shape(recvbuf))
+
+    def Bcast(self, buf, root=0):
+        flat = buf.reshape(-1)
+        for start, end in self._chunks(flat.size):
+            slots = self._slots[self._next_bank()]
+            if self.rank == root:
+                slots[root, :end - start] = flat[start:end]
+            self.group.barrier.wait()
+            if self.rank != root:
+                flat[start:end] = slots[root, :end - start]
+        if self.rank != root and not np.shares_memory(flat, buf):
+            buf[...] = flat.reshape(buf.shape)
+
+    def _write_object(self, bank, obj):
+        data = np.frombuffer(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+        if data.size > self.group.object_buffer_size:
+            raise ValueError("Error: the pickled object is {} bytes long, more than the object buffer of {} bytes."
+                             .format(data.size, self.group.object_buffer_size))
+        self._object_slots[bank, self.rank, :data.size] = data
+        self._object_sizes[bank, self.rank] = data.size
+
+    def _read_object(self, bank, rank):
+        return pickle.loads(self._object_slots[bank, rank, :self._object_sizes[bank, rank]].tobytes())
+
+    def allgather(self, obj):
+        bank = self._next_bank()
+        self._write_object(bank, obj)
+        self.group.barrier.wait()
+        return [obj if rank == self.rank else self._read_object(bank, rank) for rank in range(self.size)]
+
+    def bcast(self, obj, root=0):
+        bank = self._next_bank()
+        if self.rank == root:
+            self._write_object(bank, obj)
+        self.group.barrier.wait()
+        if self.rank != root:
+            obj = self._read_object(bank, root)
+        return obj
+
+    def Barrier(self):
+        self.group.barrier.wait()
+
+    def Abort(self, errorcode=1):
+        # the other processes get a BrokenBarrierError at their next collective
+        self.group.barrier.abort()
+        os._exit(errorcode)
+
+
+def _launched_with_mpi():
+    """
+    returns whether the current process was started by an MPI launcher (mpirun, mpiexec, srun)
+
+    :return: (bool)
+    """
+    return any(variable in os.environ for variable in _MPI_LAUNCHER_VARIABLES)
+
+
+def get_default_comm():
+    """
+    returns the default communicator, created the first time:
+    the backend is chosen with the environment variable STABLE_BASELINES_COMM ('single' or 'mpi'), if it is not set
+    MPI is used only if the process was started by an MPI launcher
+
+    :return: (BaseComm) the default communicator
+    """
+    global _DEFAULT_COMM
+    if _DEFAULT_COMM is None:
+        backend = os.getenv("STABLE_BASELINES_COMM")
+        if backend is None:
+            backend = "mpi" if _launched_with_mpi() else "single"
+        if backend == "mpi":
+            _DEFAULT_COMM = MpiComm()
+        elif backend == "single":
+            _DEFAULT_COMM = SingleProcessComm()
+        else:
+            raise ValueError("Error: unknown communicator backend {}, the environment variable STABLE_BASELINES_COMM "
+                             "must be 'single' or 'mpi'.".format(backend))
+    return _DEFAULT_COMM
+
+
+def set_default_comm(comm):
+    """
+    Set the communicator used by the algorithms (e.g. a SharedMemoryComm in each worker process)
+
+    :param comm: (BaseComm) the communicator (if None, it is chosen again by get_default_comm)
+    """
+    global _DEFAULT_COMM
+    _DEFAULT_COMM = as_comm(comm) if comm is not None else None
+
+
+def as_comm(comm=None):
+    """
+    returns the communicator to use for an optional comm argument
+
+    :param comm: (BaseComm or MPI Communicators) the communicator, an mpi4py communicator is wrapped in a MpiComm
+        (if None, the default communicator)
+    :return: (BaseComm) the communicator
+    """
+    if comm is None:
+        return get_default_comm()
+    if isinstance(comm, BaseComm):
+        return comm
+    return MpiComm(comm)
@@ -0,0 +1,101 @@
+import queue
+import traceback
+import multiprocessing
+
+from stable_baselines.common.comm import SharedMemoryGroup, set_default_comm
+from stable_baselines.common.thread_budget import limit_blas_threads
+
+
+def _worker(group, rank, train_fn, args, kwargs, results):
+    """
+    The main function of a worker process: installs its shared memory communicator and runs the training function
+
+    :param group: (SharedMemoryGroup) the shared memory of the workers
+    :param rank: (int) the rank of the worker
+    :param train_fn: (function) the training function
+    :param args: (tuple) the positional arguments of the training function
+    :param kwargs: (dict) the keyword arguments of the training function
+    :param results: (multiprocessing.Queue) receives (rank, success, result or traceback)
+    """
+    # one BLAS thread per worker, the parallelism comes from the workers. The forked workers inherit the BLAS libraries
+    # already loaded by the parent, so the environment variables alone have no effect on them (see limit_blas_threads)
+    limit_blas_threads(1)
+    try:
+        set_default_comm(group.get_comm(rank))
+        result = train_fn(rank, *args, **kwargs)
+    except BaseException:  # pylint: disable=broad-except
+        # wake up the workers waiting in a collective
+        group.barrier.abort()
+        results.put((rank, False, traceback.format_exc()))
+    else:
+        results.put((rank, True, result))
+
+
+def launch_data_parallel(train_fn, n_workers, args=(), kwargs=None, start_method=None, buffer_size=2 ** 20,
+                         object_buffer_size=2 ** 16):
+    """
+    Single machine data parallel training, without MPI: runs train_fn in n_workers processes, each of them with its
+    own environment and graph. The workers communicate through shared memory (SharedMemoryComm), installed as the
+    default communicator of each worker, so the gradients and statistics of PPO1, TRPO, ... are averaged like with
+    mpirun.
+
+    The training function is called as train_fn(rank, *args, **kwargs), it must create the model (and seed it with
+    the rank), and its return value must be picklable. For example:
+
+    .. code-block:: python
+
+        def train(rank, total_timesteps):
+            model = PPO1('MlpPolicy', 'CartPole-v1')
+            model.learn(total_timesteps, seed=rank)
+            if rank == 0:
+                model.save('ppo1_cartpole')
+
+        launch_data_parallel(train, n_workers=4, args=(100000,))
+
+    :param train_fn: (function) the training function (must be picklable for the 'spawn' and 'forkserver' methods)
+    :param n_workers: (int) the number of worker processes
+    :param args: (tuple) the positional arguments of the training function, after the rank
+    :param kwargs: (dict) the keyword arguments of the training function
+    :param start_method: (str) the multiprocessing start method (if None, the default)
+    :param buffer_size: (int) the number of float64 elements exchanged per worker and per step of a collective
+    :param object_buffer_size: (int) the maximum size in bytes of a pickled object exchanged between the workers
+    :return: ([Any]) the return values of the training function, ordered by rank
+    """
+    if kwargs is None:
+        kwargs = {}
+    ctx = multiprocessing.get_context(start_method)
+    group = SharedMemoryGroup(n_workers, buffer_size=buffer_size, object_buffer_size=object_buffer_size,
+                              start_method=start_method)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_worker, args=(group, rank, train_fn, args, kwargs, results))
+                 for rank in range(n_workers)]
+    for process in processes:
+        process.start()
+
+    outputs = [None] * n_workers
+    errors = []
+    reported = set()
+    while len(reported) < n_workers:
+        try:
+            rank, success, output = results.get(timeout=1.0)
+        except queue.Empty:
+            # a worker killed before reporting (e.g. by a signal) would block the others forever
+            for rank, process in enumerate(processes):
+                if rank not in reported and process.exitcode is not None and results.empty():
+                    group.barrier.abort()
+                    errors.append((rank, "the process exited with code {}".format(process.exitcode)))
+                    reported.add(rank)
+            continue
+        reported.add(rank)
+        if success:
+            outputs[rank] = output
+        else:
+            errors.append((rank, output))
+    for process in processes:
+        process.join()
+
+    if len(errors) > 0:
+        # the first error is the cause, the others are usually broken barriers
+        rank, trace = errors[0]
+        raise RuntimeError("Error: the data parallel worker {} failed:\n{}".format(rank, trace))
+    return outputs
@@ -1,34 +1,135 @@
+import queue
+import threading
+
 import numpy as np
 
 
+class BatchBuffers(object):
+    def __init__(self, n_buffers=1):
+        """
+        Preallocated buffers to gather minibatches into, instead of allocating new arrays for every minibatch.
+        The buffers are used as a ring: a gathered batch is only valid until n_buffers other batches are gathered.
+
+        :param n_buffers: (int) the number of sets of buffers in the ring
+        """
+        self.n_buffers = n_buffers
+        self._buffers = None
+        self._next_buffer = 0
+
+    def _allocate(self, arrays, batch_size):
+        """
+        (re)allocates the buffers, if they do not fit the arrays or the batch size
+
+        :param arrays: ([np.ndarray]) the arrays to gather from
+        :param batch_size: (int) the number of rows to gather
+        """
+        if self._buffers is not None and all(
+                buf.shape[0] >= batch_size and buf.shape[1:] == arr.shape[1:] and buf.dtype == arr.dtype
+                for buf, arr in zip(self._buffers[0], arrays)) and len(self._buffers[0]) == len(arrays):
+            return
+        capacity = batch_size if self._buffers is None else max(batch_size, self._buffers[0][0].shape[0])
+        self._buffers = [[np.empty((capacity,) + arr.shape[1:], dtype=arr.dtype) for arr in arrays]
+                         for _ in range(self.n_buffers)]
+        self._next_buffer = 0
+
+    def gather(self, arrays, indices):
+        """
+        gathers the rows 'indices' of the arrays into the next buffers of the ring
+
+        :param arrays: ([np.ndarray]) the arrays, of the same length
+        :param indices: (np.ndarray) the indices of the rows
+        :return: ([np.ndarray]) the batches (views of the buffers)
+        """
+        batch_size = len(indices)
+        self._allocate(arrays, batch_size)
+        buffers = self._buffers[self._next_buffer]
+        self._next_buffer = (self._next_buffer + 1) % self.n_buffers
+        # mode='clip' avoids the intermediate copy of mode='raise', the indices are valid
+        return [np.take(arr, indices, axis=0, out=buf[:batch_size], mode='clip') for arr, buf in zip(arrays, buffers)]
+
+
+_END = object()
+
+
+def prefetch_iterator(iterator, n_prefetch=1):
+    """
+    Iterates over an iterator, computing the next items on a background thread.
+    The batches produced by the iterator must stay valid while n_prefetch + 1 other batches are computed.
+
+    :param iterator: (iterator) the iterator
+    :param n_prefetch: (int) the number of items computed in advance
+    :return: (Any) the items of the iterator
+    """
+    items = queue.Queue(maxsize=n_prefetch)
+    stop = threading.Event()
+
+    def _put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce():
+        try:
+            for item in iterator:
+                if not _put((item, None)):
+                    return
+        except Exception as error:  # pylint: disable=broad-except
+            _put((_END, error))
+        else:
+            _put((_END, None))
+
+    thread = threading.Thread(target=_produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # the consumer may stop early, the producer must not block forever
+        stop.set()
+
+
 class Dataset(object):
-    def __init__(self, data_map, deterministic=False, shuffle=True):
+    def __init__(self, data_map, deterministic=False, shuffle=True, prefetch=False):
         """
         Data loader that handles batches and shuffling.
-        WARNING: this will alter the given data_map ordering, as dicts are mutable
+        Only an index permutation is shuffled, the minibatches are gathered into reusable buffers: a batch is only
+        valid until the next ones are produced, copy it to keep it.
 
         :param data_map: (dict) the input data, where every column is a key
         :param deterministic: (bool) disables the shuffle function
         :param shuffle: (bool) enable auto shuffle
+        :param prefetch: (bool) gather the next batch on a background thread in iterate_once
         """
         self.data_map = data_map
         self.deterministic = deterministic
         self.enable_shuffle = shuffle
+        self.prefetch = prefetch
         self.n_samples = next(iter(data_map.values())).shape[0]
+        self._keys = list(data_map.keys())
+        self._perm = None
+        # with the prefetch, one batch is used, one is queued and one is being gathered
+        self._buffers = BatchBuffers(n_buffers=3 if prefetch else 1)
         self._next_id = 0
         self.shuffle()
 
     def shuffle(self):
         """
-        shuffles the data_map
+        shuffles the order of the samples
         """
         if self.deterministic:
             return
-        perm = np.arange(self.n_samples)
-        np.random.shuffle(perm)
-
-        for key in self.data_map:
-            self.data_map[key] = self.data_map[key][perm]
+        if self._perm is None:
+            self._perm = np.arange(self.n_samples)
+        np.random.shuffle(self._perm)
 
     def next_batch(self, batch_size):
         """
@@ -46,10 +147,12 @@ class Dataset(object):
         cur_batch_size = min(batch_size, self.n_samples - self._next_id)
         self._next_id += cur_batch_size
 
-        data_map = dict()
-        for key in self.data_map:
-            data_map[key] = self.data_map[key][cur_id:cur_id+cur_batch_size]
-        return data_map
+        if self._perm is None:
+            # not shuffled: the batches are views of the data
+            return {key: self.data_map[key][cur_id:cur_id + cur_batch_size] for key in self._keys}
+        batch = self._buffers.gather([self.data_map[key] for key in self._keys],
+                                     self._perm[cur_id:cur_id + cur_batch_size])
+        return dict(zip(self._keys, batch))
 
     def iterate_once(self, batch_size):
         """
@@ -61,6 +164,12 @@ class Dataset(object):
         if self.enable_shuffle:
             self.shuffle()
 
+        if self.prefetch:
+            yield from prefetch_iterator(self._iterate_batches(batch_size))
+        else:
+            yield from self._iterate_batches(batch_size)
+
+    def _iterate_batches(self, batch_size):
         while self._next_id <= self.n_samples - batch_size:
             yield self.next_batch(batch_size)
         self._next_id = 0
@@ -74,30 +183,55 @@ class Dataset(object):
         :return: (Dataset) a new subset of the current Dataset object
         """
         data_map = dict()
-        for key in self.data_map:
-            data_map[key] = self.data_map[key][:num_elements]
+        for key in self._keys:
+            if self._perm is None:
+                data_map[key] = self.data_map[key][:num_elements]
+            else:
+                data_map[key] = self.data_map[key][self._perm[:num_elements]]
         return Dataset(data_map, deterministic)
 
 
-def iterbatches(arrays, *, num_batches=None, batch_size=None, shuffle=True, include_final_partial_batch=True):
+def iterbatches(arrays, *, num_batches=None, batch_size=None, shuffle=True, include_final_partial_batch=True,
+                prefetch=False):
     """
     Iterates over arrays in batches, must provide either num_batches or batch_size, the other must be None.
+    The batches are gathered into reusable buffers: they are only valid until the next batch, copy them to keep them.
 
     :param arrays: (tuple) a tuple of arrays
     :param num_batches: (int) the number of batches, must be None is batch_size is defined
     :param batch_size: (int) the size of the batch, must be None is num_batches is defined
     :param shuffle: (bool) enable auto shuffle
     :param include_final_partial_batch: (bool) add the last batch if not the same size as the batch_size
+    :param prefetch: (bool) gather the next batch on a background thread
     :return: (tuples) a tuple of a batch of the arrays
     """
     assert (num_batches is None) != (batch_size is None), 'Provide num_batches or batch_size, but not both'
     arrays = tuple(map(np.asarray, arrays))
     n_samples = arrays[0].shape[0]
     assert all(a.shape[0] == n_samples for a in arrays[1:])
+    if prefetch:
+        yield from prefetch_iterator(_iterbatches(arrays, n_samples, num_batches, batch_size, shuffle,
+                                                  include_final_partial_batch, n_buffers=3))
+    else:
+        yield from _iterbatches(arrays, n_samples, num_batches, batch_size, shuffle, include_final_partial_batch,
+                                n_buffers=1)
+
+
+def _iterbatches(arrays, n_samples, num_batches, batch_size, shuffle, include_final_partial_batch, n_buffers):
+    """
+    the batches of iterbatches, gathered into a ring of n_buffers buffers
+    """
+    if num_batches is None:
+        bounds = np.append(np.arange(0, n_samples, batch_size), n_samples)
+    else:
+        # same sections as np.array_split: the first (n_samples % num_batches) batches have one more sample
+        sizes = np.full(num_batches, n_samples // num_batches)
+        sizes[:n_samples % num_batches] += 1
+        bounds = np.append(0, np.cumsum(sizes))
     inds = np.arange(n_samples)
     if shuffle:
         np.random.shuffle(inds)
-    sections = np.arange(0, n_samples, batch_size)[1:] if num_batches is None else num_batches
-    for batch_inds in np.array_split(inds, sections):
-        if include_final_partial_batch or len(batch_inds) == batch_size:
-            yield tuple(a[batch_inds] for a in arrays)
+    buffers = BatchBuffers(n_buffers)
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if include_final_partial_batch or end - start == batch_size:
+            yield tuple(buffers.gather(arrays, inds[start:end]))
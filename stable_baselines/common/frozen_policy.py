@@ -0,0 +1,196 @@
+import os
+
+import cloudpickle
+import numpy as np
+import tensorflow as tf
+
+from stable_baselines.common import tf_util
+from stable_baselines.common.base_class import BaseRLModel
+from stable_baselines.common.policies import ActorCriticPolicy, LstmPolicy
+
+
+def _get_policy_tensors(policy):
+    """
+    returns the input placeholders and the output tensors of a step policy needed for the predictions
+
+    :param policy: (BasePolicy) the step policy
+    :return: (dict, dict) the input placeholders and the output tensors
+    """
+    inputs = {"obs": policy.obs_ph}
+    if isinstance(policy, ActorCriticPolicy):
+        outputs = {
+            "action": policy.action,
+            "deterministic_action": policy.deterministic_action,
+            "proba": policy.policy_proba,
+        }
+        if isinstance(policy, LstmPolicy):
+            inputs["states"] = policy.states_ph
+            inputs["masks"] = policy.masks_ph
+            outputs["states"] = policy.snew
+    elif getattr(policy, "q_values", None) is not None:
+        # DQN policies: the action is selected from the Q values, like DQNPolicy.step
+        outputs = {
+            "q_values": policy.q_values,
+            "proba": policy.policy_proba,
+        }
+    else:
+        raise NotImplementedError("Error: cannot export a policy of type {}.".format(type(policy).__name__))
+    return inputs, outputs
+
+
+def export_policy(model, save_path):
+    """
+    Export a minimal, policy-only version of a model.
+    The variables are folded into constants and only the subgraph needed for the predictions is kept.
+
+    :param model: (BaseRLModel) the trained model
+    :param save_path: (str) the save location
+    """
+    policy = model._get_step_policy()  # pylint: disable=protected-access
+    inputs, outputs = _get_policy_tensors(policy)
+
+    output_node_names = sorted(set(tensor.op.name for tensor in outputs.values()))
+    with model.graph.as_default():
+        graph_def = tf.graph_util.convert_variables_to_constants(model.sess, model.graph.as_graph_def(),
+                                                                 output_node_names)
+    for node in graph_def.node:
+        node.device = ""
+
+    data = {
+        "graph_def": graph_def.SerializeToString(),
+        "inputs": {key: tensor.name for key, tensor in inputs.items()},
+        "outputs": {key: tensor.name for key, tensor in outputs.items()},
+        "observation_space": model.observation_space,
+        "action_space": model.action_space,
+        "initial_state": policy.initial_state,
+        "n_envs": model.n_envs,
+    }
+
+    _, ext = os.path.splitext(save_path)
+    if ext == "":
+        save_path += ".pkl"
+
+    with open(save_path, "wb") as file:
+        cloudpickle.dump(data, file)
+
+
+def load_policy(load_path, num_cpu=None):
+    """
+    Load a policy exported with ``BaseRLModel.export_policy``
+
+    :param load_path: (str) the saved policy location
+    :param num_cpu: (int) number of CPUs to use for TensorFlow (if None, use all of them)
+    :return: (FrozenPolicy) the loaded policy
+    """
+    if not os.path.exists(load_path):
+        if os.path.exists(load_path + ".pkl"):
+            load_path += ".pkl"
+        else:
+            raise ValueError("Error: the file {} could not be found".format(load_path))
+
+    with open(load_path, "rb") as file:
+        data = cloudpickle.load(file)
+
+    return FrozenPolicy(data, num_cpu=num_cpu)
+
+
+class FrozenPolicy(object):
+    def __init__(self, data, num_cpu=None):
+        """
+        A policy restored from an exported graph, only supports the predictions
+
+        :param data: (dict) the exported data (see export_policy)
+        :param num_cpu: (int) number of CPUs to use for TensorFlow (if None, use all of them)
+        """
+        self.observation_space = data["observation_space"]
+        self.action_space = data["action_space"]
+        self.initial_state = data["initial_state"]
+        self.n_envs = data["n_envs"]
+
+        graph_def = tf.GraphDef()
+        graph_def.ParseFromString(data["graph_def"])
+
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            tf.import_graph_def(graph_def, name="")
+        self.graph.finalize()
+        self.sess = tf_util.make_session(num_cpu=num_cpu, graph=self.graph)
+
+        self._inputs = {key: self.graph.get_tensor_by_name(name) for key, name in data["inputs"].items()}
+        self._outputs = {key: self.graph.get_tensor_by_name(name) for key, name in data["outputs"].items()}
+
+    def _feed_dict(self, observation, state, mask):
+        feed_dict = {self._inputs["obs"]: observation}
+        if "states" in self._inputs:
+            feed_dict[self._inputs["states"]] = state
+            feed_dict[self._inputs["masks"]] = mask
+        return feed_dict
+
+    def predict(self, observation, state=None, mask=None, deterministic=False):
+        """
+        Get the policy's action from an observation
+
+        :param observation: (np.ndarray) the input observation
+        :param state: (np.ndarray) The last states (can be None, used in recurrent policies)
+        :param mask: (np.ndarray) The last masks (can be None, used in recurrent policies)
+        :param deterministic: (bool) Whether or not to return deterministic actions.
+        :return: (np.ndarray, np.ndarray) the policy's action and the next state (used in recurrent policies)
+        """
+        if state is None:
+            state = self.initial_state
+        if mask is None:
+            mask = [False for _ in range(self.n_envs)]
+        observation = np.array(observation)
+        vectorized_env = BaseRLModel._is_vectorized_observation(observation, self.observation_space)
+
+        observation = observation.reshape((-1,) + self.observation_space.shape)
+        feed_dict = self._feed_dict(observation, state, mask)
+        states = None
+        if "q_values" in self._outputs:
+            q_values, actions_proba = self.sess.run([self._outputs["q_values"], self._outputs["proba"]], feed_dict)
+            if deterministic:
+                actions = np.argmax(q_values, axis=1)
+            else:
+                actions = np.zeros((len(observation),), dtype=np.int64)
+                for action_idx in range(len(observation)):
+                    actions[action_idx] = np.random.choice(self.action_space.n, p=actions_proba[action_idx])
+        else:
+            action_tensor = self._outputs["deterministic_action" if deterministic else "action"]
+            if "states" in self._outputs:
+                actions, states = self.sess.run([action_tensor, self._outputs["states"]], feed_dict)
+            else:
+                actions = self.sess.run(action_tensor, feed_dict)
+                states = self.initial_state
+
+        if not vectorized_env:
+            if state is not None:
+                raise ValueError("Error: The environment must be vectorized when using recurrent policies.")
+            actions = actions[0]
+
+        return actions, states
+
+    def action_probability(self, observation, state=None, mask=None):
+        """
+        Get the policy's action probability distribution from an observation
+
+        :param observation: (np.ndarray) the input observation
+        :param state: (np.ndarray) The last states (can be None, used in recurrent policies)
+        :param mask: (np.ndarray) The last masks (can be None, used in recurrent policies)
+        :return: (np.ndarray) the policy's action probability distribution
+        """
+        if state is None:
+            state = self.initial_state
+        if mask is None:
+            mask = [False for _ in range(self.n_envs)]
+        observation = np.array(observation)
+        vectorized_env = BaseRLModel._is_vectorized_observation(observation, self.observation_space)
+
+        observation = observation.reshape((-1,) + self.observation_space.shape)
+        actions_proba = self.sess.run(self._outputs["proba"], self._feed_dict(observation, state, mask))
+
+        if not vectorized_env:
+            if state is not None:
+                raise ValueError("Error: The environment must be vectorized when using recurrent policies.")
+            actions_proba = actions_proba[0]
+
+        return actions_proba
@@ -0,0 +1,357 @@
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from stable_baselines import logger
+
+
+class _InferenceRequest(object):
+    __slots__ = ('observation', 'client_id', 'episode_start', 'deterministic', 'future', 'start_time')
+
+    def __init__(self, observation, client_id, episode_start, deterministic):
+        self.observation = observation
+        self.client_id = client_id
+        self.episode_start = episode_start
+        self.deterministic = deterministic
+        self.future = Future()
+        self.start_time = time.time()
+
+
+class BatchedInferenceServer(object):
+    def __init__(self, model, max_batch_size=32, max_latency=0.002, latency_window=10000):
+        """
+        Latency oriented inference front-end for a trained model.
+
+        Single observations submitted concurrently (from any number of threads) are collected into micro-batches of
+        at most ``max_batch_size`` observations, or whatever arrived within ``max_latency`` seconds of the first
+        request, and answered with a single call to the step function of the model.
+
+        For recurrent policies (LstmPolicy), the step model has a fixed batch size equal to the number of
+        environments the model was created with: a batch holds at most that many distinct clients, and the
+        recurrent state is kept on the server for every client.
+
+        :param model: (BaseRLModel) the trained model (ActorCriticRLModel or DQN)
+        :param max_batch_size: (int) the maximum number of observations per batch
+        :param max_latency: (float) the maximum time (in seconds) to wait for a batch to fill up
+        :param latency_window: (int) the number of request latencies kept for the percentile statistics
+        """
+        self.model = model
+        self.max_latency = max_latency
+        self.recurrent = getattr(model, 'initial_state', None) is not None
+        if self.recurrent:
+            # the recurrent step model only accepts a batch of exactly n_env observations
+            self.batch_size = model.initial_state.shape[0]
+            self._zero_state = np.zeros_like(model.initial_state[0])
+        else:
+            self.batch_size = max_batch_size
+            self._zero_state = None
+        self._step_fn = self._get_step_function(model)
+        self._obs_shape = model.observation_space.shape
+        self._obs_dtype = model.observation_space.dtype
+
+        self._queue = queue.Queue()
+        self._pending = deque()
+        self._states = {}
+        self._thread = None
+        self._running = False
+        # the requests are only queued while running, and never after the stop sentinel
+        self._running_lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._batch_sizes = deque(maxlen=latency_window)
+        self._stats_lock = threading.Lock()
+        self._client_counter = 0
+        self._client_lock = threading.Lock()
+
+    @staticmethod
+    def _get_step_function(model):
+        """
+        returns a function (observations, states, masks, deterministic) -> (actions, states) for the model
+
+        :param model: (BaseRLModel) the trained model
+        :return: (function)
+        """
+        if getattr(model, 'step', None) is not None and callable(model.step):
+            def _step(observations, states, masks, deterministic):
+                actions, _, states, _ = model.step(observations, states, masks, deterministic=deterministic)
+                return actions, states
+        elif getattr(model, 'step_model', None) is not None:
+            def _step(observations, states, masks, deterministic):
+                actions, _, _ = model.step_model.step(observations, deterministic=deterministic)
+                return actions, None
+        else:
+            raise ValueError("Error: the model {} has no step model, is it set up?".format(model.__class__.__name__))
+        return _step
+
+    def start(self):
+        """
+        Start the batching thread
+        """
+        with self._running_lock:
+            if self._running:
+                return self
+            self._running = True
+            self._thread = threading.Thread(target=self._serve, name="BatchedInferenceServer")
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the batching thread, the pending requests are still answered
+        """
+        with self._running_lock:
+            if not self._running:
+                return
+            self._running = False
+            self._queue.put(None)
+            thread = self._thread
+            self._thread = None
+        thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def new_client_id(self):
+        """
+        returns a new unique client identifier
+
+        :return: (int) the client id
+        """
+        with self._client_lock:
+            self._client_counter += 1
+            return self._client_counter
+
+    def connect(self):
+        """
+        returns an in-process client connected to this server
+
+        :return: (InferenceClient) the client
+        """
+        return InferenceClient(self)
+
+    def release(self, client_id):
+        """
+        Forget the recurrent state of a client
+
+        :param client_id: (hashable) the client id
+        """
+        self._states.pop(client_id, None)
+
+    def submit(self, observation, client_id=None, episode_start=False, deterministic=False):
+        """
+        Submit a single observation, the action is computed asynchronously
+
+        :param observation: (np.ndarray) a single (non vectorized) observation
+        :param client_id: (hashable) the client id, needed for recurrent policies
+        :param episode_start: (bool) whether the observation is the first of an episode
+            (resets the recurrent state of the client)
+        :param deterministic: (bool) Whether or not to return deterministic actions.
+        :return: (concurrent.futures.Future) the future of the action
+        """
+        if self.recurrent and client_id is None:
+            raise ValueError("Error: a client id is needed to keep the state of recurrent policies.")
+        observation = np.asarray(observation, dtype=self._obs_dtype)
+        if observation.shape != self._obs_shape:
+            raise ValueError("Error: Unexpected observation shape {}, the server only accepts single observations "
+                             "of shape {}.".format(observation.shape, self._obs_shape))
+        request = _InferenceRequest(observation, client_id, episode_start, deterministic)
+        with self._running_lock:
+            if not self._running:
+                raise RuntimeError("Error: the inference server is not running, please call start().")
+            self._queue.put(request)
+        return request.future
+
+    def predict(self, observation, client_id=None, episode_start=False, deterministic=False, timeout=None):
+        """
+        Get the action from a single observation, blocks until the batch containing the request is processed
+
+        :param observation: (np.ndarray) a single (non vectorized) observation
+        :param client_id: (hashable) the client id, needed for recurrent policies
+        :param episode_start: (bool) whether the observation is the first of an episode
+        :param deterministic: (bool) Whether or not to return deterministic actions.
+        :param timeout: (float) the maximum time to wait for the action (None for no limit)
+        :return: (np.ndarray) the action
+        """
+        return self.submit(observation, client_id, episode_start, deterministic).result(timeout=timeout)
+
+    def _collect_batch(self):
+        """
+        Collect the next batch, waiting at most max_latency after the first request
+
+        :return: ([_InferenceRequest]) the requests of the batch (None when the server is stopping)
+        """
+        batch = []
+        clients = set()
+        deferred = deque()
+        deadline = None
+        while len(batch) < self.batch_size:
+            if self._pending:
+                request = self._pending.popleft()
+            else:
+                timeout = None if deadline is None else deadline - time.time()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    if batch or deferred:
+                        # answer what has already arrived before stopping
+                        self._queue.put(None)
+                        break
+                    return None
+            if deadline is None:
+                deadline = request.start_time + self.max_latency
+            # a recurrent client can only have one step per batch, as the steps need to be sequential
+            if self.recurrent and request.client_id in clients:
+                deferred.append(request)
+                continue
+            clients.add(request.client_id)
+            batch.append(request)
+        self._pending.extendleft(reversed(deferred))
+        return batch
+
+    def _process_batch(self, batch):
+        """
+        Compute the actions of a batch of requests and resolve their futures
+
+        :param batch: ([_InferenceRequest]) the requests
+        """
+        n_requests = len(batch)
+        n_rows = self.batch_size if self.recurrent else n_requests
+        observations = np.zeros((n_rows,) + self._obs_shape, dtype=self._obs_dtype)
+        for i, request in enumerate(batch):
+            observations[i] = request.observation
+
+        states, masks = None, None
+        if self.recurrent:
+            states = np.zeros((n_rows,) + self._zero_state.shape, dtype=self._zero_state.dtype)
+            masks = np.zeros((n_rows,), dtype=np.float32)
+            for i, request in enumerate(batch):
+                states[i] = self._states.get(request.client_id, self._zero_state)
+                masks[i] = float(request.episode_start)
+
+        try:
+            # the batch is split between stochastic and deterministic requests
+            deterministic_flags = np.array([request.deterministic for request in batch], dtype=np.bool_)
+            actions = None
+            new_states = None
+            for deterministic in (False, True):
+                if not np.any(deterministic_flags == deterministic):
+                    continue
+                step_actions, step_states = self._step_fn(observations, states, masks, deterministic)
+                if actions is None:
+                    actions = np.array(step_actions)
+                    new_states = step_states
+                else:
+                    select = deterministic_flags == deterministic
+                    actions[:n_requests][select] = step_actions[:n_requests][select]
+                    if step_states is not None:
+                        new_states[:n_requests][select] = step_states[:n_requests][select]
+        except Exception as error:  # pylint: disable=broad-except
+            for request in batch:
+                request.future.set_exception(error)
+            return
+
+        if self.recurrent:
+            for i, request in enumerate(batch):
+                self._states[request.client_id] = new_states[i]
+
+        end_time = time.time()
+        with self._stats_lock:
+            self._batch_sizes.append(n_requests)
+            for i, request in enumerate(batch):
+                self._latencies.append(end_time - request.start_time)
+        for i, request in enumerate(batch):
+            request.future.set_result(actions[i])
+
+    def _serve(self):
+        """
+        The main loop of the batching thread
+        """
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+            if batch:
+                self._process_batch(batch)
+
+    def get_latency_percentiles(self, percentiles=(50, 90, 99)):
+        """
+        returns the request latency percentiles, in milliseconds, over the last requests
+
+        :param percentiles: ([float]) the percentiles to compute
+        :return: (dict) the latency (ms) for each percentile (NaN if no request was processed)
+        """
+        with self._stats_lock:
+            latencies = np.array(self._latencies)
+        if len(latencies) == 0:
+            return {percentile: np.nan for percentile in percentiles}
+        values = np.percentile(latencies * 1000, percentiles)
+        return dict(zip(percentiles, values))
+
+    def get_mean_batch_size(self):
+        """
+        returns the mean number of requests per batch, over the last batches
+
+        :return: (float) the mean batch size (NaN if no batch was processed)
+        """
+        with self._stats_lock:
+            return np.nan if len(self._batch_sizes) == 0 else float(np.mean(self._batch_sizes))
+
+    def log_stats(self, percentiles=(50, 90, 99)):
+        """
+        Record the latency percentiles and the mean batch size in the logger
+
+        :param percentiles: ([float]) the percentiles to log
+        """
+        for percentile, value in self.get_latency_percentiles(percentiles).items():
+            logger.logkv("latency_p{}_ms".format(percentile), value)
+        logger.logkv("mean_batch_size", self.get_mean_batch_size())
+
+
+class InferenceClient(object):
+    def __init__(self, server, client_id=None):
+        """
+        In-process client for the BatchedInferenceServer, keeps track of the episode boundaries for recurrent policies
+
+        :param server: (BatchedInferenceServer) the server
+        :param client_id: (hashable) the client id (if None, a new one is created)
+        """
+        self.server = server
+        self.client_id = server.new_client_id() if client_id is None else client_id
+        self._episode_start = True
+
+    def predict(self, observation, deterministic=False, timeout=None):
+        """
+        Get the action from a single observation
+
+        :param observation: (np.ndarray) a single (non vectorized) observation
+        :param deterministic: (bool) Whether or not to return deterministic actions.
+        :param timeout: (float) the maximum time to wait for the action (None for no limit)
+        :return: (np.ndarray) the action
+        """
+        action = self.server.predict(observation, client_id=self.client_id, episode_start=self._episode_start,
+                                     deterministic=deterministic, timeout=timeout)
+        self._episode_start = False
+        return action
+
+    def reset(self):
+        """
+        Start a new episode, the recurrent state is reset on the next prediction
+        """
+        self._episode_start = True
+
+    def close(self):
+        """
+        Release the state kept on the server for this client
+        """
+        self.server.release(self.client_id)
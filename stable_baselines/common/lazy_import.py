@@ -0,0 +1,56 @@
+"""
+Loading of the attributes of a package on first access, so that importing a light part of the library (the VecEnvs,
+the Monitor, ...) does not import TensorFlow and the algorithms.
+"""
+import sys
+import types
+import importlib
+
+
+class LazyModule(types.ModuleType):
+    """
+    A module whose lazy attributes (see lazy_module) are imported from their own module on first access,
+    and then stored in the module like the usual attributes.
+    """
+
+    def __getattr__(self, name):
+        # only called for the attributes that are not yet in the module
+        lazy_attributes = self.__dict__.get('_lazy_attributes', {})
+        if name not in lazy_attributes:
+            raise AttributeError("module '{}' has no attribute '{}'".format(self.__name__, name))
+        value = getattr(importlib.import_module(lazy_attributes[name]), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(super(LazyModule, self).__dir__()) | set(self.__dict__.get('_lazy_attributes', {})))
+
+
+def lazy_module(module_name, attributes):
+    """
+    makes some attributes of a module lazy: they are imported on first access (``module.name`` or
+    ``from module import name``) instead of when the module is imported.
+
+    .. code-block:: python
+
+        # in stable_baselines/__init__.py
+        lazy_module(__name__, {'PPO2': 'stable_baselines.ppo2'})
+
+    :param module_name: (str) the name of the module (its __name__)
+    :param attributes: (dict) the module of each lazy attribute, e.g. {'PPO2': 'stable_baselines.ppo2'}
+    """
+    module = sys.modules[module_name]
+    lazy_attributes = dict(module.__dict__.get('_lazy_attributes', {}))
+    lazy_attributes.update(attributes)
+    module._lazy_attributes = lazy_attributes
+    if not isinstance(module, LazyModule):
+        # the class of a module can be changed since python 3.5, the module stays the same object
+        module.__class__ = LazyModule
+
+
+def is_imported(module_name):
+    """
+    :param module_name: (str) the name of a module (e.g. 'tensorflow')
+    :return: (bool) whether the module was imported by the current process
+    """
+    return module_name in sys.modules
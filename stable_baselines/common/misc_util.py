@@ -6,7 +6,6 @@ import zipfile
 
 import gym
 import numpy as np
-import tensorflow as tf
 
 
 def zipsame(*seqs):
@@ -86,6 +85,8 @@ def set_global_seeds(seed):
 
     :param seed: (int) the seed
     """
+    import tensorflow as tf
+
     tf.set_random_seed(seed)
     np.random.seed(seed)
     random.seed(seed)
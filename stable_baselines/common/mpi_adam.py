@@ -1,13 +1,15 @@
+import zlib
+
 import tensorflow as tf
 import numpy as np
-from mpi4py import MPI
 
 import stable_baselines.common.tf_util as tf_utils
+from stable_baselines.common.comm import SUM, MAX, as_comm
 
 
 class MpiAdam(object):
     def __init__(self, var_list, *, beta1=0.9, beta2=0.999, epsilon=1e-08, scale_grad_by_procs=True, comm=None,
-                 sess=None):
+                 sess=None, bucket_size=None, sync_check_interval=100):
         """
         A parallel MPI implementation of the Adam optimizer for TensorFlow
         https://arxiv.org/abs/1412.6980
@@ -17,14 +19,20 @@ class MpiAdam(object):
         :param beta2: (float) Adam beta1 parameter
         :param epsilon: (float) to help with preventing arithmetic issues
         :param scale_grad_by_procs: (bool) if the scaling should be done by processes
-        :param comm: (MPI Communicators) if None, MPI.COMM_WORLD
+        :param comm: (BaseComm or MPI Communicators) if None, the default communicator
         :param sess: (TensorFlow Session) if None, tf.get_default_session()
+        :param bucket_size: (int) if not None, the gradient is reduced with non-blocking collectives on buckets of
+            variables of about this number of elements, and each bucket is applied as soon as it is reduced,
+            while the next ones are still being reduced
+        :param sync_check_interval: (int) the number of updates between two checks that the parameters are the same
+            on every worker (compares a hash of the parameters), None or 0 to disable the check
         """
         self.var_list = var_list
         self.beta1 = beta1
         self.beta2 = beta2
         self.epsilon = epsilon
         self.scale_grad_by_procs = scale_grad_by_procs
+        self.sync_check_interval = sync_check_interval
         size = sum(tf_utils.numel(v) for v in var_list)
         # Exponential moving average of gradient values
         # "first moment estimate" m in the paper
@@ -35,7 +43,31 @@ class MpiAdam(object):
         self.step = 0
         self.setfromflat = tf_utils.SetFromFlat(var_list, sess=sess)
         self.getflat = tf_utils.GetFlat(var_list, sess=sess)
-        self.comm = MPI.COMM_WORLD if comm is None else comm
+        self.comm = as_comm(comm)
+
+        # persistent buffers, to avoid allocating full size arrays at every update
+        self._local_grad = np.zeros(size, 'float32')
+        self._global_grad = np.zeros(size, 'float32')
+        self._tmp = np.zeros(size, 'float32')
+        self._delta = np.zeros(size, 'float32')
+        self._hash_buffers = (np.zeros(2, 'int64'), np.zeros(2, 'int64'))
+
+        # the buckets are made of whole variables, so they can be applied independently
+        self.buckets = []
+        bucket_vars, bucket_start, offset = [], 0, 0
+        for var in var_list:
+            bucket_vars.append(var)
+            offset += tf_utils.numel(var)
+            if bucket_size is None or offset - bucket_start < bucket_size:
+                continue
+            self.buckets.append((bucket_start, offset, bucket_vars))
+            bucket_vars, bucket_start = [], offset
+        if len(bucket_vars) > 0:
+            self.buckets.append((bucket_start, offset, bucket_vars))
+        if len(self.buckets) == 1:
+            self._apply_deltas = [tf_utils.AddFromFlat(var_list, sess=sess)]
+        else:
+            self._apply_deltas = [tf_utils.AddFromFlat(bucket_vars, sess=sess) for _, _, bucket_vars in self.buckets]
 
     def update(self, local_grad, learning_rate):
         """
@@ -44,22 +76,71 @@ class MpiAdam(object):
         :param local_grad: (numpy float) the gradient
         :param learning_rate: (float) the learning_rate for the update
         """
-        if self.step % 100 == 0:
-            self.check_synced()
-        local_grad = local_grad.astype('float32')
-        global_grad = np.zeros_like(local_grad)
-        self.comm.Allreduce(local_grad, global_grad, op=MPI.SUM)
-        if self.scale_grad_by_procs:
-            global_grad /= self.comm.Get_size()
+        self._local_grad[:] = local_grad
+        if len(self.buckets) == 1 or self.comm.Get_size() == 1:
+            self.comm.Allreduce(self._local_grad, self._global_grad, op=SUM)
+            if self.scale_grad_by_procs:
+                self._global_grad /= self.comm.Get_size()
+            self.apply_global_grad(self._global_grad, learning_rate)
+            return
+
+        self._begin_step()
+        step_size = self._step_size(learning_rate)
+        requests = [self.comm.Iallreduce(self._local_grad[start:end], self._global_grad[start:end], op=SUM)
+                    for start, end, _ in self.buckets]
+        # the later buckets are still being reduced while the first ones are written in the graph
+        for (start, end, _), request, apply_delta in zip(self.buckets, requests, self._apply_deltas):
+            request.Wait()
+            if self.scale_grad_by_procs:
+                self._global_grad[start:end] /= self.comm.Get_size()
+            self._compute_delta(self._global_grad[start:end], step_size, start, end)
+            apply_delta(self._delta[start:end])
+
+    def apply_global_grad(self, global_grad, learning_rate):
+        """
+        update the values of the graph with a gradient already reduced over the MPI workers
 
+        :param global_grad: (numpy float) the gradient, the same on every worker
+        :param learning_rate: (float) the learning_rate for the update
+        """
+        self._begin_step()
+        step_size = self._step_size(learning_rate)
+        for (start, end, _), apply_delta in zip(self.buckets, self._apply_deltas):
+            self._compute_delta(global_grad[start:end], step_size, start, end)
+            apply_delta(self._delta[start:end])
+
+    def _begin_step(self):
+        if self.sync_check_interval and self.step % self.sync_check_interval == 0:
+            assert self.check_synced(), "Error: the parameters of the MPI workers are not synchronized."
         self.step += 1
+
+    def _step_size(self, learning_rate):
         # Learning rate with bias correction
-        step_size = learning_rate * np.sqrt(1 - self.beta2 ** self.step) / (1 - self.beta1 ** self.step)
+        return learning_rate * np.sqrt(1 - self.beta2 ** self.step) / (1 - self.beta1 ** self.step)
+
+    def _compute_delta(self, global_grad, step_size, start, end):
+        """
+        computes in place the Adam step of the parameters [start, end[ in the delta buffer
+
+        :param global_grad: (np.ndarray) the reduced gradient of the parameters [start, end[
+        :param step_size: (float) the bias corrected learning rate
+        :param start: (int) the index of the first parameter
+        :param end: (int) the index after the last parameter
+        """
+        exp_avg, exp_avg_sq = self.exp_avg[start:end], self.exp_avg_sq[start:end]
+        tmp, delta = self._tmp[start:end], self._delta[start:end]
         # Decay the first and second moment running average coefficient
-        self.exp_avg = self.beta1 * self.exp_avg + (1 - self.beta1) * global_grad
-        self.exp_avg_sq = self.beta2 * self.exp_avg_sq + (1 - self.beta2) * (global_grad * global_grad)
-        step = (- step_size) * self.exp_avg / (np.sqrt(self.exp_avg_sq) + self.epsilon)
-        self.setfromflat(self.getflat() + step)
+        exp_avg *= self.beta1
+        np.multiply(global_grad, 1 - self.beta1, out=tmp, casting='same_kind')
+        exp_avg += tmp
+        exp_avg_sq *= self.beta2
+        np.multiply(global_grad, global_grad, out=tmp, casting='same_kind')
+        tmp *= 1 - self.beta2
+        exp_avg_sq += tmp
+        np.sqrt(exp_avg_sq, out=tmp)
+        tmp += self.epsilon
+        np.multiply(exp_avg, - step_size, out=delta, casting='same_kind')
+        delta /= tmp
 
     def sync(self):
         """
@@ -71,16 +152,18 @@ class MpiAdam(object):
 
     def check_synced(self):
         """
-        confirm the MPI threads are synced
+        confirm the MPI threads are synced, by comparing a hash of the parameters
+
+        :return: (bool) whether the parameters are the same on all the workers
         """
-        if self.comm.Get_rank() == 0:  # this is root
-            theta = self.getflat()
-            self.comm.Bcast(theta, root=0)
-        else:
-            thetalocal = self.getflat()
-            thetaroot = np.empty_like(thetalocal)
-            self.comm.Bcast(thetaroot, root=0)
-            assert (thetaroot == thetalocal).all(), (thetaroot, thetalocal)
+        if self.comm.Get_size() == 1:
+            return True
+        send_buf, recv_buf = self._hash_buffers
+        param_hash = zlib.crc32(self.getflat().tobytes())
+        # the max of [h, -h] gives the max and the min of the hash over the workers
+        send_buf[0], send_buf[1] = param_hash, -param_hash
+        self.comm.Allreduce(send_buf, recv_buf, op=MAX)
+        return recv_buf[0] == -recv_buf[1]
 
 
 @tf_utils.in_session
@@ -116,6 +199,44 @@ def test_mpi_adam():
         print(step, loss)
 
 
+def _helper_mpi_adam_buckets():
+    """
+    tests that the bucketed updates (non-blocking reductions) give the same parameters as the updates of a single
+    bucket, on every worker (run with mpirun -np 2)
+    """
+    comm = as_comm()
+    assert comm.Get_size() > 1, "Error: run with mpirun -np 2 or more"
+    np.random.seed(0)
+    initial_values = [np.random.randn(3).astype('float32'), np.random.randn(2, 5).astype('float32'),
+                      np.random.randn(4).astype('float32')]
+    learning_rate = 1e-2
+
+    param_hashes = []
+    final_params = []
+    for bucket_size in [None, 4]:
+        with tf.Graph().as_default(), tf.Session() as sess:
+            var_list = [tf.Variable(value) for value in initial_values]
+            # each worker has a different gradient
+            loss = (comm.Get_rank() + 1) * (tf.reduce_sum(tf.square(var_list[0])) + tf.reduce_sum(tf.sin(var_list[1]))
+                                            + tf.reduce_sum(tf.abs(var_list[2])))
+            compute_grad = tf_utils.function([], tf_utils.flatgrad(loss, var_list))
+            adam = MpiAdam(var_list, sess=sess, bucket_size=bucket_size, sync_check_interval=1)
+            assert len(adam.buckets) == (1 if bucket_size is None else 2)
+            sess.run(tf.global_variables_initializer())
+            for _ in range(10):
+                adam.update(compute_grad(sess=sess), learning_rate)
+            assert adam.check_synced()
+            params = adam.getflat()
+            final_params.append(params)
+            param_hashes.append(zlib.crc32(params.tobytes()))
+
+    assert np.allclose(final_params[0], final_params[1])
+    assert param_hashes[0] == param_hashes[1], "Error: the bucketed updates differ from the single bucket updates"
+    # the hashes are the same on every worker
+    for worker_hashes in comm.allgather(param_hashes):
+        assert worker_hashes == param_hashes
+
+
 if __name__ == "__main__":
     # Run with mpirun -np 2 python <filename>
     test_mpi_adam()
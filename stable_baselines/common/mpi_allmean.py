@@ -0,0 +1,200 @@
+import time
+
+import numpy as np
+
+from stable_baselines.common.comm import SUM, MAX, as_comm
+
+
+class MpiAllMean(object):
+    def __init__(self, comm=None, dtype='float64'):
+        """
+        Averages arrays over the workers, with reusable send and receive buffers.
+
+        Each reduction is identified by a key, and gets its own buffers: the returned arrays are views of the receive
+        buffer of the key, they are only valid until the next reduction with the same key.
+        Several small arrays can be reduced with a single collective (allmean_many), and a reduction can be started
+        in the background (iallmean) to overlap it with computations.
+
+        :param comm: (BaseComm or MPI Communicators) if None, the default communicator
+        :param dtype: (str or numpy dtype) the type of the buffers
+        """
+        self.comm = as_comm(comm)
+        self.nworkers = self.comm.Get_size()
+        self.dtype = np.dtype(dtype)
+        self._buffers = {}
+        self.comm_time = 0.0
+        self.n_calls = 0
+
+    def _get_buffers(self, key, size):
+        """
+        returns the send and receive buffers of a key, (re)allocated if the size changed
+
+        :param key: (hashable) the reduction key
+        :param size: (int) the number of elements to reduce
+        :return: (np.ndarray, np.ndarray) the send and receive buffers
+        """
+        buffers = self._buffers.get(key)
+        if buffers is None or buffers[0].size != size:
+            buffers = (np.zeros(size, self.dtype), np.zeros(size, self.dtype))
+            self._buffers[key] = buffers
+        return buffers
+
+    def _reduce(self, send_buf, recv_buf):
+        start_time = time.time()
+        if self.nworkers == 1:
+            recv_buf[:] = send_buf
+        else:
+            self.comm.Allreduce(send_buf, recv_buf, op=SUM)
+            recv_buf /= self.nworkers
+        self.comm_time += time.time() - start_time
+        self.n_calls += 1
+
+    def allmean(self, arr, key=None):
+        """
+        Average an array over the workers
+
+        :param arr: (np.ndarray) the local array
+        :param key: (hashable) the reduction key (if None, the shape of the array)
+        :return: (np.ndarray) the mean of the array over the workers (view of the receive buffer)
+        """
+        arr = np.asarray(arr)
+        if key is None:
+            key = arr.shape
+        send_buf, recv_buf = self._get_buffers(key, arr.size)
+        send_buf[:] = arr.ravel()
+        self._reduce(send_buf, recv_buf)
+        return recv_buf.reshape(arr.shape)
+
+    def allmean_many(self, arrays, key):
+        """
+        Average several arrays over the workers, with a single collective
+
+        :param arrays: ([np.ndarray]) the local arrays
+        :param key: (hashable) the reduction key
+        :return: ([np.ndarray]) the means of the arrays over the workers (views of the receive buffer)
+        """
+        arrays = [np.asarray(arr) for arr in arrays]
+        offsets = np.cumsum([0] + [arr.size for arr in arrays])
+        send_buf, recv_buf = self._get_buffers(key, offsets[-1])
+        for arr, start, end in zip(arrays, offsets[:-1], offsets[1:]):
+            send_buf[start:end] = arr.ravel()
+        self._reduce(send_buf, recv_buf)
+        return [recv_buf[start:end].reshape(arr.shape) for arr, start, end in zip(arrays, offsets[:-1], offsets[1:])]
+
+    def iallmean(self, arr, key=None):
+        """
+        Start averaging an array over the workers, without waiting for the result.
+        Falls back to a blocking reduction if the MPI library does not support non-blocking collectives.
+
+        :param arr: (np.ndarray) the local array
+        :param key: (hashable) the reduction key (if None, the shape of the array), the buffers of the key must not
+            be used until the request is completed
+        :return: (AllMeanRequest) the request, AllMeanRequest.wait() returns the mean
+        """
+        arr = np.asarray(arr)
+        if key is None:
+            key = arr.shape
+        send_buf, recv_buf = self._get_buffers(key, arr.size)
+        send_buf[:] = arr.ravel()
+        if self.nworkers == 1:
+            self._reduce(send_buf, recv_buf)
+            return AllMeanRequest(self, None, recv_buf.reshape(arr.shape))
+        start_time = time.time()
+        request = self.comm.Iallreduce(send_buf, recv_buf, op=SUM)
+        self.comm_time += time.time() - start_time
+        self.n_calls += 1
+        return AllMeanRequest(self, request, recv_buf.reshape(arr.shape))
+
+    def check_synced(self, values, rtol=1e-5, atol=1e-8):
+        """
+        Check that all the workers have the same values (e.g. checksums of the parameters), with a single collective
+
+        :param values: ([float]) the local values
+        :param rtol: (float) the relative tolerance
+        :param atol: (float) the absolute tolerance
+        :return: (bool) whether the values are the same on all the workers
+        """
+        if self.nworkers == 1:
+            return True
+        values = np.asarray(values, dtype='float64').ravel()
+        send_buf, recv_buf = self._get_buffers(("check_synced", values.size), 2 * values.size)
+        # the max of [x, -x] gives the max and the min of x over the workers
+        send_buf[:values.size] = values
+        send_buf[values.size:] = -values
+        start_time = time.time()
+        self.comm.Allreduce(send_buf, recv_buf, op=MAX)
+        self.comm_time += time.time() - start_time
+        self.n_calls += 1
+        return bool(np.allclose(recv_buf[:values.size], -recv_buf[values.size:], rtol=rtol, atol=atol))
+
+    def pop_comm_time(self):
+        """
+        returns the time spent in the collectives since the last call, and resets it
+
+        :return: (float, int) the communication time (in seconds) and the number of collectives
+        """
+        comm_time, n_calls = self.comm_time, self.n_calls
+        self.comm_time = 0.0
+        self.n_calls = 0
+        return comm_time, n_calls
+
+
+class AllMeanRequest(object):
+    def __init__(self, allmean, request, result):
+        """
+        A reduction started with MpiAllMean.iallmean
+
+        :param allmean: (MpiAllMean) the object that started the reduction
+        :param request: (MPI Request) the MPI request (None if the reduction is already done)
+        :param result: (np.ndarray) the receive buffer
+        """
+        self.allmean = allmean
+        self.request = request
+        self.result = result
+
+    def wait(self):
+        """
+        Wait for the end of the reduction
+
+        :return: (np.ndarray) the mean of the array over the workers (view of the receive buffer)
+        """
+        if self.request is not None:
+            start_time = time.time()
+            self.request.Wait()
+            self.result /= self.allmean.nworkers
+            self.allmean.comm_time += time.time() - start_time
+            self.request = None
+        return self.result
+
+
+def _helper_allmean():
+    """
+    test the reductions of MpiAllMean (run with mpirun)
+    """
+    comm = as_comm()
+    rank, nworkers = comm.Get_rank(), comm.Get_size()
+    allmean = MpiAllMean(comm)
+    expected_mean = np.mean(np.arange(nworkers))
+
+    losses, grad = allmean.allmean_many([np.full(3, rank), np.full((2, 4), 2 * rank)], key="lossandgrad")
+    assert losses.shape == (3,) and grad.shape == (2, 4)
+    assert np.allclose(losses, expected_mean) and np.allclose(grad, 2 * expected_mean)
+
+    result = allmean.allmean(np.full(5, rank))
+    assert np.allclose(result, expected_mean)
+    # the buffers are reused
+    assert np.shares_memory(allmean.allmean(np.full(5, rank + 1)), result)
+    assert np.allclose(result, expected_mean + 1)
+
+    request = allmean.iallmean(np.full(4, rank), key="vf")
+    assert np.allclose(request.wait(), expected_mean)
+
+    assert allmean.check_synced([1.0, 2.0])
+    assert allmean.check_synced([1.0, float(rank)]) == (nworkers == 1)
+    comm_time, n_calls = allmean.pop_comm_time()
+    assert comm_time >= 0 and n_calls == (6 if nworkers > 1 else 4)
+    assert allmean.pop_comm_time() == (0.0, 0)
+
+
+if __name__ == "__main__":
+    _helper_allmean()
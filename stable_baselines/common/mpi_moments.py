@@ -1,7 +1,7 @@
-from mpi4py import MPI
 import numpy as np
 
 from stable_baselines.common import zipsame
+from stable_baselines.common.comm import SUM, as_comm
 
 
 def mpi_mean(arr, axis=0, comm=None, keepdims=False):
@@ -10,21 +10,20 @@ def mpi_mean(arr, axis=0, comm=None, keepdims=False):
 
     :param arr: (np.ndarray)
     :param axis: (int or tuple or list) the axis to run the means over
-    :param comm: (MPI Communicators) if None, MPI.COMM_WORLD
+    :param comm: (BaseComm or MPI Communicators) if None, the default communicator
     :param keepdims: (bool) keep the other dimensions intact
     :return: (np.ndarray or Number) the result of the sum
     """
     arr = np.asarray(arr)
     assert arr.ndim > 0
-    if comm is None:
-        comm = MPI.COMM_WORLD
+    comm = as_comm(comm)
     xsum = arr.sum(axis=axis, keepdims=keepdims)
     size = xsum.size
     localsum = np.zeros(size + 1, arr.dtype)
     localsum[:size] = xsum.ravel()
     localsum[size] = arr.shape[axis]
     globalsum = np.zeros_like(localsum)
-    comm.Allreduce(localsum, globalsum, op=MPI.SUM)
+    comm.Allreduce(localsum, globalsum, op=SUM)
     return globalsum[:size].reshape(xsum.shape) / globalsum[size], globalsum[size]
 
 
@@ -34,7 +33,7 @@ def mpi_moments(arr, axis=0, comm=None, keepdims=False):
 
     :param arr: (np.ndarray)
     :param axis: (int or tuple or list) the axis to run the moments over
-    :param comm: (MPI Communicators) if None, MPI.COMM_WORLD
+    :param comm: (BaseComm or MPI Communicators) if None, the default communicator
     :param keepdims: (bool) keep the other dimensions intact
     :return: (np.ndarray or Number) the result of the moments
     """
@@ -53,7 +52,7 @@ def mpi_moments(arr, axis=0, comm=None, keepdims=False):
 
 
 def _helper_runningmeanstd():
-    comm = MPI.COMM_WORLD
+    comm = as_comm()
     np.random.seed(0)
     for (triple, axis) in [
          ((np.random.randn(3), np.random.randn(4), np.random.randn(5)), 0),
@@ -4,7 +4,8 @@ import numpy as np
 import tensorflow as tf
 from gym.spaces import Discrete
 
-from stable_baselines.a2c.utils import conv, linear, conv_to_fc, batch_to_seq, seq_to_batch, lstm
+from stable_baselines.a2c.utils import conv, linear, conv_to_fc, batch_to_seq, seq_to_batch, lstm, \
+    batch_to_time_major, time_major_to_batch, scan_lstm
 from stable_baselines.common.distributions import make_proba_dist_type
 from stable_baselines.common.input import observation_input
 
@@ -176,11 +177,13 @@ class LstmPolicy(ActorCriticPolicy):
     :param cnn_extractor: (function (TensorFlow Tensor, ``**kwargs``): (TensorFlow Tensor)) the CNN feature extraction
     :param layer_norm: (bool) Whether or not to use layer normalizing LSTMs
     :param feature_extraction: (str) The feature extraction type ("cnn" or "mlp")
+    :param lstm_unroll: (bool) Build one LSTM cell per step (lstm) instead of a tf.scan over the steps (scan_lstm),
+        both have the same variables
     :param kwargs: (dict) Extra keyword arguments for the nature CNN feature extraction
     """
 
     def __init__(self, sess, ob_space, ac_space, n_env, n_steps, n_batch, n_lstm=256, reuse=False, layers=None,
-                 cnn_extractor=nature_cnn, layer_norm=False, feature_extraction="cnn", **kwargs):
+                 cnn_extractor=nature_cnn, layer_norm=False, feature_extraction="cnn", lstm_unroll=False, **kwargs):
         super(LstmPolicy, self).__init__(sess, ob_space, ac_space, n_env, n_steps, n_batch, n_lstm, reuse,
                                          scale=(feature_extraction == "cnn"))
 
@@ -196,11 +199,18 @@ class LstmPolicy(ActorCriticPolicy):
                 for i, layer_size in enumerate(layers):
                     extracted_features = activ(linear(extracted_features, 'pi_fc' + str(i), n_hidden=layer_size,
                                                       init_scale=np.sqrt(2)))
-            input_sequence = batch_to_seq(extracted_features, self.n_env, n_steps)
-            masks = batch_to_seq(self.masks_ph, self.n_env, n_steps)
-            rnn_output, self.snew = lstm(input_sequence, masks, self.states_ph, 'lstm1', n_hidden=n_lstm,
-                                         layer_norm=layer_norm)
-            rnn_output = seq_to_batch(rnn_output)
+            if lstm_unroll:
+                input_sequence = batch_to_seq(extracted_features, self.n_env, n_steps)
+                masks = batch_to_seq(self.masks_ph, self.n_env, n_steps)
+                rnn_output, self.snew = lstm(input_sequence, masks, self.states_ph, 'lstm1', n_hidden=n_lstm,
+                                             layer_norm=layer_norm)
+                rnn_output = seq_to_batch(rnn_output)
+            else:
+                input_sequence = batch_to_time_major(extracted_features, self.n_env, n_steps)
+                masks = batch_to_time_major(self.masks_ph, self.n_env, n_steps)
+                rnn_output, self.snew = scan_lstm(input_sequence, masks, self.states_ph, 'lstm1', n_hidden=n_lstm,
+                                                  layer_norm=layer_norm)
+                rnn_output = time_major_to_batch(rnn_output)
             value_fn = linear(rnn_output, 'vf', 1)
 
             self.proba_distribution, self.policy, self.q_value = \
@@ -0,0 +1,100 @@
+import os
+
+import tensorflow as tf
+from tensorflow.python.client import timeline
+
+from stable_baselines import logger
+from stable_baselines.common.comm import get_default_comm
+
+OFF = 'off'
+SAMPLED = 'sampled'
+ALWAYS = 'always'
+PROFILING_MODES = (OFF, SAMPLED, ALWAYS)
+
+
+class ProfilingPolicy(object):
+    def __init__(self, mode=OFF, interval=100, chrome_trace=False, trace_dir=None, tensorboard=True):
+        """
+        Decides which training steps of a model are run with full tracing (memory, compute time, ... of every
+        operation), and where the traces go. Full tracing is expensive, and it skews the timings of the traced steps.
+
+        The algorithms run their training operations with the arguments of start_step(), and give the result to
+        end_step():
+
+        .. code-block:: python
+
+            run_kwargs = self.profiling.start_step()
+            summary, loss, _ = self.sess.run([self.summary, self.loss, self.train_op], td_map, **run_kwargs)
+            self.profiling.end_step(run_kwargs, step, writer)
+
+        :param mode: (str) 'off' (no tracing), 'sampled' (one traced step every 'interval' steps) or 'always'
+        :param interval: (int) the number of training steps between two traced steps, in 'sampled' mode
+        :param chrome_trace: (bool) export the traced steps as Chrome trace timelines (chrome://tracing)
+        :param trace_dir: (str) the directory of the Chrome traces (if None, the logger directory)
+        :param tensorboard: (bool) add the traced steps to the tensorboard run metadata, when tensorboard is enabled
+        """
+        if mode not in PROFILING_MODES:
+            raise ValueError("Error: unknown profiling mode '{}', expected one of {}".format(mode, PROFILING_MODES))
+        if mode == SAMPLED and interval < 1:
+            raise ValueError("Error: the profiling interval must be positive, got {}".format(interval))
+        self.mode = mode
+        self.interval = interval
+        self.chrome_trace = chrome_trace
+        self.trace_dir = trace_dir
+        self.tensorboard = tensorboard
+        self.n_steps = 0
+        self.n_traced_steps = 0
+        self._seen_names = set()
+
+    def start_step(self):
+        """
+        counts a training step, and returns the arguments of the session run for this step
+
+        :return: (dict) empty if the step is not traced, else the 'options' and 'run_metadata' arguments of a
+            session run (or of a tf_util.function call)
+        """
+        self.n_steps += 1
+        if self.mode == OFF or (self.mode == SAMPLED and self.n_steps % self.interval != 0):
+            return {}
+        return dict(options=tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE), run_metadata=tf.RunMetadata())
+
+    def end_step(self, run_kwargs, step, writer=None, tag=None):
+        """
+        saves the trace of a training step, if it was traced
+
+        :param run_kwargs: (dict) the arguments returned by start_step
+        :param step: (int) the current timestep, used to name the trace
+        :param writer: (TensorFlow Summary.writer) the tensorboard writer (can be None)
+        :param tag: (str) the name of the traced operation (if None, 'step')
+        """
+        if 'run_metadata' not in run_kwargs:
+            return
+        self.n_traced_steps += 1
+        run_metadata = run_kwargs['run_metadata']
+        name = '{}{}'.format(tag or 'step', int(step))
+        if name in self._seen_names:
+            # some algorithms only estimate the timestep, the names of the run metadata must be unique
+            name += '_{}'.format(self.n_steps)
+        self._seen_names.add(name)
+        if writer is not None and self.tensorboard:
+            writer.add_run_metadata(run_metadata, name)
+        if self.chrome_trace:
+            self._export_chrome_trace(run_metadata, name)
+
+    def _export_chrome_trace(self, run_metadata, name):
+        """
+        writes the timeline of a traced step in the Chrome trace format
+
+        :param run_metadata: (TensorFlow RunMetadata) the metadata of the traced step
+        :param name: (str) the name of the step
+        """
+        trace_dir = self.trace_dir or logger.get_dir()
+        if trace_dir is None:
+            return
+        comm = get_default_comm()
+        if comm.Get_size() > 1:
+            name += '_rank{}'.format(comm.Get_rank())
+        os.makedirs(trace_dir, exist_ok=True)
+        trace = timeline.Timeline(run_metadata.step_stats).generate_chrome_trace_format()
+        with open(os.path.join(trace_dir, 'timeline_{}.json'.format(name)), 'w') as file_handler:
+            file_handler.write(trace)
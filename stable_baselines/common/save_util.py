@@ -0,0 +1,96 @@
+import struct
+
+import cloudpickle
+import numpy as np
+
+# file signature of the checkpoint format, followed by the version of the format
+CHECKPOINT_MAGIC = b"SBCKPT\x00\x01"
+# every parameter array starts on a multiple of this number of bytes
+CHECKPOINT_ALIGNMENT = 64
+_HEADER_LEN_FORMAT = "<Q"
+
+
+def _align(offset):
+    """
+    returns the first offset aligned on CHECKPOINT_ALIGNMENT bytes, greater or equal to the given offset
+
+    :param offset: (int) the offset in bytes
+    :return: (int) the aligned offset
+    """
+    return (offset + CHECKPOINT_ALIGNMENT - 1) // CHECKPOINT_ALIGNMENT * CHECKPOINT_ALIGNMENT
+
+
+def save_checkpoint(save_path, data=None, params=None):
+    """
+    Save a model checkpoint: a small pickled header for the class parameters (data) followed by a raw binary
+    section containing the parameter arrays, each of them aligned so it can be memory mapped.
+
+    :param save_path: (str) the save location
+    :param data: (dict) the class parameters
+    :param params: ([np.ndarray]) the parameter values
+    """
+    if params is None:
+        params = []
+    params = [np.asarray(param) for param in params]
+
+    params_info = []
+    offset = 0
+    for param in params:
+        offset = _align(offset)
+        params_info.append({"dtype": param.dtype.str, "shape": param.shape, "offset": offset})
+        offset += param.nbytes
+
+    header = cloudpickle.dumps({"data": data, "params": params_info})
+    data_start = _align(len(CHECKPOINT_MAGIC) + struct.calcsize(_HEADER_LEN_FORMAT) + len(header))
+
+    with open(save_path, "wb") as file:
+        file.write(CHECKPOINT_MAGIC)
+        file.write(struct.pack(_HEADER_LEN_FORMAT, len(header)))
+        file.write(header)
+        for param, info in zip(params, params_info):
+            file.seek(data_start + info["offset"])
+            file.write(param.tobytes())
+
+
+def is_checkpoint(load_path):
+    """
+    returns whether the file uses the checkpoint format (as opposed to a single cloudpickle blob)
+
+    :param load_path: (str) the file location
+    :return: (bool)
+    """
+    with open(load_path, "rb") as file:
+        return file.read(len(CHECKPOINT_MAGIC)) == CHECKPOINT_MAGIC
+
+
+def load_checkpoint(load_path, mmap=True):
+    """
+    Load a model checkpoint saved with save_checkpoint
+
+    :param load_path: (str) the file location
+    :param mmap: (bool) memory map the parameter arrays from the file instead of reading them in memory
+    :return: (dict, [np.ndarray]) the class parameters and the parameter values
+    """
+    with open(load_path, "rb") as file:
+        magic = file.read(len(CHECKPOINT_MAGIC))
+        if magic != CHECKPOINT_MAGIC:
+            raise ValueError("Error: the file {} is not a valid checkpoint".format(load_path))
+        header_len, = struct.unpack(_HEADER_LEN_FORMAT, file.read(struct.calcsize(_HEADER_LEN_FORMAT)))
+        header = cloudpickle.loads(file.read(header_len))
+        data_start = _align(len(CHECKPOINT_MAGIC) + struct.calcsize(_HEADER_LEN_FORMAT) + header_len)
+
+        params = []
+        for info in header["params"]:
+            dtype = np.dtype(info["dtype"])
+            shape = tuple(info["shape"])
+            size = int(np.prod(shape))
+            if size == 0:
+                params.append(np.zeros(shape, dtype=dtype))
+            elif mmap:
+                params.append(np.memmap(load_path, dtype=dtype, mode="r", offset=data_start + info["offset"],
+                                        shape=(size,)).reshape(shape))
+            else:
+                file.seek(data_start + info["offset"])
+                params.append(np.fromfile(file, dtype=dtype, count=size).reshape(shape))
+
+    return header["data"], params
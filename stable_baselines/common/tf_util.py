@@ -2,13 +2,13 @@ import copy
 import os
 import functools
 import collections
-import multiprocessing
 
 import numpy as np
 import tensorflow as tf
 from tensorflow.python.client import device_lib
 
 from stable_baselines import logger
+from stable_baselines.common.thread_budget import get_thread_budget, available_cpus
 
 
 def switch(condition, then_expression, else_expression):
@@ -73,15 +73,20 @@ def huber_loss(tensor, delta=1.0):
 
 def make_session(num_cpu=None, make_default=False, graph=None):
     """
-    Returns a session that will use <num_cpu> CPU's only
+    Returns a session that will use <num_cpu> CPU's only.
+    If a thread budget is set (see common.thread_budget), the session uses at most its TensorFlow threads.
 
-    :param num_cpu: (int) number of CPUs to use for TensorFlow
+    :param num_cpu: (int) number of CPUs to use for TensorFlow (if None, the TensorFlow threads of the thread budget,
+        or all the available CPUs)
     :param make_default: (bool) if this should return an InteractiveSession or a normal Session
     :param graph: (TensorFlow Graph) the graph of the session
     :return: (TensorFlow session)
     """
-    if num_cpu is None:
-        num_cpu = int(os.getenv('RCALL_NUM_CPU', multiprocessing.cpu_count()))
+    budget = get_thread_budget()
+    if budget is not None:
+        num_cpu = budget.tf_threads if num_cpu is None else min(num_cpu, budget.tf_threads)
+    elif num_cpu is None:
+        num_cpu = int(os.getenv('RCALL_NUM_CPU', len(available_cpus())))
     tf_config = tf.ConfigProto(
         allow_soft_placement=True,
         inter_op_parallelism_threads=num_cpu,
@@ -371,6 +376,35 @@ class SetFromFlat(object):
             return self.sess.run(self.operation, feed_dict={self.theta: theta})
 
 
+class AddFromFlat(object):
+    def __init__(self, var_list, dtype=tf.float32, sess=None):
+        """
+        Add a flat vector to the parameters, in the graph (no round trip of the parameter values)
+
+        :param var_list: ([TensorFlow Tensor]) the variables
+        :param dtype: (type) the type for the placeholder
+        :param sess: (TensorFlow Session)
+        """
+        shapes = list(map(var_shape, var_list))
+        total_size = np.sum([intprod(shape) for shape in shapes])
+
+        self.delta = delta = tf.placeholder(dtype, [total_size])
+        start = 0
+        assigns = []
+        for (shape, _var) in zip(shapes, var_list):
+            size = intprod(shape)
+            assigns.append(tf.assign_add(_var, tf.reshape(delta[start:start + size], shape)))
+            start += size
+        self.operation = tf.group(*assigns)
+        self.sess = sess
+
+    def __call__(self, delta):
+        if self.sess is None:
+            return tf.get_default_session().run(self.operation, feed_dict={self.delta: delta})
+        else:
+            return self.sess.run(self.operation, feed_dict={self.delta: delta})
+
+
 class GetFlat(object):
     def __init__(self, var_list, sess=None):
         """
@@ -0,0 +1,174 @@
+"""
+Sharing the CPU cores of a machine between the TensorFlow session, the BLAS thread pools and the environment worker
+processes, to avoid oversubscribing the cores (every TensorFlow session and every BLAS library would otherwise use
+all of them, in every process).
+"""
+import os
+import multiprocessing
+
+from stable_baselines import logger
+
+# the environment variables read by the BLAS / OpenMP libraries when they are loaded
+BLAS_ENV_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+                      "NUMEXPR_NUM_THREADS")
+
+_THREAD_BUDGET = None
+
+
+def available_cpus():
+    """
+    the CPU cores this process may run on (its affinity if the platform supports it)
+
+    :return: ([int]) the ids of the cores
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(multiprocessing.cpu_count()))
+
+
+def limit_blas_threads(n_threads):
+    """
+    limits the BLAS / OpenMP thread pools of this process and of its future child processes.
+    The thread pools already created are only resized if the optional threadpoolctl package is installed.
+
+    :param n_threads: (int) the number of threads
+    """
+    for variable in BLAS_ENV_VARIABLES:
+        os.environ[variable] = str(n_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(n_threads)
+
+
+def pin_process(cpus):
+    """
+    restricts this process to some CPU cores (no-op on platforms without sched_setaffinity)
+
+    :param cpus: ([int]) the ids of the cores
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+
+class ThreadBudget(object):
+    def __init__(self, n_cpus=None, n_env_workers=0, env_cpus=None, tf_threads=None, blas_threads=None,
+                 pin_env_workers=False):
+        """
+        A layout of the CPU cores of the machine between the TensorFlow session, the BLAS threads and the environment
+        worker processes (SubprocVecEnv).
+
+        By default, the env workers get one core each, up to half of the cores, and the TensorFlow session gets the
+        other cores. Each env worker uses a single BLAS thread, the main process as many as TensorFlow.
+
+        :param n_cpus: (int) the number of cores to share (if None, the available cores of the process, or the
+            RCALL_NUM_CPU environment variable)
+        :param n_env_workers: (int) the number of environment worker processes
+        :param env_cpus: (int) the number of cores reserved for the env workers (if None, see above)
+        :param tf_threads: (int) the number of threads of the TensorFlow thread pools (if None, the cores that are not
+            reserved for the env workers)
+        :param blas_threads: (int) the number of BLAS threads of the main process (if None, tf_threads)
+        :param pin_env_workers: (bool) pin each env worker to one of the env cores, and the main process to the other
+            cores
+        """
+        cpus = available_cpus()
+        if n_cpus is None:
+            n_cpus = int(os.getenv('RCALL_NUM_CPU', len(cpus)))
+        if n_cpus < 1:
+            raise ValueError("Error: the thread budget needs at least one CPU, got {}".format(n_cpus))
+        # when asked for more cores than available, the ids wrap around
+        self.cpus = [cpus[i % len(cpus)] for i in range(n_cpus)]
+        self.n_cpus = n_cpus
+        self.n_env_workers = n_env_workers
+        if env_cpus is None:
+            env_cpus = min(n_env_workers, n_cpus // 2)
+        if not 0 <= env_cpus < n_cpus:
+            raise ValueError("Error: {} cores can not be reserved for the env workers out of {}".format(env_cpus, n_cpus))
+        self.env_cpus = env_cpus
+        self.tf_threads = tf_threads or n_cpus - env_cpus
+        self.blas_threads = blas_threads or self.tf_threads
+        self.pin_env_workers = pin_env_workers
+        # the main process gets the first cores, the env workers the last ones
+        self.main_cpus = self.cpus[:n_cpus - env_cpus]
+        self.worker_cpus = self.cpus[n_cpus - env_cpus:]
+
+    def env_worker_config(self, rank):
+        """
+        the configuration of an env worker process
+
+        :param rank: (int) the index of the worker
+        :return: (dict) the cores of the worker ('cpus', None if not pinned) and its number of BLAS threads
+            ('blas_threads'), see configure_env_worker
+        """
+        cpus = None
+        if self.pin_env_workers:
+            # more workers than env cores share them, without any env core all the workers share the main cores
+            pool = self.worker_cpus or self.main_cpus
+            cpus = [pool[rank % len(pool)]]
+        return dict(cpus=cpus, blas_threads=1)
+
+    def apply(self):
+        """
+        applies the budget to the current (main) process: BLAS threads and, if the env workers are pinned, affinity
+        """
+        limit_blas_threads(self.blas_threads)
+        if self.pin_env_workers:
+            pin_process(sorted(set(self.main_cpus)))
+
+    def describe(self):
+        """
+        :return: (str) a description of the layout
+        """
+        description = "{} CPUs: TensorFlow {} threads, BLAS {} threads".format(self.n_cpus, self.tf_threads,
+                                                                              self.blas_threads)
+        if self.n_env_workers > 0 or self.env_cpus > 0:
+            description += ", {} env workers on {} cores ({})".format(
+                self.n_env_workers, self.env_cpus, "pinned" if self.pin_env_workers else "not pinned")
+        return description
+
+
+def configure_env_worker(config):
+    """
+    applies the configuration of the thread budget in an env worker process
+
+    :param config: (dict) the configuration returned by ThreadBudget.env_worker_config (can be None)
+    """
+    if config is None:
+        return
+    limit_blas_threads(config['blas_threads'])
+    if config['cpus'] is not None:
+        pin_process(config['cpus'])
+
+
+def set_thread_budget(budget):
+    """
+    sets the thread budget of the process, respected by tf_util.make_session (and so by the models), SubprocVecEnv
+    and make_atari_env, and reports the layout in the logger
+
+    :param budget: (ThreadBudget) the budget (None to go back to the default behavior)
+    """
+    global _THREAD_BUDGET
+    _THREAD_BUDGET = budget
+    if budget is not None:
+        budget.apply()
+        logger.log("Thread budget: " + budget.describe())
+
+
+def configure_thread_budget(**kwargs):
+    """
+    creates and sets the thread budget of the process
+
+    :param kwargs: (dict) the parameters of ThreadBudget
+    :return: (ThreadBudget) the budget
+    """
+    budget = ThreadBudget(**kwargs)
+    set_thread_budget(budget)
+    return budget
+
+
+def get_thread_budget():
+    """
+    :return: (ThreadBudget) the thread budget of the process (None if not set)
+    """
+    return _THREAD_BUDGET
@@ -1,13 +1,25 @@
-from multiprocessing import Process, Pipe
+import os
+import time
+import signal
+import multiprocessing
 
 import numpy as np
 
+from stable_baselines import logger
 from stable_baselines.common.vec_env import VecEnv, CloudpickleWrapper
 from stable_baselines.common.tile_images import tile_images
+from stable_baselines.common.thread_budget import get_thread_budget, configure_env_worker
 
+# the modules imported by the forkserver of the workers, which stays free of TensorFlow
+FORKSERVER_PRELOAD = ('numpy', 'gym', 'stable_baselines.common.vec_env.subproc_vec_env')
+# the time (in seconds) given to the workers to finish their step and exit on close, when there is no step_timeout
+CLOSE_TIMEOUT = 10
 
-def _worker(remote, parent_remote, env_fn_wrapper):
+
+def _worker(remote, parent_remote, env_fn_wrapper, worker_config=None):
     parent_remote.close()
+    # BLAS threads and CPU affinity of the worker, from the thread budget
+    configure_env_worker(worker_config)
     env = env_fn_wrapper.var()
     while True:
         try:
@@ -37,52 +49,253 @@ class SubprocVecEnv(VecEnv):
     """
     Creates a multiprocess vectorized wrapper for multiple environments
 
+    If a thread budget is set (see common.thread_budget), the workers use a single BLAS thread and can be pinned to
+    the cores reserved for them.
+
+    The workers are started with the multiprocessing start method 'start_method':
+
+    - 'fork' (the default where available): the workers are copies of the main process (fast to start, but unsafe
+      once the TensorFlow runtime and its threads are running)
+    - 'forkserver': the workers are forked from a server process that only imported 'preload_modules' (the
+      environment modules), not from the main process and its TensorFlow runtime and threads
+    - 'spawn' (the default on Windows): the workers are new interpreters, which import the modules of the environment
+
+    With 'forkserver' and 'spawn', the environment functions are pickled (with cloudpickle), and the main script must
+    be protected by ``if __name__ == '__main__':``.
+
+    With auto_restart, a worker that crashes (e.g. an emulator or physics engine error) or does not answer a step
+    within step_timeout seconds is restarted from its environment function, the other workers are not affected.
+    The step of its environment ends the episode: the first observation of the new environment, a reward of 0,
+    done=True, and the info {'worker_restarted': True, 'worker_failure': 'crash' or 'timeout'}.
+    The restarts are counted by get_restart_stats. Without auto_restart, such a worker raises a RuntimeError.
+
     :param env_fns: ([Gym Environment]) Environments to run in subprocesses
+    :param start_method: (str) the multiprocessing start method of the workers: 'fork', 'forkserver' or 'spawn'
+        (if None, 'fork' where available, else 'spawn')
+    :param preload_modules: ([str]) the modules imported by the forkserver before forking the workers, e.g. the
+        module that registers the environments (gym and the worker code are always preloaded)
+    :param auto_restart: (bool) restart the workers that crash or time out, instead of raising an error
+    :param step_timeout: (float) the time (in seconds) given to the workers to answer a step or a reset
+        (if None, no timeout: only the crashed workers are detected), and to exit on close (if None, CLOSE_TIMEOUT)
+    :param restart_timeout: (float) the time (in seconds) given to a restarted worker to create and reset its
+        environment (if None, no timeout)
     """
 
-    def __init__(self, env_fns):
+    def __init__(self, env_fns, start_method=None, preload_modules=None, auto_restart=False, step_timeout=None,
+                 restart_timeout=None):
         self.waiting = False
         self.closed = False
+        self.auto_restart = auto_restart
+        self.step_timeout = step_timeout
+        self.restart_timeout = restart_timeout
         n_envs = len(env_fns)
-        self.remotes, self.work_remotes = zip(*[Pipe() for _ in range(n_envs)])
-        self.processes = [Process(target=_worker, args=(work_remote, remote, CloudpickleWrapper(env_fn)))
-                          for (work_remote, remote, env_fn) in zip(self.work_remotes, self.remotes, env_fns)]
-        for process in self.processes:
-            process.daemon = True  # if the main process crashes, we should not cause things to hang
-            process.start()
-        for remote in self.work_remotes:
-            remote.close()
+        if start_method is None:
+            # forkserver and spawn are opt-in: they need the main script to be protected by `if __name__ == '__main__'`
+            start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        if start_method not in multiprocessing.get_all_start_methods():
+            raise ValueError("Error: the start method '{}' is not available, expected one of {}"
+                             .format(start_method, multiprocessing.get_all_start_methods()))
+        self.start_method = start_method
+        self.context = multiprocessing.get_context(start_method)
+        if start_method == 'forkserver':
+            # only used when the forkserver starts, i.e. before its first worker
+            self.context.set_forkserver_preload(list(FORKSERVER_PRELOAD) + list(preload_modules or []))
+        budget = get_thread_budget()
+        self.worker_configs = [budget.env_worker_config(rank) if budget is not None else None
+                               for rank in range(n_envs)]
+        self.env_fns = [CloudpickleWrapper(env_fn) for env_fn in env_fns]
+        self.remotes = [None] * n_envs
+        self.processes = [None] * n_envs
+        self.restart_counts = np.zeros(n_envs, dtype=np.int64)
+        self.n_crashes = 0
+        self.n_timeouts = 0
+        # the workers that could not receive their last command
+        self._failed_workers = {}
+        for index in range(n_envs):
+            self._start_worker(index)
 
         self.remotes[0].send(('get_spaces', None))
         observation_space, action_space = self.remotes[0].recv()
         VecEnv.__init__(self, len(env_fns), observation_space, action_space)
 
+    def _start_worker(self, index):
+        """
+        starts the worker process of an environment, from its environment function
+
+        :param index: (int) the index of the environment
+        """
+        remote, work_remote = self.context.Pipe()
+        process = self.context.Process(target=_worker, args=(work_remote, remote, self.env_fns[index],
+                                                             self.worker_configs[index]))
+        process.daemon = True  # if the main process crashes, we should not cause things to hang
+        process.start()
+        work_remote.close()
+        self.remotes[index] = remote
+        self.processes[index] = process
+
+    def _stop_worker(self, index):
+        """
+        stops the worker process of an environment, without waiting for it to finish its command
+
+        :param index: (int) the index of the environment
+        """
+        process = self.processes[index]
+        if process.is_alive():
+            process.terminate()
+            process.join(1)
+        if process.is_alive():
+            # a worker stuck in native code can ignore SIGTERM
+            if hasattr(process, 'kill'):
+                process.kill()
+            elif hasattr(signal, 'SIGKILL'):
+                os.kill(process.pid, signal.SIGKILL)
+        process.join()
+        self.remotes[index].close()
+
+    def get_dead_workers(self):
+        """
+        :return: ([int]) the indices of the environments whose worker process is no longer running (e.g. it crashed)
+        """
+        return [index for index, process in enumerate(self.processes) if not process.is_alive()]
+
+    def restart_worker(self, index):
+        """
+        stops the worker of an environment (if still running), starts a new one from the environment function and
+        resets its environment. The other workers are not affected.
+
+        Can not be called between step_async and step_wait.
+
+        :param index: (int) the index of the environment
+        :return: (np.ndarray) the first observation of the new environment
+        """
+        if self.waiting:
+            raise ValueError("Error: a worker can not be restarted while waiting for a step")
+        self._stop_worker(index)
+        self._start_worker(index)
+        self.restart_counts[index] += 1
+        self._failed_workers.pop(index, None)
+        self.remotes[index].send(('reset', None))
+        deadline = None if self.restart_timeout is None else time.time() + self.restart_timeout
+        answered, observation = self._recv(index, deadline)
+        if not answered:
+            raise RuntimeError("Error: the restarted worker of the environment {} failed to reset ({})"
+                               .format(index, observation))
+        return observation
+
+    def get_restart_stats(self):
+        """
+        the restart metrics of the workers, e.g. to log them with logger.logkvs
+
+        :return: (dict) the total number of restarts ('env_restarts'), of crashes ('env_crashes') and of timeouts
+            ('env_timeouts') of the workers, and the number of environments restarted at least once
+            ('envs_restarted')
+        """
+        return {'env_restarts': int(self.restart_counts.sum()), 'env_crashes': self.n_crashes,
+                'env_timeouts': self.n_timeouts, 'envs_restarted': int(np.count_nonzero(self.restart_counts))}
+
+    def _send(self, index, command):
+        """
+        sends a command to a worker, a worker that crashed is remembered as failed
+
+        :param index: (int) the index of the environment
+        :param command: ((str, Any)) the command and its data
+        """
+        try:
+            self.remotes[index].send(command)
+        except (BrokenPipeError, ConnectionResetError):
+            self._failed_workers[index] = 'crash'
+
+    def _recv(self, index, deadline=None):
+        """
+        receives the answer of a worker to its last command
+
+        :param index: (int) the index of the environment
+        :param deadline: (float) the time (time.time()) after which the worker has timed out (None for no timeout)
+        :return: (bool, Any) whether the worker answered, and its answer (or the failure: 'crash' or 'timeout')
+        """
+        if index in self._failed_workers:
+            return False, self._failed_workers.pop(index)
+        remote = self.remotes[index]
+        try:
+            if not remote.poll(None if deadline is None else max(deadline - time.time(), 0)):
+                return False, 'timeout'
+            return True, remote.recv()
+        except (EOFError, ConnectionResetError):
+            return False, 'crash'
+
+    def _gather(self, command_name):
+        """
+        receives the answers of all the workers, and counts the failed workers (which raise an error without
+        auto_restart)
+
+        :param command_name: (str) the command sent to the workers ('step' or 'reset')
+        :return: ([Any], [(int, str)]) the answers of the workers (None for a failed worker), and the index and the
+            failure ('crash' or 'timeout') of each failed worker
+        """
+        deadline = None if self.step_timeout is None else time.time() + self.step_timeout
+        answers = []
+        failures = []
+        for index in range(len(self.remotes)):
+            answered, answer = self._recv(index, deadline)
+            answers.append(answer if answered else None)
+            if not answered:
+                failures.append((index, answer))
+        for index, failure in failures:
+            if not self.auto_restart:
+                raise RuntimeError("Error: the worker of the environment {} failed during a {} ({})"
+                                   .format(index, command_name, failure))
+            if failure == 'timeout':
+                self.n_timeouts += 1
+            else:
+                self.n_crashes += 1
+            logger.warn("Restarting the worker of the environment {} after a {} during a {}"
+                        .format(index, failure, command_name))
+        return answers, failures
+
     def step_async(self, actions):
-        for remote, action in zip(self.remotes, actions):
-            remote.send(('step', action))
+        for index, action in enumerate(actions):
+            self._send(index, ('step', action))
         self.waiting = True
 
     def step_wait(self):
-        results = [remote.recv() for remote in self.remotes]
+        # all the answers are received, even if a worker failed
         self.waiting = False
+        results, failures = self._gather('step')
+        for index, failure in failures:
+            observation = self.restart_worker(index)
+            results[index] = (observation, 0.0, True, {'worker_restarted': True, 'worker_failure': failure})
         obs, rews, dones, infos = zip(*results)
         return np.stack(obs), np.stack(rews), np.stack(dones), infos
 
     def reset(self):
-        for remote in self.remotes:
-            remote.send(('reset', None))
-        return np.stack([remote.recv() for remote in self.remotes])
+        for index in range(len(self.remotes)):
+            self._send(index, ('reset', None))
+        obs, failures = self._gather('reset')
+        for index, _ in failures:
+            obs[index] = self.restart_worker(index)
+        return np.stack(obs)
 
     def close(self):
         if self.closed:
             return
+        timeout = self.step_timeout if self.step_timeout is not None else CLOSE_TIMEOUT
         if self.waiting:
-            for remote in self.remotes:
-                remote.recv()
-        for remote in self.remotes:
-            remote.send(('close', None))
-        for process in self.processes:
-            process.join()
+            deadline = time.time() + timeout
+            for index in range(len(self.remotes)):
+                self._recv(index, deadline)
+        for remote, process in zip(self.remotes, self.processes):
+            # a crashed worker can not receive the command
+            if process.is_alive():
+                try:
+                    remote.send(('close', None))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+        deadline = time.time() + timeout
+        for index, process in enumerate(self.processes):
+            process.join(max(deadline - time.time(), 0))
+            if process.is_alive():
+                # a worker stuck in its environment
+                self._stop_worker(index)
         self.closed = True
 
     def render(self, mode='human', *args, **kwargs):
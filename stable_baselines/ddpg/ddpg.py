@@ -8,11 +8,11 @@ import gym
 import numpy as np
 import tensorflow as tf
 import tensorflow.contrib as tc
-from mpi4py import MPI
 
 from stable_baselines import logger
 from stable_baselines.common import tf_util, OffPolicyRLModel, SetVerbosity, TensorboardWriter
 from stable_baselines.common.vec_env import VecEnv
+from stable_baselines.common.comm import SUM, get_default_comm
 from stable_baselines.common.mpi_adam import MpiAdam
 from stable_baselines.ddpg.policies import DDPGPolicy
 from stable_baselines.common.mpi_running_mean_std import RunningMeanStd
@@ -257,7 +257,6 @@ class DDPG(OffPolicyRLModel):
         self.params = None
         self.summary = None
         self.episode_reward = None
-        self.tb_seen_steps = None
 
         if _init_setup_model:
             self.setup_model()
@@ -579,13 +578,12 @@ class DDPG(OffPolicyRLModel):
         if self.normalize_observations:
             self.obs_rms.update(np.array([obs0]))
 
-    def _train_step(self, step, writer, log=False):
+    def _train_step(self, step, writer):
         """
         run a step of training from batch
 
         :param step: (int) the current step iteration
         :param writer: (TensorFlow Summary.writer) the writer for tensorboard
-        :param log: (bool) whether or not to log to metadata
         :return: (float, float) critic loss, actor loss
         """
         # Get a batch
@@ -621,23 +619,15 @@ class DDPG(OffPolicyRLModel):
             self.critic_target: target_q,
             self.param_noise_stddev: 0 if self.param_noise is None else self.param_noise.current_stddev
         }
+        run_kwargs = self.profiling.start_step()
         if writer is not None:
-            # run loss backprop with summary if the step_id was not already logged (can happen with the right
-            # parameters as the step value is only an estimate)
-            if log and step not in self.tb_seen_steps:
-                run_options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
-                run_metadata = tf.RunMetadata()
-                summary, actor_grads, actor_loss, critic_grads, critic_loss = \
-                    self.sess.run([self.summary] + ops, td_map, options=run_options, run_metadata=run_metadata)
-
-                writer.add_run_metadata(run_metadata, 'step%d' % step)
-                self.tb_seen_steps.append(step)
-            else:
-                summary, actor_grads, actor_loss, critic_grads, critic_loss = self.sess.run([self.summary] + ops,
-                                                                                            td_map)
+            summary, actor_grads, actor_loss, critic_grads, critic_loss = self.sess.run([self.summary] + ops, td_map,
+                                                                                        **run_kwargs)
             writer.add_summary(summary, step)
         else:
-            actor_grads, actor_loss, critic_grads, critic_loss = self.sess.run(ops, td_map)
+            actor_grads, actor_loss, critic_grads, critic_loss = self.sess.run(ops, td_map, **run_kwargs)
+        # the step is estimated and can repeat, end_step makes the names of the traces unique
+        self.profiling.end_step(run_kwargs, step, writer)
 
         self.actor_optimizer.update(actor_grads, learning_rate=self.actor_lr)
         self.critic_optimizer.update(critic_grads, learning_rate=self.critic_lr)
@@ -715,7 +705,7 @@ class DDPG(OffPolicyRLModel):
             self.param_noise_stddev: self.param_noise.current_stddev,
         })
 
-        mean_distance = MPI.COMM_WORLD.allreduce(distance, op=MPI.SUM) / MPI.COMM_WORLD.Get_size()
+        mean_distance = get_default_comm().allreduce(distance, op=SUM) / get_default_comm().Get_size()
         self.param_noise.adapt(mean_distance)
         return mean_distance
 
@@ -734,10 +724,7 @@ class DDPG(OffPolicyRLModel):
         with SetVerbosity(self.verbose), TensorboardWriter(self.graph, self.tensorboard_log, tb_log_name) as writer:
             self._setup_learn(seed)
 
-            # a list for tensorboard logging, to prevent logging with the same step number, if it already occured
-            self.tb_seen_steps = []
-
-            rank = MPI.COMM_WORLD.Get_rank()
+            rank = get_default_comm().Get_rank()
             # we assume symmetric actions.
             assert np.all(np.abs(self.env.action_space.low) == self.env.action_space.high)
             if self.verbose >= 2:
@@ -839,7 +826,7 @@ class DDPG(OffPolicyRLModel):
                             step = (int(t_train * (self.nb_rollout_steps / self.nb_train_steps)) +
                                     total_steps - self.nb_rollout_steps)
 
-                            critic_loss, actor_loss = self._train_step(step, writer, log=t_train == 0)
+                            critic_loss, actor_loss = self._train_step(step, writer)
                             epoch_critic_losses.append(critic_loss)
                             epoch_actor_losses.append(actor_loss)
                             self._update_target_net()
@@ -868,7 +855,7 @@ class DDPG(OffPolicyRLModel):
                                     eval_episode_rewards_history.append(eval_episode_reward)
                                     eval_episode_reward = 0.
 
-                    mpi_size = MPI.COMM_WORLD.Get_size()
+                    mpi_size = get_default_comm().Get_size()
                     # Log stats.
                     # XXX shouldn't call np.mean on variable length lists
                     duration = time.time() - start_time
@@ -910,7 +897,7 @@ class DDPG(OffPolicyRLModel):
                         else:
                             raise ValueError('expected scalar, got %s' % scalar)
 
-                    combined_stats_sums = MPI.COMM_WORLD.allreduce(
+                    combined_stats_sums = get_default_comm().allreduce(
                         np.array([as_scalar(x) for x in combined_stats.values()]))
                     combined_stats = {k: v / mpi_size for (k, v) in zip(combined_stats.keys(), combined_stats_sums)}
 
@@ -1002,9 +989,6 @@ class DDPG(OffPolicyRLModel):
         model.set_env(env)
         model.setup_model()
 
-        restores = []
-        for param, loaded_p in zip(model.params, params):
-            restores.append(param.assign(loaded_p))
-        model.sess.run(restores)
+        model.load_parameters(params)
 
         return model
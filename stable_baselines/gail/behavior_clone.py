@@ -16,7 +16,7 @@ from stable_baselines.common import set_global_seeds, tf_util
 from stable_baselines.common.misc_util import boolean_flag
 from stable_baselines.common.mpi_adam import MpiAdam
 from stable_baselines.gail.run_mujoco import runner
-from stable_baselines.gail.dataset.mujocodset import MujocoDset
+from stable_baselines.gail.dataset.expert_dataset import load_expert_dataset
 
 
 def argsparser():
@@ -28,7 +28,8 @@ def argsparser():
     parser = argparse.ArgumentParser("Tensorflow Implementation of Behavior Cloning")
     parser.add_argument('--env_id', help='environment ID', default='Hopper-v1')
     parser.add_argument('--seed', help='RNG seed', type=int, default=0)
-    parser.add_argument('--expert_path', type=str, default='data/deterministic.trpo.Hopper.0.00.npz')
+    parser.add_argument('--expert_path', type=str, default='data/deterministic.trpo.Hopper.0.00.npz',
+                        help='.npz file or expert dataset directory')
     parser.add_argument('--checkpoint_dir', help='the directory to save model', default='checkpoint')
     parser.add_argument('--log_dir', help='the directory to save log file', default='log')
     #  Mujoco Dataset Configuration
@@ -49,7 +50,7 @@ def learn(env, policy_func, dataset, optim_batch_size=128, max_iters=1e4, adam_e
 
     :param env: (Gym Environment) the environment
     :param policy_func: (function (str, Gym Space, Gym Space): TensorFlow Tensor) creates the policy
-    :param dataset: (Dset or MujocoDset) the dataset manager
+    :param dataset: (Dset, MujocoDset or ExpertDataset) the dataset manager
     :param optim_batch_size: (int) the batch size
     :param max_iters: (int) the maximum number of iterations
     :param adam_epsilon: (float) the epsilon value for the adam optimizer
@@ -127,7 +128,7 @@ def main(args):
         task_name = get_task_name(args)
         args.checkpoint_dir = os.path.join(args.checkpoint_dir, task_name)
         args.log_dir = os.path.join(args.log_dir, task_name)
-        dataset = MujocoDset(expert_path=args.expert_path, traj_limitation=args.traj_limitation)
+        dataset = load_expert_dataset(args.expert_path, traj_limitation=args.traj_limitation)
         savedir_fname = learn(env, policy_fn, dataset, max_iters=args.BC_max_iter, ckpt_dir=args.checkpoint_dir,
                               task_name=task_name, verbose=True)
         runner(env,
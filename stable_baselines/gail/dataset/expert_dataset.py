@@ -0,0 +1,298 @@
+"""
+Memory mapped expert trajectories, for large (e.g. image based) demonstrations.
+
+A dataset is a directory with:
+
+- ``metadata.json``: the format version, the number of transitions and episodes, and the shape and dtype of
+  the fields
+- one uncompressed array per field (``obs``, ``acs``, ``rews``), the transitions of all the episodes one after the
+  other: either a single ``<field>.npy`` file, or a ``<field>/`` directory of ``.npy`` chunks (sorted by name)
+- ``episode_starts.npy``: the index of the first transition of each episode, followed by the number of transitions
+- ``episode_returns.npy``: the return of each episode
+
+The arrays are memory mapped, so only the sampled minibatches are read from the disk.
+"""
+import os
+import json
+import glob
+import argparse
+
+import numpy as np
+
+from stable_baselines.gail.dataset.mujocodset import MujocoDset
+
+FORMAT_VERSION = 1
+FIELDS = ('obs', 'acs', 'rews')
+
+
+class ChunkedArray(object):
+    def __init__(self, chunks):
+        """
+        Read only array made of chunks (e.g. memory mapped files) concatenated along the first axis
+
+        :param chunks: ([np.ndarray]) the chunks, with the same shape except along the first axis
+        """
+        assert len(chunks) > 0, "Error: a chunked array needs at least one chunk"
+        self.chunks = chunks
+        self.offsets = np.cumsum([0] + [len(chunk) for chunk in chunks])
+        self.shape = (int(self.offsets[-1]),) + chunks[0].shape[1:]
+        self.dtype = chunks[0].dtype
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _row(self, index):
+        """
+        :param index: (int) the index of a row (negative indices count from the end)
+        :return: (np.ndarray) the row, from the chunk that contains it
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Error: index {} is out of bounds for a chunked array of length {}".format(index,
+                                                                                                      len(self)))
+        chunk_id = np.searchsorted(self.offsets, index, side='right') - 1
+        return self.chunks[chunk_id][index - self.offsets[chunk_id]]
+
+    def take(self, indices, axis=0, out=None, mode='raise'):
+        """
+        gathers rows of the array (same signature as np.ndarray.take, so np.take works on a ChunkedArray)
+
+        :param indices: (np.ndarray) the indices of the rows
+        :param axis: (int) must be 0
+        :param out: (np.ndarray) the output array (if None, a new array)
+        :param mode: (str) how out of bounds indices are handled, see np.take
+        :return: (np.ndarray) the rows
+        """
+        assert axis == 0, "Error: a chunked array can only be indexed along the first axis"
+        indices = np.asarray(indices)
+        if len(self.chunks) == 1:
+            return np.take(self.chunks[0], indices, axis=0, out=out, mode=mode)
+        if indices.ndim == 0:
+            row = self._row(int(indices))
+            if out is None:
+                return row
+            out[...] = row
+            return out
+        if out is None:
+            out = np.empty((len(indices),) + self.shape[1:], dtype=self.dtype)
+        chunk_ids = np.searchsorted(self.offsets, indices, side='right') - 1
+        for chunk_id in np.unique(chunk_ids):
+            mask = chunk_ids == chunk_id
+            out[mask] = self.chunks[chunk_id][indices[mask] - self.offsets[chunk_id]]
+        return out
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return self._row(int(item))
+        if not isinstance(item, slice):
+            return self.take(np.arange(len(self))[item])
+        start, stop, step = item.indices(len(self))
+        assert step == 1, "Error: a chunked array can only be sliced with a step of 1"
+        parts = []
+        for chunk, chunk_start, chunk_end in zip(self.chunks, self.offsets[:-1], self.offsets[1:]):
+            if chunk_end > start and chunk_start < stop:
+                parts.append(chunk[max(start - chunk_start, 0):min(stop, chunk_end) - chunk_start])
+        if len(parts) == 1:
+            return parts[0]
+        if len(parts) == 0:
+            return np.empty((0,) + self.shape[1:], dtype=self.dtype)
+        return np.concatenate(parts)
+
+
+def _load_field(save_dir, field, mmap_mode):
+    """
+    memory maps a field, saved as a single .npy file or a directory of chunks
+
+    :param save_dir: (str) the dataset directory
+    :param field: (str) the name of the field
+    :param mmap_mode: (str) the np.load memory map mode (None to load in memory)
+    :return: (ChunkedArray) the field
+    """
+    path = os.path.join(save_dir, field + '.npy')
+    if os.path.isfile(path):
+        return ChunkedArray([np.load(path, mmap_mode=mmap_mode)])
+    paths = sorted(glob.glob(os.path.join(save_dir, field, '*.npy')))
+    if len(paths) == 0:
+        raise ValueError("Error: the field '{}' was not found in {}".format(field, save_dir))
+    return ChunkedArray([np.load(chunk_path, mmap_mode=mmap_mode) for chunk_path in paths])
+
+
+class ExpertDatasetWriter(object):
+    def __init__(self, save_dir, chunk_size=10000):
+        """
+        Writes expert episodes to a memory mappable dataset directory, by chunks of transitions, so the episodes
+        never have to be all in memory.
+
+        :param save_dir: (str) the dataset directory (created if needed, must not contain a dataset)
+        :param chunk_size: (int) the minimum number of transitions per chunk file
+        """
+        if os.path.exists(os.path.join(save_dir, 'metadata.json')):
+            raise ValueError("Error: {} already contains a dataset".format(save_dir))
+        self.save_dir = save_dir
+        self.chunk_size = chunk_size
+        self.n_transitions = 0
+        self.episode_starts = [0]
+        self.episode_returns = []
+        self.fields = None
+        self._pending = {field: [] for field in FIELDS}
+        self._n_pending = 0
+        self._n_chunks = 0
+        for field in FIELDS:
+            os.makedirs(os.path.join(save_dir, field), exist_ok=True)
+
+    def add_episode(self, obs, actions, rewards, episode_return=None):
+        """
+        adds an episode to the dataset
+
+        :param obs: (np.ndarray) the observations of the episode
+        :param actions: (np.ndarray) the actions of the episode
+        :param rewards: (np.ndarray) the rewards of the episode
+        :param episode_return: (float) the return of the episode (if None, the sum of the rewards)
+        """
+        episode = dict(obs=np.asarray(obs), acs=np.asarray(actions), rews=np.asarray(rewards))
+        n_steps = len(episode['obs'])
+        if any(len(arr) != n_steps for arr in episode.values()):
+            raise ValueError("Error: the observations, actions and rewards of an episode must have the same length")
+        if self.fields is None:
+            self.fields = {field: dict(shape=list(arr.shape[1:]), dtype=arr.dtype.str) for field, arr in episode.items()}
+        for field, arr in episode.items():
+            if list(arr.shape[1:]) != self.fields[field]['shape']:
+                raise ValueError("Error: the shape of '{}' changed from {} to {}".format(
+                    field, self.fields[field]['shape'], list(arr.shape[1:])))
+            self._pending[field].append(arr.astype(self.fields[field]['dtype'], copy=False))
+
+        self.n_transitions += n_steps
+        self.episode_starts.append(self.n_transitions)
+        self.episode_returns.append(float(np.sum(episode['rews'])) if episode_return is None else episode_return)
+        self._n_pending += n_steps
+        if self._n_pending >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        """
+        writes the pending transitions in a new chunk
+        """
+        if self._n_pending == 0:
+            return
+        for field in FIELDS:
+            np.save(os.path.join(self.save_dir, field, '{:06d}.npy'.format(self._n_chunks)),
+                    np.concatenate(self._pending[field]))
+            self._pending[field] = []
+        self._n_pending = 0
+        self._n_chunks += 1
+
+    def close(self):
+        """
+        writes the last chunk and the metadata, the dataset can only be loaded after this call
+        """
+        if self.fields is None:
+            raise ValueError("Error: the dataset is empty")
+        self._flush()
+        np.save(os.path.join(self.save_dir, 'episode_starts.npy'), np.array(self.episode_starts, dtype=np.int64))
+        np.save(os.path.join(self.save_dir, 'episode_returns.npy'), np.array(self.episode_returns, dtype=np.float64))
+        metadata = dict(format_version=FORMAT_VERSION, n_transitions=self.n_transitions,
+                        n_episodes=len(self.episode_returns), fields=self.fields)
+        with open(os.path.join(self.save_dir, 'metadata.json'), 'w') as file_handler:
+            json.dump(metadata, file_handler, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+
+
+class ExpertDataset(MujocoDset):
+    def __init__(self, expert_path, train_fraction=0.7, traj_limitation=-1, randomize=True, mmap_mode='r'):
+        """
+        Memory mapped expert dataset, with the same interface as MujocoDset: the train and val splits are index
+        ranges of the same arrays, and only the sampled minibatches are read from the disk.
+
+        When pickled (e.g. saved with a GAIL model), only the path and the parameters are stored: the directory must
+        still exist when loading.
+
+        :param expert_path: (str) the dataset directory
+        :param train_fraction: (float) the train val split (0 to 1)
+        :param traj_limitation: (int) the number of episodes to use (if -1, use all)
+        :param randomize: (bool) if the dataset should be shuffled
+        :param mmap_mode: (str) the np.load memory map mode (None to load the arrays in memory)
+        """
+        # pylint: disable=super-init-not-called
+        self.expert_path = expert_path
+        self.train_fraction = train_fraction
+        self.traj_limitation = traj_limitation
+        self.mmap_mode = mmap_mode
+        metadata_path = os.path.join(expert_path, 'metadata.json')
+        if not os.path.isfile(metadata_path):
+            raise ValueError("Error: {} is not an expert dataset directory (no metadata.json)".format(expert_path))
+        with open(metadata_path) as file_handler:
+            self.metadata = json.load(file_handler)
+        if self.metadata['format_version'] > FORMAT_VERSION:
+            raise ValueError("Error: unsupported expert dataset format version {}".format(
+                self.metadata['format_version']))
+
+        self.obs = _load_field(expert_path, 'obs', mmap_mode)
+        self.acs = _load_field(expert_path, 'acs', mmap_mode)
+        if len(self.obs) != self.metadata['n_transitions'] or len(self.acs) != self.metadata['n_transitions']:
+            raise ValueError("Error: the expert dataset {} is truncated".format(expert_path))
+        self.episode_starts = np.load(os.path.join(expert_path, 'episode_starts.npy'))
+
+        n_episodes = self.metadata['n_episodes']
+        self.num_traj = n_episodes if traj_limitation < 0 else min(traj_limitation, n_episodes)
+        self.num_transition = int(self.episode_starts[self.num_traj])
+        self.rets = np.load(os.path.join(expert_path, 'episode_returns.npy'))[:self.num_traj]
+        self.avg_ret = np.mean(self.rets)
+        self.std_ret = np.std(self.rets)
+        self.randomize = randomize
+        self._init_splits(train_fraction)
+        self.log_info()
+
+    def __getstate__(self):
+        return dict(expert_path=self.expert_path, train_fraction=self.train_fraction,
+                    traj_limitation=self.traj_limitation, randomize=self.randomize, mmap_mode=self.mmap_mode)
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def load_expert_dataset(expert_path, **kwargs):
+    """
+    loads expert trajectories, from an expert dataset directory or from a .npz file
+
+    :param expert_path: (str) the path to trajectory data
+    :param kwargs: (dict) the arguments of the dataset (train_fraction, traj_limitation, randomize)
+    :return: (ExpertDataset or MujocoDset) the dataset manager object
+    """
+    if os.path.isdir(expert_path):
+        return ExpertDataset(expert_path, **kwargs)
+    return MujocoDset(expert_path, **kwargs)
+
+
+def convert_npz_to_expert_dataset(npz_path, save_dir, chunk_size=10000):
+    """
+    converts expert trajectories from the .npz layout (arrays 'obs', 'acs', 'rews' and 'ep_rets', with one row per
+    episode) to an expert dataset directory, one episode at a time
+
+    :param npz_path: (str) the path of the .npz file
+    :param save_dir: (str) the dataset directory
+    :param chunk_size: (int) the minimum number of transitions per chunk file
+    """
+    traj_data = np.load(npz_path)
+    obs, acs, ep_rets = traj_data['obs'], traj_data['acs'], traj_data['ep_rets']
+    rews = traj_data['rews'] if 'rews' in traj_data else None
+    with ExpertDatasetWriter(save_dir, chunk_size=chunk_size) as writer:
+        for i in range(len(obs)):
+            ep_obs = np.asarray(obs[i])
+            ep_rews = np.zeros(len(ep_obs), dtype=np.float32) if rews is None else np.asarray(rews[i])
+            writer.add_episode(ep_obs, np.asarray(acs[i]), ep_rews, episode_return=float(ep_rets[i]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("Convert expert trajectories from .npz to a memory mappable dataset")
+    parser.add_argument('npz_path', type=str)
+    parser.add_argument('save_dir', type=str)
+    parser.add_argument('--chunk_size', type=int, default=10000)
+    args = parser.parse_args()
+    convert_npz_to_expert_dataset(args.npz_path, args.save_dir, chunk_size=args.chunk_size)
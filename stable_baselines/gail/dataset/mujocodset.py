@@ -6,25 +6,34 @@ a transition can be: (data['obs'][t], data['acs'][t], data['obs'][t+1]) and get
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
 
 from stable_baselines import logger
+from stable_baselines.common.dataset import BatchBuffers
 
 
 class Dset(object):
-    def __init__(self, inputs, labels, randomize):
+    def __init__(self, inputs, labels, randomize, start=0, end=None):
         """
-        Dataset object
+        Dataset object, only the order of the samples is shuffled and the batches are gathered into a reusable
+        buffer: a batch is only valid until the next call to get_next_batch, copy it to keep it.
 
-        :param inputs: (np.ndarray) the input values
-        :param labels: (np.ndarray) the target values
+        :param inputs: (np.ndarray or ChunkedArray) the input values
+        :param labels: (np.ndarray or ChunkedArray) the target values
         :param randomize: (bool) if the dataset should be shuffled
+        :param start: (int) the index of the first sample of the dataset in the arrays
+        :param end: (int) the index after the last sample of the dataset in the arrays (if None, the end of the arrays)
         """
+        assert len(inputs) == len(labels)
+        if end is None:
+            end = len(inputs)
         self.inputs = inputs
         self.labels = labels
-        assert len(self.inputs) == len(self.labels)
+        self.start = start
+        self.end = end
         self.randomize = randomize
-        self.num_pairs = len(inputs)
+        self.num_pairs = end - start
+        self.indices = np.arange(start, end)
+        self._buffers = BatchBuffers()
         self.init_pointer()
 
     def init_pointer(self):
@@ -33,10 +42,7 @@ class Dset(object):
         """
         self.pointer = 0
         if self.randomize:
-            idx = np.arange(self.num_pairs)
-            np.random.shuffle(idx)
-            self.inputs = self.inputs[idx, :]
-            self.labels = self.labels[idx, :]
+            np.random.shuffle(self.indices)
 
     def get_next_batch(self, batch_size):
         """
@@ -47,12 +53,17 @@ class Dset(object):
         """
         # if batch_size is negative -> return all
         if batch_size < 0:
-            return self.inputs, self.labels
+            return self.inputs[self.start:self.end], self.labels[self.start:self.end]
         if self.pointer + batch_size >= self.num_pairs:
             self.init_pointer()
         end = self.pointer + batch_size
-        inputs = self.inputs[self.pointer:end, :]
-        labels = self.labels[self.pointer:end, :]
+        if not self.randomize:
+            inputs = self.inputs[self.start + self.pointer:self.start + end]
+            labels = self.labels[self.start + self.pointer:self.start + end]
+        else:
+            # the order within a batch does not matter, sorted indices read memory mapped arrays sequentially
+            indices = np.sort(self.indices[self.pointer:end])
+            inputs, labels = self._buffers.gather([self.inputs, self.labels], indices)
         self.pointer = end
         return inputs, labels
 
@@ -88,16 +99,21 @@ class MujocoDset(object):
         self.num_traj = min(traj_limitation, len(traj_data['obs']))
         self.num_transition = len(self.obs)
         self.randomize = randomize
-        self.dset = Dset(self.obs, self.acs, self.randomize)
-        # for behavior cloning
-        self.train_set = Dset(self.obs[:int(self.num_transition*train_fraction), :],
-                              self.acs[:int(self.num_transition*train_fraction), :],
-                              self.randomize)
-        self.val_set = Dset(self.obs[int(self.num_transition*train_fraction):, :],
-                            self.acs[int(self.num_transition*train_fraction):, :],
-                            self.randomize)
+        self._init_splits(train_fraction)
         self.log_info()
 
+    def _init_splits(self, train_fraction):
+        """
+        create the full, train and val datasets, as index ranges of the same arrays
+
+        :param train_fraction: (float) the train val split (0 to 1)
+        """
+        n_train = int(self.num_transition * train_fraction)
+        self.dset = Dset(self.obs, self.acs, self.randomize, end=self.num_transition)
+        # for behavior cloning
+        self.train_set = Dset(self.obs, self.acs, self.randomize, end=n_train)
+        self.val_set = Dset(self.obs, self.acs, self.randomize, start=n_train, end=self.num_transition)
+
     def log_info(self):
         """
         log the information of the dataset
@@ -128,6 +144,8 @@ class MujocoDset(object):
         """
         show and save (to 'histogram_rets.png') a histogram plotting of the episode returns
         """
+        import matplotlib.pyplot as plt
+
         plt.hist(self.rets)
         plt.savefig("histogram_rets.png")
         plt.close()
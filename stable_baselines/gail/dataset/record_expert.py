@@ -0,0 +1,126 @@
+"""
+Records expert trajectories of a trained model, on several environments in parallel
+"""
+import time
+import argparse
+
+import numpy as np
+
+from stable_baselines import logger
+from stable_baselines.common.vec_env import VecEnv
+from stable_baselines.gail.dataset.expert_dataset import ExpertDatasetWriter
+
+
+def record_expert_trajectories(model, save_dir, n_episodes, env=None, deterministic=True, chunk_size=10000,
+                               log_interval=100):
+    """
+    Runs a trained model on a VecEnv (one batched predict per step for all the environments), and streams the
+    completed episodes to an expert dataset directory (see gail.dataset.expert_dataset).
+
+    Only the episodes in progress and one chunk of transitions are kept in memory. The recording stops when
+    n_episodes episodes are completed, the episodes still in progress are discarded.
+
+    :param model: (BaseRLModel) the trained model (a recurrent model must have been created with env.num_envs envs)
+    :param save_dir: (str) the dataset directory
+    :param n_episodes: (int) the number of episodes to record
+    :param env: (VecEnv) the environments (SubprocVecEnv, DummyVecEnv, ...), if None the environment of the model
+    :param deterministic: (bool) whether to record the deterministic actions of the model
+    :param chunk_size: (int) the minimum number of transitions per chunk file
+    :param log_interval: (int) the number of episodes between two logs of the throughput (None to disable)
+    :return: (dict) the number of episodes and transitions, the mean return, the time and the throughput
+    """
+    if env is None:
+        env = model.get_env()
+    if not isinstance(env, VecEnv):
+        raise ValueError("Error: the expert trajectories are recorded on a VecEnv, not on {}".format(type(env)))
+    n_envs = env.num_envs
+    episodes = [([], [], []) for _ in range(n_envs)]
+    episode_returns = []
+    n_transitions = 0
+    start_time = time.time()
+
+    writer = ExpertDatasetWriter(save_dir, chunk_size=chunk_size)
+    obs = env.reset()
+    state = None
+    dones = np.zeros(n_envs, dtype=bool)
+    while len(episode_returns) < n_episodes:
+        actions, state = model.predict(obs, state=state, mask=dones, deterministic=deterministic)
+        new_obs, rewards, dones, _ = env.step(actions)
+        for i in range(n_envs):
+            ep_obs, ep_acs, ep_rews = episodes[i]
+            ep_obs.append(obs[i])
+            ep_acs.append(actions[i])
+            ep_rews.append(rewards[i])
+            if not dones[i] or len(episode_returns) >= n_episodes:
+                continue
+            writer.add_episode(np.stack(ep_obs), np.stack(ep_acs), np.array(ep_rews))
+            episode_returns.append(float(np.sum(ep_rews)))
+            n_transitions += len(ep_obs)
+            episodes[i] = ([], [], [])
+            if log_interval and len(episode_returns) % log_interval == 0:
+                _log_throughput(len(episode_returns), n_transitions, episode_returns, time.time() - start_time)
+        obs = new_obs
+    writer.close()
+
+    elapsed = time.time() - start_time
+    return dict(n_episodes=len(episode_returns), n_transitions=n_transitions,
+                mean_return=float(np.mean(episode_returns)), time=elapsed,
+                episodes_per_sec=len(episode_returns) / elapsed, transitions_per_sec=n_transitions / elapsed)
+
+
+def _log_throughput(n_episodes, n_transitions, episode_returns, elapsed):
+    """
+    logs the recording progress and throughput
+
+    :param n_episodes: (int) the number of recorded episodes
+    :param n_transitions: (int) the number of recorded transitions
+    :param episode_returns: ([float]) the returns of the recorded episodes
+    :param elapsed: (float) the time since the start of the recording (in seconds)
+    """
+    logger.record_tabular("episodes", n_episodes)
+    logger.record_tabular("transitions", n_transitions)
+    logger.record_tabular("mean_return", np.mean(episode_returns))
+    logger.record_tabular("episodes_per_sec", n_episodes / elapsed)
+    logger.record_tabular("transitions_per_sec", n_transitions / elapsed)
+    logger.dump_tabular()
+
+
+def main():
+    """
+    record the expert trajectories of a saved model
+    """
+    import gym
+    import stable_baselines
+    from stable_baselines.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+    parser = argparse.ArgumentParser("Record the expert trajectories of a trained model")
+    parser.add_argument('--algo', help='the algorithm of the model (e.g. ppo2, trpo)', type=str, required=True)
+    parser.add_argument('--model_path', help='the saved model', type=str, required=True)
+    parser.add_argument('--env_id', help='environment ID', type=str, required=True)
+    parser.add_argument('--save_dir', help='the dataset directory', type=str, required=True)
+    parser.add_argument('--n_episodes', type=int, default=100)
+    parser.add_argument('--n_envs', help='the number of environments (subprocesses if more than 1)', type=int,
+                        default=8)
+    parser.add_argument('--seed', help='RNG seed', type=int, default=0)
+    parser.add_argument('--stochastic', help='record the stochastic actions', action='store_true')
+    args = parser.parse_args()
+
+    def make_env(rank):
+        def _thunk():
+            env = gym.make(args.env_id)
+            env.seed(args.seed + rank)
+            return env
+        return _thunk
+
+    env_fns = [make_env(rank) for rank in range(args.n_envs)]
+    env = SubprocVecEnv(env_fns) if args.n_envs > 1 else DummyVecEnv(env_fns)
+    model = getattr(stable_baselines, args.algo.upper()).load(args.model_path)
+    stats = record_expert_trajectories(model, args.save_dir, args.n_episodes, env=env,
+                                       deterministic=not args.stochastic)
+    env.close()
+    print("Recorded {n_episodes} episodes ({n_transitions} transitions) in {time:.1f}s: "
+          "{episodes_per_sec:.2f} episodes/s, mean return {mean_return:.2f}".format(**stats))
+
+
+if __name__ == '__main__':
+    main()
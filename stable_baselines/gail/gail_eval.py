@@ -15,7 +15,7 @@ import tensorflow as tf
 from stable_baselines.gail import run_mujoco, mlp_policy
 from stable_baselines.common import set_global_seeds, tf_util
 from stable_baselines.common.misc_util import boolean_flag
-from stable_baselines.gail.dataset.mujocodset import MujocoDset
+from stable_baselines.gail.dataset.expert_dataset import load_expert_dataset
 
 
 plt.style.use('ggplot')
@@ -29,9 +29,9 @@ def load_dataset(expert_path):
     load mujoco dataset
 
     :param expert_path: (str) the path to trajectory data
-    :return: (MujocoDset) the dataset manager object
+    :return: (MujocoDset or ExpertDataset) the dataset manager object
     """
-    dataset = MujocoDset(expert_path=expert_path)
+    dataset = load_expert_dataset(expert_path)
     return dataset
 
 
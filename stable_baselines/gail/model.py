@@ -22,21 +22,27 @@ class GAIL(ActorCriticRLModel):
     :param vf_iters: (int) the value function's number iterations for learning
     :param pretrained_weight: (str) the save location for the pretrained weights
     :param hidden_size: ([int]) the hidden dimension for the MLP
-    :param expert_dataset: (Dset) the dataset manager
+    :param expert_dataset: (MujocoDset or ExpertDataset) the dataset manager
     :param save_per_iter: (int) the number of iterations before saving
     :param checkpoint_dir: (str) the location for saving checkpoints
     :param g_step: (int) number of steps to train policy in each epoch
     :param d_step: (int) number of steps to train discriminator in each epoch
     :param task_name: (str) the name of the task (can be None)
     :param d_stepsize: (float) the reward giver stepsize
+    :param defer_reward: (bool) compute the discriminator rewards of a whole sampled segment with batched passes,
+        instead of one pass per environment step (the rewards match the per-step rewards up to the float32 rounding
+        of the batched passes, about 1e-5, they are not bitwise identical)
+    :param reward_batch_size: (int) the maximum number of transitions per discriminator pass when the reward is
+        deferred (if None, the whole segment is computed in one pass)
     :param verbose: (int) the verbosity level: 0 none, 1 training information, 2 tensorflow debug
     :param _init_setup_model: (bool) Whether or not to build the network at the creation of the instance
     """
 
     def __init__(self, policy, env, pretrained_weight=False, hidden_size_adversary=100, adversary_entcoeff=1e-3,
                  expert_dataset=None, save_per_iter=1, checkpoint_dir="/tmp/gail/ckpt/", g_step=1, d_step=1,
-                 task_name="task_name", d_stepsize=3e-4, verbose=0, _init_setup_model=True, **kwargs):
-        super().__init__(policy=policy, env=env, verbose=verbose, requires_vec_env=False,
+                 task_name="task_name", d_stepsize=3e-4, defer_reward=False, reward_batch_size=None, verbose=0,
+                 _init_setup_model=True, **kwargs):
+        super().__init__(policy=policy, env=env, verbose=verbose, requires_vec_env=False, supports_vec_env=True,
                          _init_setup_model=_init_setup_model)
 
         self.trpo = TRPO(policy, env, verbose=verbose, _init_setup_model=False, **kwargs)
@@ -49,6 +55,8 @@ class GAIL(ActorCriticRLModel):
         self.trpo.d_step = d_step
         self.trpo.task_name = task_name
         self.trpo.d_stepsize = d_stepsize
+        self.trpo.defer_gail_reward = defer_reward
+        self.trpo.gail_reward_batch_size = reward_batch_size
         self.trpo.hidden_size_adversary = hidden_size_adversary
         self.trpo.adversary_entcoeff = adversary_entcoeff
 
@@ -59,6 +67,11 @@ class GAIL(ActorCriticRLModel):
         super().set_env(env)
         self.trpo.set_env(env)
 
+    def set_profiling(self, *args, **kwargs):
+        super().set_profiling(*args, **kwargs)
+        self.trpo.profiling = self.profiling
+        return self
+
     def setup_model(self):
         assert issubclass(self.policy, ActorCriticPolicy), "Error: the input policy for the GAIL model must be an " \
                                                            "instance of common.policies.ActorCriticPolicy."
@@ -76,6 +89,15 @@ class GAIL(ActorCriticRLModel):
     def action_probability(self, observation, state=None, mask=None):
         return self.trpo.action_probability(observation, state, mask)
 
+    def load_parameters(self, params):
+        self.trpo.load_parameters(params)
+
+    def get_parameters_flat(self, out=None):
+        return self.trpo.get_parameters_flat(out)
+
+    def set_parameters_flat(self, buf):
+        self.trpo.set_parameters_flat(buf)
+
     def save(self, save_path):
         self.trpo.save(save_path)
 
@@ -89,9 +111,6 @@ class GAIL(ActorCriticRLModel):
         model.set_env(env)
         model.setup_model()
 
-        restores = []
-        for param, loaded_p in zip(model.trpo.params, params):
-            restores.append(param.assign(loaded_p))
-        model.trpo.sess.run(restores)
+        model.load_parameters(params)
 
         return model
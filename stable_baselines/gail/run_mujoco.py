@@ -16,7 +16,7 @@ from stable_baselines.trpo_mpi.trpo_mpi import TRPO
 from stable_baselines.common import set_global_seeds, tf_util
 from stable_baselines.common.misc_util import boolean_flag
 from stable_baselines import bench, logger
-from stable_baselines.gail.dataset.mujocodset import MujocoDset
+from stable_baselines.gail.dataset.expert_dataset import load_expert_dataset
 from stable_baselines.gail.adversary import TransitionClassifier
 
 
@@ -29,7 +29,8 @@ def argsparser():
     parser = argparse.ArgumentParser("Tensorflow Implementation of GAIL")
     parser.add_argument('--env_id', help='environment ID', default='Hopper-v2')
     parser.add_argument('--seed', help='RNG seed', type=int, default=0)
-    parser.add_argument('--expert_path', type=str, default='data/deterministic.trpo.Hopper.0.00.npz')
+    parser.add_argument('--expert_path', type=str, default='data/deterministic.trpo.Hopper.0.00.npz',
+                        help='.npz file or expert dataset directory')
     parser.add_argument('--checkpoint_dir', help='the directory to save model', default='checkpoint')
     parser.add_argument('--log_dir', help='the directory to save log file', default='log')
     parser.add_argument('--load_model_path', help='if provided, load the model', type=str, default=None)
@@ -101,7 +102,7 @@ def main(args):
         args.log_dir = os.path.join(args.log_dir, task_name)
 
         if args.task == 'train':
-            dataset = MujocoDset(expert_path=args.expert_path, traj_limitation=args.traj_limitation)
+            dataset = load_expert_dataset(args.expert_path, traj_limitation=args.traj_limitation)
             reward_giver = TransitionClassifier(env, args.adversary_hidden_size, entcoeff=args.adversary_entcoeff)
             train(env, args.seed, policy_fn, reward_giver, dataset, args.algo, args.g_step, args.d_step,
                   args.policy_entcoeff, args.num_timesteps, args.save_per_iter, args.checkpoint_dir, args.pretrained,
@@ -129,7 +130,7 @@ def train(env, seed, policy_fn, reward_giver, dataset, algo, g_step, d_step, pol
     :param seed: (int) the initial random seed
     :param policy_fn: (function (str, Gym Space, Gym Space, bool): MLPPolicy) policy generator
     :param reward_giver: (TransitionClassifier) the reward predicter from obsevation and action
-    :param dataset: (MujocoDset) the dataset manager
+    :param dataset: (MujocoDset or ExpertDataset) the dataset manager
     :param algo: (str) the algorithm type (only 'trpo' is supported)
     :param g_step: (int) number of steps to train policy in each epoch
     :param d_step: (int) number of steps to train discriminator in each epoch
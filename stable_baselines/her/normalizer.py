@@ -1,9 +1,9 @@
 import threading
 
 import numpy as np
-from mpi4py import MPI
 import tensorflow as tf
 
+from stable_baselines.common.comm import SUM, get_default_comm
 from stable_baselines.her.util import reshape_for_broadcasting
 
 
@@ -102,8 +102,9 @@ class Normalizer:
     @classmethod
     def _mpi_average(cls, arr):
         buf = np.zeros_like(arr)
-        MPI.COMM_WORLD.Allreduce(arr, buf, op=MPI.SUM)
-        buf /= MPI.COMM_WORLD.Get_size()
+        comm = get_default_comm()
+        comm.Allreduce(arr, buf, op=SUM)
+        buf /= comm.Get_size()
         return buf
 
     def synchronize(self, local_sum, local_sumsq, local_count):
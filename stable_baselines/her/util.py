@@ -5,9 +5,9 @@ import importlib
 
 import tensorflow as tf
 import numpy as np
-from mpi4py import MPI
 
 from stable_baselines.common import tf_util
+from stable_baselines.common.comm import get_default_comm
 
 
 def import_function(spec):
@@ -71,7 +71,7 @@ def install_mpi_excepthook():
         old_hook(a, b, c)
         sys.stdout.flush()
         sys.stderr.flush()
-        MPI.COMM_WORLD.Abort()
+        get_default_comm().Abort()
 
     sys.excepthook = new_hook
 
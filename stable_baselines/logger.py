@@ -557,8 +557,8 @@ def configure(folder=None, format_strs=None):
     os.makedirs(folder, exist_ok=True)
 
     log_suffix = ''
-    from mpi4py import MPI
-    rank = MPI.COMM_WORLD.Get_rank()
+    from stable_baselines.common.comm import get_default_comm
+    rank = get_default_comm().Get_rank()
     if rank > 0:
         log_suffix = "-rank%03i" % rank
 
@@ -3,13 +3,13 @@ import time
 
 import tensorflow as tf
 import numpy as np
-from mpi4py import MPI
 
 from stable_baselines.common import Dataset, explained_variance, fmt_row, zipsame, ActorCriticRLModel, SetVerbosity, \
     TensorboardWriter
 from stable_baselines import logger
 import stable_baselines.common.tf_util as tf_util
 from stable_baselines.common.policies import LstmPolicy, ActorCriticPolicy
+from stable_baselines.common.comm import get_default_comm
 from stable_baselines.common.mpi_adam import MpiAdam
 from stable_baselines.common.mpi_moments import mpi_moments
 from stable_baselines.trpo_mpi.utils import traj_segment_generator, add_vtarg_and_adv, flatten_lists
@@ -23,7 +23,8 @@ class PPO1(ActorCriticRLModel):
 
     :param env: (Gym environment or str) The environment to learn from (if registered in Gym, can be str)
     :param policy: (ActorCriticPolicy or str) The policy model to use (MlpPolicy, CnnPolicy, CnnLstmPolicy, ...)
-    :param timesteps_per_actorbatch: (int) timesteps per actor per update
+    :param timesteps_per_actorbatch: (int) timesteps per actor per update, split evenly between the environments of
+        a VecEnv (it must be a multiple of their number)
     :param clip_param: (float) clipping parameter epsilon
     :param entcoeff: (float) the entropy loss weight
     :param optim_epochs: (float) the optimizer's number of epochs
@@ -43,7 +44,7 @@ class PPO1(ActorCriticRLModel):
                  optim_epochs=4, optim_stepsize=1e-3, optim_batchsize=64, lam=0.95, adam_epsilon=1e-5,
                  schedule='linear', verbose=0, tensorboard_log=None, _init_setup_model=True):
 
-        super().__init__(policy=policy, env=env, verbose=verbose, requires_vec_env=False,
+        super().__init__(policy=policy, env=env, verbose=verbose, requires_vec_env=False, supports_vec_env=True,
                          _init_setup_model=_init_setup_model)
 
         self.gamma = gamma
@@ -78,6 +79,9 @@ class PPO1(ActorCriticRLModel):
 
     def setup_model(self):
         with SetVerbosity(self.verbose):
+            if self.timesteps_per_actorbatch % self.n_envs != 0:
+                raise ValueError("Error: timesteps_per_actorbatch ({}) must be a multiple of the number of "
+                                 "environments ({})".format(self.timesteps_per_actorbatch, self.n_envs))
 
             self.graph = tf.Graph()
             with self.graph.as_default():
@@ -183,7 +187,9 @@ class PPO1(ActorCriticRLModel):
                 self.adam.sync()
 
                 # Prepare for rollouts
-                seg_gen = traj_segment_generator(self.policy_pi, self.env, self.timesteps_per_actorbatch)
+                # with a vectorized environment, each environment runs a share of the batch
+                seg_gen = traj_segment_generator(self.policy_pi, self.env,
+                                                 self.timesteps_per_actorbatch // self.n_envs)
 
                 episodes_so_far = 0
                 timesteps_so_far = 0
@@ -247,27 +253,13 @@ class PPO1(ActorCriticRLModel):
                             steps = (timesteps_so_far +
                                      k * optim_batchsize +
                                      int(i * (optim_batchsize / len(dataset.data_map))))
+                            run_kwargs = self.profiling.start_step()
+                            summary, grad, *newlosses = self.lossandgrad(batch["ob"], batch["ob"], batch["ac"],
+                                                                         batch["atarg"], batch["vtarg"], cur_lrmult,
+                                                                         sess=self.sess, **run_kwargs)
+                            self.profiling.end_step(run_kwargs, steps, writer)
                             if writer is not None:
-                                # run loss backprop with summary, but once every 10 runs save the metadata
-                                # (memory, compute time, ...)
-                                if (1 + k) % 10 == 0:
-                                    run_options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
-                                    run_metadata = tf.RunMetadata()
-                                    summary, grad, *newlosses = self.lossandgrad(batch["ob"], batch["ob"], batch["ac"],
-                                                                                 batch["atarg"], batch["vtarg"],
-                                                                                 cur_lrmult, sess=self.sess,
-                                                                                 options=run_options,
-                                                                                 run_metadata=run_metadata)
-                                    writer.add_run_metadata(run_metadata, 'step%d' % steps)
-                                else:
-                                    summary, grad, *newlosses = self.lossandgrad(batch["ob"], batch["ob"], batch["ac"],
-                                                                                 batch["atarg"], batch["vtarg"],
-                                                                                 cur_lrmult, sess=self.sess)
                                 writer.add_summary(summary, steps)
-                            else:
-                                _, grad, *newlosses = self.lossandgrad(batch["ob"], batch["ob"], batch["ac"],
-                                                                       batch["atarg"], batch["vtarg"], cur_lrmult,
-                                                                       sess=self.sess)
 
                             self.adam.update(grad, self.optim_stepsize * cur_lrmult)
                             losses.append(newlosses)
@@ -289,7 +281,7 @@ class PPO1(ActorCriticRLModel):
                     lrlocal = (seg["ep_lens"], seg["ep_rets"])
 
                     # list of tuples
-                    listoflrpairs = MPI.COMM_WORLD.allgather(lrlocal)
+                    listoflrpairs = get_default_comm().allgather(lrlocal)
                     lens, rews = map(flatten_lists, zip(*listoflrpairs))
                     lenbuffer.extend(lens)
                     rewbuffer.extend(rews)
@@ -297,16 +289,19 @@ class PPO1(ActorCriticRLModel):
                     logger.record_tabular("EpRewMean", np.mean(rewbuffer))
                     logger.record_tabular("EpThisIter", len(lens))
                     episodes_so_far += len(lens)
-                    timesteps_so_far += MPI.COMM_WORLD.allreduce(seg["total_timestep"])
+                    timesteps_so_far += get_default_comm().allreduce(seg["total_timestep"])
                     iters_so_far += 1
                     logger.record_tabular("EpisodesSoFar", episodes_so_far)
                     logger.record_tabular("TimestepsSoFar", timesteps_so_far)
                     logger.record_tabular("TimeElapsed", time.time() - t_start)
-                    if self.verbose >= 1 and MPI.COMM_WORLD.Get_rank() == 0:
+                    if self.verbose >= 1 and get_default_comm().Get_rank() == 0:
                         logger.dump_tabular()
 
         return self
 
+    def _get_step_policy(self):
+        return self.policy_pi
+
     def save(self, save_path):
         data = {
             "gamma": self.gamma,
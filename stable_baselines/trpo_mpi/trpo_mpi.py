@@ -2,7 +2,6 @@ import time
 from contextlib import contextmanager
 from collections import deque
 
-from mpi4py import MPI
 import tensorflow as tf
 import numpy as np
 
@@ -10,7 +9,9 @@ import stable_baselines.common.tf_util as tf_util
 from stable_baselines.common import explained_variance, zipsame, dataset, fmt_row, colorize, ActorCriticRLModel, \
     SetVerbosity, TensorboardWriter
 from stable_baselines import logger
+from stable_baselines.common.comm import get_default_comm
 from stable_baselines.common.mpi_adam import MpiAdam
+from stable_baselines.common.mpi_allmean import MpiAllMean
 from stable_baselines.common.cg import conjugate_gradient
 from stable_baselines.common.policies import ActorCriticPolicy
 from stable_baselines.a2c.utils import find_trainable_variables, total_episode_reward_logger
@@ -20,15 +21,16 @@ from stable_baselines.trpo_mpi.utils import traj_segment_generator, add_vtarg_an
 
 class TRPO(ActorCriticRLModel):
     def __init__(self, policy, env, gamma=0.99, timesteps_per_batch=1024, max_kl=0.01, cg_iters=10, lam=0.98,
-                 entcoeff=0.0, cg_damping=1e-2, vf_stepsize=3e-4, vf_iters=3, verbose=0, tensorboard_log=None,
-                 _init_setup_model=True):
+                 entcoeff=0.0, cg_damping=1e-2, vf_stepsize=3e-4, vf_iters=3, overlap_vf_allreduce=False, verbose=0,
+                 tensorboard_log=None, _init_setup_model=True):
         """
         learns a TRPO policy using the given environment
 
         :param policy: (ActorCriticPolicy or str) The policy model to use (MlpPolicy, CnnPolicy, CnnLstmPolicy, ...)
         :param env: (Gym environment or str) The environment to learn from (if registered in Gym, can be str)
         :param gamma: (float) the discount value
-        :param timesteps_per_batch: (int) the number of timesteps to run per batch (horizon)
+        :param timesteps_per_batch: (int) the number of timesteps to run per batch (horizon), split evenly between
+            the environments of a VecEnv (it must be a multiple of their number)
         :param max_kl: (float) the kullback leiber loss threshold
         :param cg_iters: (int) the number of iterations for the conjugate gradient calculation
         :param lam: (float) GAE factor
@@ -36,12 +38,14 @@ class TRPO(ActorCriticRLModel):
         :param cg_damping: (float) the compute gradient dampening factor
         :param vf_stepsize: (float) the value function stepsize
         :param vf_iters: (int) the value function's number iterations for learning
+        :param overlap_vf_allreduce: (bool) average the gradient of a value function minibatch over the workers
+            while the gradient of the next minibatch is computed (each gradient is then applied one update late)
         :param verbose: (int) the verbosity level: 0 none, 1 training information, 2 tensorflow debug
         :param tensorboard_log: (str) the log location for tensorboard (if None, no logging)
         :param _init_setup_model: (bool) Whether or not to build the network at the creation of the instance
         """
         super(TRPO, self).__init__(policy=policy, env=env, verbose=verbose, requires_vec_env=False,
-                                   _init_setup_model=_init_setup_model)
+                                   supports_vec_env=True, _init_setup_model=_init_setup_model)
 
         self.using_gail = False
         self.timesteps_per_batch = timesteps_per_batch
@@ -53,6 +57,7 @@ class TRPO(ActorCriticRLModel):
         self.vf_iters = vf_iters
         self.vf_stepsize = vf_stepsize
         self.entcoeff = entcoeff
+        self.overlap_vf_allreduce = overlap_vf_allreduce
         self.tensorboard_log = tensorboard_log
 
         # GAIL Params
@@ -66,6 +71,8 @@ class TRPO(ActorCriticRLModel):
         self.d_step = 1
         self.task_name = "task_name"
         self.d_stepsize = 3e-4
+        self.defer_gail_reward = False
+        self.gail_reward_batch_size = None
 
         self.graph = None
         self.sess = None
@@ -84,6 +91,7 @@ class TRPO(ActorCriticRLModel):
         self.allmean = None
         self.nworkers = None
         self.rank = None
+        self.mpi_allmean = None
         self.reward_giver = None
         self.step = None
         self.proba_step = None
@@ -103,9 +111,12 @@ class TRPO(ActorCriticRLModel):
 
             assert issubclass(self.policy, ActorCriticPolicy), "Error: the input policy for the TRPO model must be " \
                                                                "an instance of common.policies.ActorCriticPolicy."
+            if self.timesteps_per_batch % self.n_envs != 0:
+                raise ValueError("Error: timesteps_per_batch ({}) must be a multiple of the number of environments "
+                                 "({})".format(self.timesteps_per_batch, self.n_envs))
 
-            self.nworkers = MPI.COMM_WORLD.Get_size()
-            self.rank = MPI.COMM_WORLD.Get_rank()
+            self.nworkers = get_default_comm().Get_size()
+            self.rank = get_default_comm().Get_rank()
             np.set_printoptions(precision=3)
 
             self.graph = tf.Graph()
@@ -197,17 +208,18 @@ class TRPO(ActorCriticRLModel):
                         else:
                             yield
 
-                    def allmean(arr):
+                    # the reductions reuse their buffers, the results are only valid until the next reduction
+                    # with the same key
+                    self.mpi_allmean = MpiAllMean(get_default_comm())
+
+                    def allmean(arr, key=None):
                         assert isinstance(arr, np.ndarray)
-                        out = np.empty_like(arr)
-                        MPI.COMM_WORLD.Allreduce(arr, out, op=MPI.SUM)
-                        out /= self.nworkers
-                        return out
+                        return self.mpi_allmean.allmean(arr, key=key)
 
                     tf_util.initialize(sess=self.sess)
 
                     th_init = self.get_flat()
-                    MPI.COMM_WORLD.Bcast(th_init, root=0)
+                    get_default_comm().Bcast(th_init, root=0)
                     self.set_from_flat(th_init)
 
                 with tf.variable_scope("Adam_mpi", reuse=False):
@@ -253,8 +265,11 @@ class TRPO(ActorCriticRLModel):
             self._setup_learn(seed)
 
             with self.sess.as_default():
-                seg_gen = traj_segment_generator(self.policy_pi, self.env, self.timesteps_per_batch,
-                                                 reward_giver=self.reward_giver, gail=self.using_gail)
+                # with a vectorized environment, each environment runs a share of the batch
+                seg_gen = traj_segment_generator(self.policy_pi, self.env, self.timesteps_per_batch // self.n_envs,
+                                                 reward_giver=self.reward_giver, gail=self.using_gail,
+                                                 defer_gail_reward=self.defer_gail_reward,
+                                                 gail_reward_batch_size=self.gail_reward_batch_size)
 
                 episodes_so_far = 0
                 timesteps_so_far = 0
@@ -286,7 +301,8 @@ class TRPO(ActorCriticRLModel):
                     logger.log("********** Iteration %i ************" % iters_so_far)
 
                     def fisher_vector_product(vec):
-                        return self.allmean(self.compute_fvp(vec, *fvpargs, sess=self.sess)) + self.cg_damping * vec
+                        return self.allmean(self.compute_fvp(vec, *fvpargs, sess=self.sess), key="fvp") + \
+                            self.cg_damping * vec
                     # ------------------ Update G ------------------
                     logger.log("Optimizing Policy...")
                     # g_step = 1 when not using GAIL
@@ -320,22 +336,16 @@ class TRPO(ActorCriticRLModel):
 
                         with self.timed("computegrad"):
                             steps = timesteps_so_far + (k + 1) * (seg["total_timestep"] / self.g_step)
-                            run_options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
-                            run_metadata = tf.RunMetadata()
-                            # run loss backprop with summary, and save the metadata (memory, compute time, ...)
+                            run_kwargs = self.profiling.start_step()
+                            summary, grad, *lossbefore = self.compute_lossandgrad(*args, tdlamret, sess=self.sess,
+                                                                                  **run_kwargs)
+                            self.profiling.end_step(run_kwargs, steps, writer)
                             if writer is not None:
-                                summary, grad, *lossbefore = self.compute_lossandgrad(*args, tdlamret, sess=self.sess,
-                                                                                      options=run_options,
-                                                                                      run_metadata=run_metadata)
-                                writer.add_run_metadata(run_metadata, 'step%d' % steps)
                                 writer.add_summary(summary, steps)
-                            else:
-                                _, grad, *lossbefore = self.compute_lossandgrad(*args, tdlamret, sess=self.sess,
-                                                                                options=run_options,
-                                                                                run_metadata=run_metadata)
 
-                        lossbefore = self.allmean(np.array(lossbefore))
-                        grad = self.allmean(grad)
+                        # a single reduction for the losses and the gradient
+                        lossbefore, grad = self.mpi_allmean.allmean_many([np.array(lossbefore), grad],
+                                                                         key="lossandgrad")
                         if np.allclose(grad, 0):
                             logger.log("Got zero gradient. not updating")
                         else:
@@ -357,7 +367,7 @@ class TRPO(ActorCriticRLModel):
                                 thnew = thbefore + fullstep * stepsize
                                 self.set_from_flat(thnew)
                                 mean_losses = surr, kl_loss, *_ = self.allmean(
-                                    np.array(self.compute_losses(*args, sess=self.sess)))
+                                    np.array(self.compute_losses(*args, sess=self.sess)), key="losses")
                                 improve = surr - surrbefore
                                 logger.log("Expected: %.3f Actual: %.3f" % (expectedimprove, improve))
                                 if not np.isfinite(mean_losses).all():
@@ -374,17 +384,25 @@ class TRPO(ActorCriticRLModel):
                                 logger.log("couldn't compute a good step")
                                 self.set_from_flat(thbefore)
                             if self.nworkers > 1 and iters_so_far % 20 == 0:
-                                # list of tuples
-                                paramsums = MPI.COMM_WORLD.allgather((thnew.sum(), self.vfadam.getflat().sum()))
-                                assert all(np.allclose(ps, paramsums[0]) for ps in paramsums[1:])
+                                assert self.mpi_allmean.check_synced([thnew.sum(), self.vfadam.getflat().sum()])
 
                         with self.timed("vf"):
+                            # the gradients are averaged once here, not again by MpiAdam
+                            pending_grad = None
                             for _ in range(self.vf_iters):
                                 for (mbob, mbret) in dataset.iterbatches((seg["ob"], seg["tdlamret"]),
                                                                          include_final_partial_batch=False,
                                                                          batch_size=128):
-                                    grad = self.allmean(self.compute_vflossandgrad(mbob, mbob, mbret, sess=self.sess))
-                                    self.vfadam.update(grad, self.vf_stepsize)
+                                    grad = self.compute_vflossandgrad(mbob, mbob, mbret, sess=self.sess)
+                                    if self.overlap_vf_allreduce:
+                                        # apply the previous gradient, whose reduction overlapped this computation
+                                        if pending_grad is not None:
+                                            self.vfadam.apply_global_grad(pending_grad.wait(), self.vf_stepsize)
+                                        pending_grad = self.mpi_allmean.iallmean(grad, key="vf")
+                                    else:
+                                        self.vfadam.apply_global_grad(self.allmean(grad, key="vf"), self.vf_stepsize)
+                            if pending_grad is not None:
+                                self.vfadam.apply_global_grad(pending_grad.wait(), self.vf_stepsize)
 
                     for (loss_name, loss_val) in zip(self.loss_names, mean_losses):
                         logger.record_tabular(loss_name, loss_val)
@@ -395,7 +413,6 @@ class TRPO(ActorCriticRLModel):
                         # ------------------ Update D ------------------
                         logger.log("Optimizing Discriminator...")
                         logger.log(fmt_row(13, self.reward_giver.loss_name))
-                        ob_expert, ac_expert = self.expert_dataset.get_next_batch(len(observation))
                         batch_size = len(observation) // self.d_step
                         d_losses = []  # list of tuples, each of which gives the loss for a minibatch
                         for ob_batch, ac_batch in dataset.iterbatches((observation, action),
@@ -406,17 +423,17 @@ class TRPO(ActorCriticRLModel):
                             if hasattr(self.reward_giver, "obs_rms"):
                                 self.reward_giver.obs_rms.update(np.concatenate((ob_batch, ob_expert), 0))
                             *newlosses, grad = self.reward_giver.lossandgrad(ob_batch, ac_batch, ob_expert, ac_expert)
-                            self.d_adam.update(self.allmean(grad), self.d_stepsize)
+                            self.d_adam.apply_global_grad(self.allmean(grad, key="d"), self.d_stepsize)
                             d_losses.append(newlosses)
                         logger.log(fmt_row(13, np.mean(d_losses, axis=0)))
 
                         lrlocal = (seg["ep_lens"], seg["ep_rets"], seg["ep_true_rets"])  # local values
-                        listoflrpairs = MPI.COMM_WORLD.allgather(lrlocal)  # list of tuples
+                        listoflrpairs = get_default_comm().allgather(lrlocal)  # list of tuples
                         lens, rews, true_rets = map(flatten_lists, zip(*listoflrpairs))
                         true_rewbuffer.extend(true_rets)
                     else:
                         lrlocal = (seg["ep_lens"], seg["ep_rets"])  # local values
-                        listoflrpairs = MPI.COMM_WORLD.allgather(lrlocal)  # list of tuples
+                        listoflrpairs = get_default_comm().allgather(lrlocal)  # list of tuples
                         lens, rews = map(flatten_lists, zip(*listoflrpairs))
                     lenbuffer.extend(lens)
                     rewbuffer.extend(rews)
@@ -430,6 +447,10 @@ class TRPO(ActorCriticRLModel):
                     timesteps_so_far += seg["total_timestep"]
                     iters_so_far += 1
 
+                    # time spent in the gradient and loss reductions during this iteration
+                    comm_time, n_collectives = self.mpi_allmean.pop_comm_time()
+                    logger.record_tabular("CommTime", comm_time)
+                    logger.record_tabular("CommCollectives", n_collectives)
                     logger.record_tabular("EpisodesSoFar", episodes_so_far)
                     logger.record_tabular("TimestepsSoFar", timesteps_so_far)
                     logger.record_tabular("TimeElapsed", time.time() - t_start)
@@ -439,6 +460,9 @@ class TRPO(ActorCriticRLModel):
 
         return self
 
+    def _get_step_policy(self):
+        return self.policy_pi
+
     def save(self, save_path):
         data = {
             "gamma": self.gamma,
@@ -450,6 +474,7 @@ class TRPO(ActorCriticRLModel):
             "cg_damping": self.cg_damping,
             "vf_stepsize": self.vf_stepsize,
             "vf_iters": self.vf_iters,
+            "overlap_vf_allreduce": self.overlap_vf_allreduce,
             "pretrained_weight": self.pretrained_weight,
             "reward_giver": self.reward_giver,
             "expert_dataset": self.expert_dataset,
@@ -459,6 +484,8 @@ class TRPO(ActorCriticRLModel):
             "d_step": self.d_step,
             "task_name": self.task_name,
             "d_stepsize": self.d_stepsize,
+            "defer_gail_reward": self.defer_gail_reward,
+            "gail_reward_batch_size": self.gail_reward_batch_size,
             "using_gail": self.using_gail,
             "verbose": self.verbose,
             "policy": self.policy,
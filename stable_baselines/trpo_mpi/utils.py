@@ -4,7 +4,8 @@ import numpy as np
 from stable_baselines.common.vec_env import VecEnv
 
 
-def traj_segment_generator(policy, env, horizon, reward_giver=None, gail=False):
+def traj_segment_generator(policy, env, horizon, reward_giver=None, gail=False, defer_gail_reward=False,
+                           gail_reward_batch_size=None):
     """
     Compute target value using TD(lambda) estimator, and advantage with GAE(lambda)
 
@@ -13,7 +14,15 @@ def traj_segment_generator(policy, env, horizon, reward_giver=None, gail=False):
     :param horizon: (int) the number of timesteps to run per batch
     :param reward_giver: (TransitionClassifier) the reward predicter from obsevation and action
     :param gail: (bool) Whether we are using this generator for standard trpo or with gail
+    :param defer_gail_reward: (bool) when using gail, record the observations and actions and compute the rewards of
+        the whole segment with batched discriminator passes before returning it, instead of one pass per step
+        (the discriminator is not updated while a segment is generated, so the rewards match the per-step rewards up
+        to the float32 rounding of the batched passes, about 1e-5, they are not bitwise identical)
+    :param gail_reward_batch_size: (int) the maximum number of transitions per discriminator pass when the gail
+        reward is deferred (if None, the whole segment is computed in one pass)
     :return: (dict) generator that returns a dict with the following keys:
+        (with a VecEnv of more than one environment, the horizon is run in each environment and the arrays are the
+        concatenation of the trajectories of the environments, of length n_envs * horizon)
 
         - ob: (np.ndarray) observations
         - rew: (numpy float) rewards (if gail is used it is the predicted reward)
@@ -29,6 +38,11 @@ def traj_segment_generator(policy, env, horizon, reward_giver=None, gail=False):
     # Check when using GAIL
     assert not (gail and reward_giver is None), "You must pass a reward giver when using GAIL"
 
+    if isinstance(env, VecEnv) and env.num_envs > 1:
+        yield from _vec_traj_segment_generator(policy, env, horizon, reward_giver, gail, defer_gail_reward,
+                                               gail_reward_batch_size)
+        return
+
     # Initialize state variables
     step = 0
     action = env.action_space.sample()  # not used, just so we have the datatype
@@ -50,6 +64,9 @@ def traj_segment_generator(policy, env, horizon, reward_giver=None, gail=False):
     dones = np.zeros(horizon, 'int32')
     actions = np.array([action for _ in range(horizon)])
     prev_actions = actions.copy()
+    defer_reward = gail and defer_gail_reward
+    # the discriminator uses the clipped actions
+    clipped_actions = actions.copy() if defer_reward else None
     states = policy.initial_state
     done = None
 
@@ -60,6 +77,9 @@ def traj_segment_generator(policy, env, horizon, reward_giver=None, gail=False):
         # before returning segment [0, T-1] so we get the correct
         # terminal value
         if step > 0 and step % horizon == 0:
+            if defer_reward:
+                cur_ep_ret, ep_rets = _compute_segment_gail_reward(reward_giver, observations, clipped_actions, dones,
+                                                                   rews, cur_ep_ret, gail_reward_batch_size)
             # Fix to avoid "mean of empty slice" warning when there is only one episode
             if len(ep_rets) == 0:
                 ep_rets = [cur_ep_ret]
@@ -89,7 +109,12 @@ def traj_segment_generator(policy, env, horizon, reward_giver=None, gail=False):
         if isinstance(env.action_space, gym.spaces.Box):
             clipped_action = np.clip(action, env.action_space.low, env.action_space.high)
 
-        if gail:
+        if defer_reward:
+            # the reward is computed for the whole segment, before yielding it
+            clipped_actions[i] = clipped_action[0]
+            observation, true_rew, done, _info = env.step(clipped_action[0])
+            rew = 0.
+        elif gail:
             rew = reward_giver.get_reward(observation, clipped_action[0])
             observation, true_rew, done, _info = env.step(clipped_action[0])
         else:
@@ -99,14 +124,17 @@ def traj_segment_generator(policy, env, horizon, reward_giver=None, gail=False):
         true_rews[i] = true_rew
         dones[i] = done
 
-        cur_ep_ret += rew
+        if not defer_reward:
+            # when deferred, the episode returns are computed with the rewards of the segment
+            cur_ep_ret += rew
         cur_ep_true_ret += true_rew
         cur_ep_len += 1
         if done:
-            ep_rets.append(cur_ep_ret)
+            if not defer_reward:
+                ep_rets.append(cur_ep_ret)
+                cur_ep_ret = 0
             ep_true_rets.append(cur_ep_true_ret)
             ep_lens.append(cur_ep_len)
-            cur_ep_ret = 0
             cur_ep_true_ret = 0
             cur_ep_len = 0
             if not isinstance(env, VecEnv):
@@ -114,25 +142,197 @@ def traj_segment_generator(policy, env, horizon, reward_giver=None, gail=False):
         step += 1
 
 
+def _vec_traj_segment_generator(policy, env, horizon, reward_giver=None, gail=False, defer_gail_reward=False,
+                                gail_reward_batch_size=None):
+    """
+    traj_segment_generator for a VecEnv of several environments: the policy is called once per step for all the
+    environments, and the horizon is run in each of them.
+    The segment arrays are stored per environment (n_envs, horizon, ...) and returned flattened (n_envs * horizon, ...)
+
+    :param policy: (MLPPolicy) the policy
+    :param env: (VecEnv) the vectorized environment
+    :param horizon: (int) the number of timesteps to run per batch in each environment
+    :param reward_giver: (TransitionClassifier) the reward predicter from obsevation and action
+    :param gail: (bool) Whether we are using this generator for standard trpo or with gail
+    :param defer_gail_reward: (bool) when using gail, compute the rewards of the whole segment before returning it
+    :param gail_reward_batch_size: (int) the maximum number of transitions per discriminator pass when the gail
+        reward is deferred (if None, the whole segment is computed in one pass)
+    :return: (dict) generator that returns a dict with the same keys as traj_segment_generator
+    """
+    n_envs = env.num_envs
+
+    # Initialize state variables
+    step = 0
+    action = np.array([env.action_space.sample() for _ in range(n_envs)])  # not used, just so we have the datatype
+    observation = env.reset()
+
+    cur_ep_ret = np.zeros(n_envs)  # return in current episode
+    cur_ep_len = np.zeros(n_envs, 'int64')  # len of current episode
+    cur_ep_true_ret = np.zeros(n_envs)
+    ep_true_rets = []
+    ep_rets = []  # returns of completed episodes in this segment
+    ep_lens = []  # Episode lengths
+
+    # Initialize history arrays
+    observations = np.zeros((n_envs, horizon) + observation.shape[1:], dtype=observation.dtype)
+    true_rews = np.zeros((n_envs, horizon), 'float32')
+    rews = np.zeros((n_envs, horizon), 'float32')
+    vpreds = np.zeros((n_envs, horizon), 'float32')
+    dones = np.zeros((n_envs, horizon), 'int32')
+    actions = np.zeros((n_envs, horizon) + action.shape[1:], dtype=action.dtype)
+    prev_actions = actions.copy()
+    defer_reward = gail and defer_gail_reward
+    # the discriminator uses the clipped actions
+    clipped_actions = actions.copy() if defer_reward else None
+    states = policy.initial_state
+    done = np.zeros(n_envs, dtype=bool)
+
+    def _flat(arr):
+        return arr.reshape((n_envs * horizon,) + arr.shape[2:])
+
+    while True:
+        prevac = action
+        last_states = states
+        action, vpred, states, _ = policy.step(observation, states, done)
+        # Slight weirdness here because we need value function at time T
+        # before returning segment [0, T-1] so we get the correct
+        # terminal value
+        if step > 0 and step % horizon == 0:
+            if defer_reward:
+                ep_rets = _compute_segment_gail_reward(reward_giver, observations, clipped_actions, dones, rews,
+                                                       cur_ep_ret, gail_reward_batch_size)
+            # Fix to avoid "mean of empty slice" warning when there is no complete episode
+            if len(ep_rets) == 0:
+                ep_rets = list(cur_ep_ret)
+                ep_lens = list(cur_ep_len)
+                ep_true_rets = list(cur_ep_true_ret)
+            total_timesteps = n_envs * horizon
+
+            yield {"ob": _flat(observations), "rew": _flat(rews), "dones": _flat(dones), "true_rew": _flat(true_rews),
+                   "vpred": _flat(vpreds), "ac": _flat(actions), "prevac": _flat(prev_actions),
+                   "nextvpred": vpred * (1 - done), "ep_rets": ep_rets, "ep_lens": ep_lens,
+                   "ep_true_rets": ep_true_rets, "total_timestep": total_timesteps}
+            _, vpred, _, _ = policy.step(observation, last_states, done)
+            # Be careful!!! if you change the downstream algorithm to aggregate
+            # several of these batches, then be sure to do a deepcopy
+            ep_rets = []
+            ep_true_rets = []
+            ep_lens = []
+        i = step % horizon
+        observations[:, i] = observation
+        vpreds[:, i] = vpred
+        actions[:, i] = action
+        prev_actions[:, i] = prevac
+
+        clipped_action = action
+        # Clip the actions to avoid out of bound error
+        if isinstance(env.action_space, gym.spaces.Box):
+            clipped_action = np.clip(action, env.action_space.low, env.action_space.high)
+
+        if defer_reward:
+            # the reward is computed for the whole segment, before yielding it
+            clipped_actions[:, i] = clipped_action
+            observation, true_rew, done, _infos = env.step(clipped_action)
+            rew = 0.
+        elif gail:
+            # a single discriminator pass for all the environments
+            rew = reward_giver.get_reward(observation, clipped_action)[:, 0]
+            observation, true_rew, done, _infos = env.step(clipped_action)
+        else:
+            observation, rew, done, _infos = env.step(clipped_action)
+            true_rew = rew
+        rews[:, i] = rew
+        true_rews[:, i] = true_rew
+        dones[:, i] = done
+
+        if not defer_reward:
+            # when deferred, the episode returns are computed with the rewards of the segment
+            cur_ep_ret += rew
+        cur_ep_true_ret += true_rew
+        cur_ep_len += 1
+        # the environments are reset by the VecEnv
+        for env_idx in np.nonzero(done)[0]:
+            if not defer_reward:
+                ep_rets.append(cur_ep_ret[env_idx])
+                cur_ep_ret[env_idx] = 0
+            ep_true_rets.append(cur_ep_true_ret[env_idx])
+            ep_lens.append(cur_ep_len[env_idx])
+            cur_ep_true_ret[env_idx] = 0
+            cur_ep_len[env_idx] = 0
+        step += 1
+
+
+def _compute_segment_gail_reward(reward_giver, observations, actions, dones, rews, cur_ep_ret, batch_size=None):
+    """
+    Compute the gail rewards of a whole segment with batched discriminator passes, and the returns of the episodes
+    completed during the segment
+
+    The arrays are either the segment of a single environment (horizon, ...), or the segments of several environments
+    (n_envs, horizon, ...), in which case the returns of the current episodes are given as a (n_envs,) array.
+
+    :param reward_giver: (TransitionClassifier) the reward predicter from obsevation and action
+    :param observations: (np.ndarray) the observations of the segment
+    :param actions: (np.ndarray) the clipped actions of the segment
+    :param dones: (np.ndarray) the dones of the segment
+    :param rews: (np.ndarray) the reward array of the segment, filled in place
+    :param cur_ep_ret: (float or np.ndarray) the return of the current episode at the start of the segment
+        (when given as an array, it is updated in place)
+    :param batch_size: (int) the maximum number of transitions per discriminator pass (None for a single pass)
+    :return: (float, [float]) the return of the current episode at the end of the segment, and the returns of the
+        episodes completed during the segment (only the returns of the completed episodes for several environments)
+    """
+    vectorized = rews.ndim == 2
+    n_transitions = rews.size
+    flat_observations = observations.reshape((n_transitions,) + observations.shape[rews.ndim:])
+    flat_actions = actions.reshape((n_transitions,) + actions.shape[rews.ndim:])
+    flat_rews = rews.reshape(n_transitions)
+    if batch_size is None:
+        batch_size = n_transitions
+    for start in range(0, n_transitions, batch_size):
+        end = min(start + batch_size, n_transitions)
+        flat_rews[start:end] = reward_giver.get_reward(flat_observations[start:end], flat_actions[start:end])[:, 0]
+
+    ep_rets = []
+    if not vectorized:
+        for rew, done in zip(rews, dones):
+            cur_ep_ret += rew
+            if done:
+                ep_rets.append(cur_ep_ret)
+                cur_ep_ret = 0
+        return cur_ep_ret, ep_rets
+
+    # same order as the episodes completed while stepping the environments
+    for step in range(rews.shape[1]):
+        cur_ep_ret += rews[:, step]
+        for env_idx in np.nonzero(dones[:, step])[0]:
+            ep_rets.append(cur_ep_ret[env_idx])
+            cur_ep_ret[env_idx] = 0
+    return ep_rets
+
+
 def add_vtarg_and_adv(seg, gamma, lam):
     """
     Compute target value using TD(lambda) estimator, and advantage with GAE(lambda)
 
     :param seg: (dict) the current segment of the trajectory (see traj_segment_generator return for more information)
+        for several environments, nextvpred holds one value per environment
     :param gamma: (float) Discount factor
     :param lam: (float) GAE factor
     """
+    n_envs = np.size(seg["nextvpred"])
     # last element is only used for last vtarg, but we already zeroed it if last new = 1
-    new = np.append(seg["dones"], 0)
-    vpred = np.append(seg["vpred"], seg["nextvpred"])
-    rew_len = len(seg["rew"])
-    seg["adv"] = gaelam = np.empty(rew_len, 'float32')
-    rew = seg["rew"]
+    new = np.append(np.reshape(seg["dones"], (n_envs, -1)), np.zeros((n_envs, 1)), axis=1)
+    vpred = np.append(np.reshape(seg["vpred"], (n_envs, -1)), np.reshape(seg["nextvpred"], (n_envs, 1)), axis=1)
+    rew = np.reshape(seg["rew"], (n_envs, -1))
+    horizon = rew.shape[1]
+    gaelam = np.empty((n_envs, horizon), 'float32')
     lastgaelam = 0
-    for step in reversed(range(rew_len)):
-        nonterminal = 1 - new[step + 1]
-        delta = rew[step] + gamma * vpred[step + 1] * nonterminal - vpred[step]
-        gaelam[step] = lastgaelam = delta + gamma * lam * nonterminal * lastgaelam
+    # the advantages of all the environments are computed at once, backward in time
+    for step in reversed(range(horizon)):
+        nonterminal = 1 - new[:, step + 1]
+        delta = rew[:, step] + gamma * vpred[:, step + 1] * nonterminal - vpred[:, step]
+        gaelam[:, step] = lastgaelam = delta + gamma * lam * nonterminal * lastgaelam
+    seg["adv"] = gaelam.reshape(-1)
     seg["tdlamret"] = seg["adv"] + seg["vpred"]
 
 
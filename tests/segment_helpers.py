@@ -0,0 +1,28 @@
+"""
+Fake policy and reward giver for the tests of the TRPO/PPO1 segment generator
+"""
+import numpy as np
+
+
+class LinearPolicy(object):
+    """
+    Deterministic policy, the actions are scaled so some of them are clipped, the value is the sum of the observation
+    """
+    initial_state = None
+
+    def step(self, obs, state=None, mask=None):
+        return 2 * obs, obs.sum(axis=1), None, None
+
+
+class CountingRewardGiver(object):
+    """
+    Reward giver counting its calls, the reward depends on the observation and the action
+    """
+    def __init__(self):
+        self.n_calls = 0
+
+    def get_reward(self, obs, actions):
+        self.n_calls += 1
+        obs = np.reshape(obs, (-1, 1))
+        actions = np.reshape(actions, (-1, 1))
+        return np.tanh(obs * actions + obs).astype(np.float32)
@@ -0,0 +1,29 @@
+import numpy as np
+
+from stable_baselines.a2c.utils import discount_with_dones, discounted_returns
+
+
+def test_discounted_returns():
+    """
+    test that the vectorized n-step returns match discount_with_dones for every environment
+    """
+    np.random.seed(0)
+    gamma = 0.99
+    n_envs, n_steps = 64, 5
+    rewards = np.random.randn(n_envs, n_steps).astype(np.float32)
+    dones = np.random.rand(n_envs, n_steps) < 0.3
+    last_values = np.random.randn(n_envs).astype(np.float32)
+
+    expected = np.zeros((n_envs, n_steps))
+    for env_idx in range(n_envs):
+        env_rewards, env_dones = rewards[env_idx].tolist(), dones[env_idx].tolist()
+        if env_dones[-1] == 0:
+            expected[env_idx] = discount_with_dones(env_rewards + [last_values[env_idx]], env_dones + [0], gamma)[:-1]
+        else:
+            expected[env_idx] = discount_with_dones(env_rewards, env_dones, gamma)
+
+    assert np.allclose(discounted_returns(rewards, dones, last_values, gamma), expected, atol=1e-5)
+    # in place
+    out = rewards.copy()
+    discounted_returns(out, dones, last_values, gamma, out=out)
+    assert np.allclose(out, expected, atol=1e-5)
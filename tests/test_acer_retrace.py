@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from stable_baselines.a2c.utils import batch_to_seq, seq_to_batch, batch_to_time_major, time_major_to_batch
+from stable_baselines.acer.acer_simple import q_retrace, strip
+
+
+def _q_retrace_numpy(rewards, dones, q_i, values, rho_i, n_envs, n_steps, gamma):
+    """
+    the Q-retrace targets, step by step (the batch is ordered by environment, then by step)
+    """
+    rewards, dones, q_i, rho_bar = [x.reshape(n_envs, n_steps) for x in (rewards, dones, q_i, np.minimum(1, rho_i))]
+    values = values.reshape(n_envs, n_steps + 1)
+    qrets = np.zeros((n_envs, n_steps))
+    qret = values[:, -1]
+    for step in reversed(range(n_steps)):
+        qret = rewards[:, step] + gamma * qret * (1.0 - dones[:, step])
+        qrets[:, step] = qret
+        qret = rho_bar[:, step] * (qret - q_i[:, step]) + values[:, step]
+    return qrets.reshape(-1)
+
+
+@pytest.mark.parametrize("n_steps", [1, 5, 20])
+def test_q_retrace(n_steps):
+    """
+    test the scan-based Q-retrace against a step by step implementation
+    """
+    n_envs, gamma = 4, 0.99
+    rng = np.random.RandomState(0)
+    inputs = dict(rewards=rng.randn(n_envs * n_steps), dones=(rng.rand(n_envs * n_steps) < 0.2).astype(np.float32),
+                  q_i=rng.randn(n_envs * n_steps), values=rng.randn(n_envs * (n_steps + 1)),
+                  rho_i=rng.rand(n_envs * n_steps) * 2)
+    inputs = {key: value.astype(np.float32) for key, value in inputs.items()}
+    with tf.Graph().as_default(), tf.Session() as sess:
+        placeholders = {key: tf.placeholder(tf.float32, value.shape) for key, value in inputs.items()}
+        qret = q_retrace(n_envs=n_envs, n_steps=n_steps, gamma=gamma, **placeholders)
+        assert qret.get_shape().as_list() == [n_envs * n_steps]
+        result = sess.run(qret, {placeholders[key]: value for key, value in inputs.items()})
+    expected = _q_retrace_numpy(n_envs=n_envs, n_steps=n_steps, gamma=gamma, **inputs)
+    assert np.allclose(result, expected, atol=1e-5)
+
+
+def test_q_retrace_ops():
+    """
+    test that the number of operations of the Q-retrace graph does not depend on the number of steps
+    """
+    n_ops = []
+    for n_steps in [5, 50]:
+        with tf.Graph().as_default() as graph:
+            batch = [tf.placeholder(tf.float32, [2 * n_steps]) for _ in range(4)]
+            values = tf.placeholder(tf.float32, [2 * (n_steps + 1)])
+            q_retrace(batch[0], batch[1], batch[2], values, batch[3], 2, n_steps, 0.99)
+            n_ops.append(len(graph.get_operations()))
+    assert n_ops[0] == n_ops[1]
+
+
+@pytest.mark.parametrize("flat", [True, False])
+def test_time_major(flat):
+    """
+    test the time major conversions and strip against batch_to_seq and seq_to_batch
+    """
+    n_envs, n_steps = 3, 5
+    shape = [n_envs * n_steps] if flat else [n_envs * n_steps, 2]
+    data = np.random.randn(*shape).astype(np.float32)
+    with tf.Graph().as_default(), tf.Session() as sess:
+        tensor = tf.constant(data)
+        time_major = batch_to_time_major(tensor, n_envs, n_steps, flat)
+        sequence = batch_to_seq(tensor, n_envs, n_steps, flat)
+        stripped = strip(tensor, n_envs, n_steps - 1, flat)
+        expected_stripped = seq_to_batch(batch_to_seq(tensor, n_envs, n_steps, flat)[:-1], flat)
+        results = sess.run([time_major, tf.stack(sequence), time_major_to_batch(time_major, flat), stripped,
+                            expected_stripped])
+    assert np.array_equal(results[0], results[1])
+    assert np.array_equal(results[2], data)
+    assert np.array_equal(results[3], results[4])
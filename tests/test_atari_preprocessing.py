@@ -0,0 +1,75 @@
+import gym
+import numpy as np
+import pytest
+
+from stable_baselines.common.atari_wrappers import make_atari, wrap_deepmind, AtariPreprocessing, \
+    VecAtariPreprocessing
+from stable_baselines.common.vec_env import DummyVecEnv
+
+ENV_IDS = ['BreakoutNoFrameskip-v4', 'PongNoFrameskip-v4']
+N_STEPS = 500
+
+
+def _make_reference(env_id, seed, wrapper_kwargs):
+    env = make_atari(env_id)
+    env.seed(seed)
+    return wrap_deepmind(env, **wrapper_kwargs)
+
+
+def _make_fused(env_id, seed, wrapper_kwargs, warp_frame=True):
+    env = gym.make(env_id)
+    env.seed(seed)
+    if not warp_frame:
+        wrapper_kwargs = dict(episode_life=wrapper_kwargs.get('episode_life', True), warp_frame=False)
+    return AtariPreprocessing(env, **wrapper_kwargs)
+
+
+WRAPPER_KWARGS = [{}, dict(frame_stack=True), dict(frame_stack=True, scale=True),
+                  dict(episode_life=False, clip_rewards=False)]
+
+
+@pytest.mark.parametrize("env_id", ENV_IDS)
+@pytest.mark.parametrize("wrapper_kwargs", WRAPPER_KWARGS)
+def test_atari_preprocessing(env_id, wrapper_kwargs):
+    """
+    test that the fused preprocessing gives the same observations and rewards as wrap_deepmind
+    """
+    reference_env = _make_reference(env_id, 0, wrapper_kwargs)
+    env = _make_fused(env_id, 0, wrapper_kwargs)
+    assert env.observation_space == reference_env.observation_space
+    rng = np.random.RandomState(0)
+    obs, reference_obs = env.reset(), reference_env.reset()
+    for _ in range(N_STEPS):
+        assert np.array_equal(np.asarray(obs), np.asarray(reference_obs))
+        action = rng.randint(env.action_space.n)
+        obs, reward, done, _ = env.step(action)
+        reference_obs, reference_reward, reference_done, _ = reference_env.step(action)
+        assert reward == reference_reward and done == reference_done
+        if done:
+            obs, reference_obs = env.reset(), reference_env.reset()
+
+
+@pytest.mark.parametrize("env_id", ENV_IDS)
+@pytest.mark.parametrize("wrapper_kwargs", WRAPPER_KWARGS)
+def test_vec_atari_preprocessing(env_id, wrapper_kwargs):
+    """
+    test that the batched preprocessing gives the same observations and rewards as wrap_deepmind
+    """
+    n_envs = 3
+    reference_env = DummyVecEnv([lambda seed=seed: _make_reference(env_id, seed, wrapper_kwargs)
+                                 for seed in range(n_envs)])
+    env = VecAtariPreprocessing(DummyVecEnv([lambda seed=seed: _make_fused(env_id, seed, wrapper_kwargs, False)
+                                             for seed in range(n_envs)]),
+                                clip_rewards=wrapper_kwargs.get('clip_rewards', True),
+                                frame_stack=wrapper_kwargs.get('frame_stack', False),
+                                scale=wrapper_kwargs.get('scale', False))
+    assert env.observation_space.shape == reference_env.observation_space.shape
+    assert env.observation_space.dtype == reference_env.observation_space.dtype
+    rng = np.random.RandomState(0)
+    obs, reference_obs = env.reset(), reference_env.reset()
+    for _ in range(N_STEPS):
+        assert np.array_equal(obs, reference_obs)
+        actions = rng.randint(env.action_space.n, size=n_envs)
+        obs, rewards, dones, _ = env.step(actions)
+        reference_obs, reference_rewards, reference_dones, _ = reference_env.step(actions)
+        assert np.array_equal(rewards, reference_rewards) and np.array_equal(dones, reference_dones)
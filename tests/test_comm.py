@@ -0,0 +1,92 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from stable_baselines.common.comm import SUM, MAX, MIN, SingleProcessComm, SharedMemoryGroup, get_default_comm, \
+    set_default_comm
+
+N_WORKERS = 3
+
+
+def test_single_process_comm():
+    """
+    Test that the collectives of a single process return the local values
+    """
+    comm = SingleProcessComm()
+    assert comm.Get_rank() == 0 and comm.Get_size() == 1
+
+    local = np.arange(6, dtype=np.float32).reshape(2, 3)
+    result = np.zeros_like(local)
+    comm.Allreduce(local, result, op=SUM)
+    assert np.array_equal(result, local)
+    comm.Iallreduce(local * 2, result, op=MAX).Wait()
+    assert np.array_equal(result, local * 2)
+
+    buf = local.copy()
+    comm.Bcast(buf, root=0)
+    assert np.array_equal(buf, local)
+    assert comm.allgather("obj") == ["obj"]
+    assert comm.allreduce(3) == 3
+    assert comm.bcast({"key": 1}) == {"key": 1}
+
+
+def test_default_comm():
+    """
+    Test that the default communicator is a single process one without MPI launcher, and that it can be replaced
+    """
+    comm = get_default_comm()
+    assert comm.Get_size() == 1
+    other_comm = SingleProcessComm()
+    set_default_comm(other_comm)
+    assert get_default_comm() is other_comm
+    set_default_comm(None)
+    assert get_default_comm() is not other_comm
+
+
+def _shared_memory_worker(group, rank, errors):
+    try:
+        comm = group.get_comm(rank)
+        size = comm.Get_size()
+        assert comm.Get_rank() == rank and size == N_WORKERS
+
+        # larger than the shared buffer, so it is exchanged in several steps
+        local = np.arange(25, dtype=np.float32) * (rank + 1)
+        result = np.zeros_like(local)
+        comm.Allreduce(local, result, op=SUM)
+        assert np.allclose(result, np.arange(25) * sum(range(1, size + 1)))
+        comm.Iallreduce(local, result, op=MAX).Wait()
+        assert np.allclose(result, np.arange(25) * size)
+        comm.Allreduce(local, result, op=MIN)
+        assert np.allclose(result, np.arange(25))
+
+        buf = np.full((5, 5), rank, dtype=np.float64)
+        comm.Bcast(buf, root=1)
+        assert np.all(buf == 1)
+
+        assert comm.allgather(("rank", rank)) == [("rank", i) for i in range(size)]
+        assert comm.allreduce(rank) == sum(range(size))
+        assert comm.bcast("root" if rank == 0 else None, root=0) == "root"
+        comm.Barrier()
+    except Exception as error:  # pylint: disable=broad-except
+        errors.put((rank, repr(error)))
+        group.barrier.abort()
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_shared_memory_comm(start_method):
+    """
+    Test the collectives of processes communicating through shared memory
+
+    :param start_method: (str) the multiprocessing start method
+    """
+    ctx = multiprocessing.get_context(start_method)
+    group = SharedMemoryGroup(N_WORKERS, buffer_size=8, object_buffer_size=1024, start_method=start_method)
+    errors = ctx.Queue()
+    processes = [ctx.Process(target=_shared_memory_worker, args=(group, rank, errors)) for rank in range(N_WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+    assert errors.empty(), errors.get()
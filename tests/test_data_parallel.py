@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from stable_baselines import PPO1, TRPO
+from stable_baselines.common.comm import get_default_comm
+from stable_baselines.common.data_parallel import launch_data_parallel
+
+N_WORKERS = 2
+
+
+def _reduce_rank(rank):
+    comm = get_default_comm()
+    total = np.zeros(3)
+    comm.Allreduce(np.full(3, rank, dtype=np.float64), total)
+    return comm.Get_rank(), comm.Get_size(), total
+
+
+def _train(rank, model_class):
+    model = model_class("MlpPolicy", "CartPole-v1")
+    model.learn(total_timesteps=500, seed=rank)
+    return model.get_parameters_flat()
+
+
+def _fail(rank):
+    if rank == 1:
+        raise ValueError("worker failure")
+    # waits for the failing worker
+    get_default_comm().Barrier()
+
+
+def test_launch_data_parallel():
+    """
+    Test that the workers get their shared memory communicator
+    """
+    results = launch_data_parallel(_reduce_rank, N_WORKERS)
+    for rank, (comm_rank, comm_size, total) in enumerate(results):
+        assert comm_rank == rank and comm_size == N_WORKERS
+        assert np.all(total == sum(range(N_WORKERS)))
+
+
+def test_launch_data_parallel_failure():
+    """
+    Test that the failure of a worker is reported, without blocking the other workers
+    """
+    with pytest.raises(RuntimeError, match="worker failure"):
+        launch_data_parallel(_fail, N_WORKERS)
+
+
+@pytest.mark.parametrize("model_class", [PPO1, TRPO])
+def test_data_parallel_training(model_class):
+    """
+    Test that the workers have the same parameters after training, like with MPI
+
+    :param model_class: (BaseRLModel) A RL model
+    """
+    params = launch_data_parallel(_train, N_WORKERS, args=(model_class,))
+    assert np.allclose(params[0], params[1])
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from stable_baselines.common.dataset import Dataset, iterbatches
+from stable_baselines.gail.dataset.mujocodset import Dset
+
+
+def _make_data(n_samples=103):
+    obs = np.arange(n_samples * 3, dtype=np.float32).reshape(n_samples, 3)
+    return obs, obs[:, 0].astype(np.int64)
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_dataset_permutation(prefetch):
+    """
+    test that the dataset does not modify the data, and that an epoch goes through every sample once
+    """
+    obs, ids = _make_data()
+    obs_copy = obs.copy()
+    dataset = Dataset(dict(ob=obs, id=ids), prefetch=prefetch)
+    for _ in range(3):
+        seen = []
+        for batch in dataset.iterate_once(10):
+            assert batch["ob"].shape == (10, 3)
+            assert np.all(batch["ob"][:, 0] == batch["id"])
+            seen.append(batch["id"].copy())
+        seen = np.concatenate(seen)
+        assert len(seen) == 100 and len(np.unique(seen)) == 100
+    assert dataset.data_map["ob"] is obs
+    assert np.array_equal(obs, obs_copy)
+
+    subset = dataset.subset(20)
+    assert np.all(subset.data_map["ob"][:, 0] == subset.data_map["id"])
+
+
+def test_dataset_deterministic():
+    """
+    test that a deterministic dataset returns the samples in order
+    """
+    obs, ids = _make_data()
+    dataset = Dataset(dict(ob=obs, id=ids), deterministic=True)
+    batches = [batch["id"] for batch in dataset.iterate_once(25)]
+    assert np.array_equal(np.concatenate(batches), ids[:100])
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_iterbatches(prefetch, shuffle):
+    """
+    test that iterbatches gives the same batch sizes as before and covers every sample
+    """
+    obs, ids = _make_data()
+    for kwargs, sizes in [(dict(batch_size=25), [25, 25, 25, 25, 3]),
+                          (dict(batch_size=25, include_final_partial_batch=False), [25, 25, 25, 25]),
+                          (dict(num_batches=4), [26, 26, 26, 25])]:
+        batches = [(ob_batch.copy(), id_batch.copy())
+                   for ob_batch, id_batch in iterbatches((obs, ids), shuffle=shuffle, prefetch=prefetch, **kwargs)]
+        assert [len(id_batch) for _, id_batch in batches] == sizes
+        for ob_batch, id_batch in batches:
+            assert np.all(ob_batch[:, 0] == id_batch)
+        seen = np.concatenate([id_batch for _, id_batch in batches])
+        assert len(np.unique(seen)) == sum(sizes)
+        if not shuffle:
+            assert np.array_equal(seen, ids[:sum(sizes)])
+
+
+def test_iterbatches_stop_early():
+    """
+    test that the prefetching thread stops when the consumer stops early
+    """
+    obs, ids = _make_data()
+    for _ in iterbatches((obs, ids), batch_size=1, prefetch=True):
+        break
+    assert len([batch for batch in iterbatches((obs, ids), batch_size=10, prefetch=True)]) == 11
+
+
+def test_expert_dset():
+    """
+    test that the expert dataset shuffles indices only
+    """
+    obs, ids = _make_data()
+    dset = Dset(obs, ids, randomize=True)
+    for _ in range(30):
+        inputs, labels = dset.get_next_batch(16)
+        assert inputs.shape == (16, 3)
+        assert np.all(inputs[:, 0] == labels)
+    assert dset.inputs is obs
+    inputs, labels = dset.get_next_batch(-1)
+    assert len(inputs) == len(labels) == 103
@@ -0,0 +1,98 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from stable_baselines.gail.dataset.expert_dataset import ExpertDataset, ExpertDatasetWriter, ChunkedArray, \
+    convert_npz_to_expert_dataset, load_expert_dataset
+from stable_baselines.gail.dataset.mujocodset import MujocoDset
+
+
+def _make_npz(path, n_episodes=6, ep_len=50, obs_dim=4):
+    """
+    saves fake expert trajectories with the .npz layout, the first observation of a transition is its index
+    """
+    obs = np.random.randn(n_episodes, ep_len, obs_dim).astype(np.float32)
+    obs[:, :, 0] = np.arange(n_episodes * ep_len).reshape(n_episodes, ep_len)
+    acs = obs[:, :, :2] * 2
+    rews = np.ones((n_episodes, ep_len))
+    np.savez(path, obs=obs, acs=acs, rews=rews, ep_rets=rews.sum(axis=1) + np.arange(n_episodes))
+    return obs, acs
+
+
+def test_chunked_array():
+    """
+    test the gathering and slicing of a chunked array
+    """
+    data = np.arange(30).reshape(15, 2)
+    chunked = ChunkedArray([data[:4], data[4:5], data[5:]])
+    assert len(chunked) == 15 and chunked.shape == (15, 2)
+    indices = np.array([14, 0, 4, 7, 3])
+    assert np.array_equal(np.take(chunked, indices, axis=0), data[indices])
+    out = np.zeros((5, 2), dtype=data.dtype)
+    np.take(chunked, indices, axis=0, out=out)
+    assert np.array_equal(out, data[indices])
+    for start, stop in [(0, 15), (2, 4), (3, 9), (5, 15), (6, 6)]:
+        assert np.array_equal(chunked[start:stop], data[start:stop])
+    for index in [0, 3, 4, 5, 14, -1, -11, np.int64(7)]:
+        assert np.array_equal(chunked[index], data[index])
+        assert np.array_equal(np.take(chunked, index, axis=0), data[index])
+    with pytest.raises(IndexError):
+        _ = chunked[15]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 10000])
+def test_convert_npz(tmp_path, chunk_size):
+    """
+    test that the converted dataset has the same transitions and splits as the .npz file
+    """
+    npz_path = str(tmp_path / "expert.npz")
+    save_dir = str(tmp_path / "expert")
+    obs, acs = _make_npz(npz_path)
+    convert_npz_to_expert_dataset(npz_path, save_dir, chunk_size=chunk_size)
+    assert len(os.listdir(os.path.join(save_dir, "obs"))) == {1: 6, 100: 3, 10000: 1}[chunk_size]
+
+    dataset = load_expert_dataset(save_dir, traj_limitation=4)
+    assert isinstance(dataset, ExpertDataset)
+    assert dataset.num_traj == 4 and dataset.num_transition == 200
+    assert np.allclose(dataset.rets, [50, 51, 52, 53])
+    assert dataset.obs.shape == (300, 4)
+
+    reference = MujocoDset(npz_path, traj_limitation=4)
+    assert reference.num_transition == dataset.num_transition
+    assert np.allclose(reference.avg_ret, dataset.avg_ret)
+
+    for split, low, high in [(None, 0, 200), ('train', 0, 140), ('val', 140, 200)]:
+        seen = []
+        for _ in range(10):
+            ob_batch, ac_batch = dataset.get_next_batch(16, split)
+            assert ob_batch.shape == (16, 4) and ac_batch.shape == (16, 2)
+            assert np.allclose(ob_batch[:, :2] * 2, ac_batch)
+            seen.append(ob_batch[:, 0].copy())
+        seen = np.concatenate(seen)
+        assert seen.min() >= low and seen.max() < high
+    ob_val, ac_val = dataset.get_next_batch(-1, 'val')
+    assert np.array_equal(ob_val, obs.reshape(-1, 4)[140:200])
+    assert np.array_equal(ac_val, acs.reshape(-1, 2)[140:200])
+
+
+def test_pickle_expert_dataset(tmp_path):
+    """
+    test that pickling a dataset only stores its path
+    """
+    save_dir = str(tmp_path / "expert")
+    with ExpertDatasetWriter(save_dir, chunk_size=64) as writer:
+        for _ in range(3):
+            writer.add_episode(np.zeros((100, 84, 84, 1), dtype=np.uint8), np.zeros(100, dtype=np.int64),
+                               np.ones(100))
+    dataset = ExpertDataset(save_dir)
+    data = pickle.dumps(dataset)
+    assert len(data) < 10000
+    loaded = pickle.loads(data)
+    assert loaded.num_transition == 300 and loaded.obs.dtype == np.uint8
+    ob_batch, ac_batch = loaded.get_next_batch(32, 'train')
+    assert ob_batch.shape == (32, 84, 84, 1) and ac_batch.shape == (32,)
+
+    with pytest.raises(ValueError):
+        ExpertDatasetWriter(save_dir)
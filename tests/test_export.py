@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pytest
+
+from stable_baselines import A2C, ACKTR, DQN, PPO1, PPO2, TRPO
+from stable_baselines.common.frozen_policy import load_policy
+from stable_baselines.common.identity_env import IdentityEnv
+from stable_baselines.common.vec_env import DummyVecEnv
+
+MODEL_LIST = [
+    A2C,
+    ACKTR,
+    DQN,
+    PPO1,
+    PPO2,
+    TRPO,
+]
+
+
+@pytest.mark.parametrize("model_class", MODEL_LIST)
+def test_export_policy(model_class):
+    """
+    Test that the exported policy-only graph gives the same predictions as the model
+
+    :param model_class: (BaseRLModel) A RL model
+    """
+    try:
+        env = DummyVecEnv([lambda: IdentityEnv(10)])
+        model = model_class(policy="MlpPolicy", env=env)
+        model.learn(total_timesteps=500, seed=0)
+
+        model.export_policy("./test_policy")
+        policy = load_policy("./test_policy")
+
+        observations = np.arange(10)
+        actions, _ = model.predict(observations, deterministic=True)
+        loaded_actions, _ = policy.predict(observations, deterministic=True)
+        assert np.array_equal(actions, loaded_actions)
+        assert np.allclose(model.action_probability(observations), policy.action_probability(observations))
+        assert policy.predict(3, deterministic=True)[0] == actions[3]
+    finally:
+        if os.path.exists("./test_policy.pkl"):
+            os.remove("./test_policy.pkl")
+
+
+def test_export_recurrent_policy():
+    """
+    Test that the exported graph of a recurrent policy keeps the recurrent state
+    """
+    try:
+        env = DummyVecEnv([lambda: IdentityEnv(10) for _ in range(4)])
+        model = PPO2(policy="MlpLstmPolicy", env=env, nminibatches=1)
+
+        model.export_policy("./test_policy")
+        policy = load_policy("./test_policy")
+
+        state, loaded_state = None, None
+        for _ in range(5):
+            observations = np.random.randint(10, size=(4,))
+            actions, state = model.predict(observations, state=state, deterministic=True)
+            loaded_actions, loaded_state = policy.predict(observations, state=loaded_state, deterministic=True)
+            assert np.array_equal(actions, loaded_actions)
+            assert np.allclose(state, loaded_state)
+    finally:
+        if os.path.exists("./test_policy.pkl"):
+            os.remove("./test_policy.pkl")
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from stable_baselines.common import set_global_seeds, tf_util
+from stable_baselines.common.identity_env import IdentityEnvBox
+from stable_baselines.gail.adversary import TransitionClassifier
+from stable_baselines.trpo_mpi.utils import traj_segment_generator
+from tests.segment_helpers import LinearPolicy, CountingRewardGiver
+
+HORIZON = 32
+N_SEGMENTS = 4
+
+
+def _sample_segments(reward_giver=None, **kwargs):
+    set_global_seeds(0)
+    env = IdentityEnvBox(ep_length=10)
+    if reward_giver is None:
+        reward_giver = CountingRewardGiver()
+    seg_gen = traj_segment_generator(LinearPolicy(), env, HORIZON, reward_giver=reward_giver, gail=True, **kwargs)
+    segments = [{key: np.copy(value) for key, value in seg_gen.__next__().items()} for _ in range(N_SEGMENTS)]
+    return segments, getattr(reward_giver, "n_calls", None)
+
+
+@pytest.mark.parametrize("batch_size", [None, 5])
+def test_deferred_gail_reward(batch_size):
+    """
+    Test that the gail rewards computed for the whole segment are the same as the per step rewards
+
+    :param batch_size: (int) the maximum number of transitions per discriminator pass
+    """
+    segments, n_calls = _sample_segments()
+    deferred_segments, deferred_n_calls = _sample_segments(defer_gail_reward=True, gail_reward_batch_size=batch_size)
+
+    n_passes = 1 if batch_size is None else int(np.ceil(HORIZON / batch_size))
+    assert deferred_n_calls == N_SEGMENTS * n_passes < n_calls
+    for seg, deferred_seg in zip(segments, deferred_segments):
+        for key in ["ob", "ac", "rew", "true_rew", "dones", "ep_lens", "ep_true_rets"]:
+            assert np.array_equal(seg[key], deferred_seg[key]), key
+        assert np.allclose(np.ravel(seg["ep_rets"]), np.ravel(deferred_seg["ep_rets"]))
+
+
+def test_deferred_transition_classifier_reward():
+    """
+    Test that the deferred rewards of a real discriminator, with its observation normalization, are the same as the
+    per step rewards
+    """
+    graph = tf.Graph()
+    with graph.as_default():
+        sess = tf_util.single_threaded_session(graph=graph)
+        with sess.as_default():
+            reward_giver = TransitionClassifier(IdentityEnvBox(ep_length=10), hidden_size=16)
+            tf_util.initialize(sess)
+            # the observations are normalized with non trivial statistics
+            reward_giver.obs_rms.update(np.random.RandomState(0).randn(64, 1) * 3 + 1)
+            segments, _ = _sample_segments(reward_giver=reward_giver)
+            deferred_segments, _ = _sample_segments(reward_giver=reward_giver, defer_gail_reward=True,
+                                                    gail_reward_batch_size=5)
+    for seg, deferred_seg in zip(segments, deferred_segments):
+        for key in ["ob", "ac", "true_rew", "dones", "ep_lens"]:
+            assert np.array_equal(seg[key], deferred_seg[key]), key
+        assert not np.allclose(seg["rew"], seg["rew"][0])
+        assert np.allclose(seg["rew"], deferred_seg["rew"], atol=1e-5)
+        assert np.allclose(np.ravel(seg["ep_rets"]), np.ravel(deferred_seg["ep_rets"]), atol=1e-4)
@@ -0,0 +1,116 @@
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from stable_baselines import A2C, DQN, PPO2
+from stable_baselines.common.identity_env import IdentityEnv
+from stable_baselines.common.inference_server import BatchedInferenceServer
+from stable_baselines.common.vec_env import DummyVecEnv
+
+N_CLIENTS = 8
+N_REQUESTS = 50
+
+
+@pytest.mark.parametrize("model_class", [A2C, DQN, PPO2])
+def test_batched_predict(model_class):
+    """
+    Test that concurrent single observations served in micro-batches give the same actions as predict
+
+    :param model_class: (BaseRLModel) A RL model
+    """
+    env = DummyVecEnv([lambda: IdentityEnv(10)])
+    model = model_class(policy="MlpPolicy", env=env)
+    observations = np.arange(10)
+    expected_actions, _ = model.predict(observations, deterministic=True)
+
+    errors = []
+
+    def _client_loop(client):
+        for i in range(N_REQUESTS):
+            obs = observations[i % 10]
+            action = client.predict(obs, deterministic=True)
+            if action != expected_actions[i % 10]:
+                errors.append((obs, action))
+
+    with BatchedInferenceServer(model, max_batch_size=4, max_latency=0.01) as server:
+        threads = [threading.Thread(target=_client_loop, args=(server.connect(),)) for _ in range(N_CLIENTS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(errors) == 0
+        assert 1 <= server.get_mean_batch_size() <= 4
+        percentiles = server.get_latency_percentiles((50, 99))
+        assert 0 <= percentiles[50] <= percentiles[99]
+
+        with pytest.raises(ValueError):
+            server.predict(np.zeros((2,)))
+
+
+def test_recurrent_state_per_client():
+    """
+    Test that the server keeps a separate recurrent state for each client of a LSTM policy
+    """
+    n_envs = 4
+    env = DummyVecEnv([lambda: IdentityEnv(10) for _ in range(n_envs)])
+    model = PPO2(policy="MlpLstmPolicy", env=env, nminibatches=1)
+
+    sequences = [np.random.randint(10, size=(20,)) for _ in range(3)]
+    actions = [[] for _ in sequences]
+
+    def _client_loop(client, sequence, client_actions):
+        for obs in sequence:
+            client_actions.append(client.predict(obs, deterministic=True))
+
+    with BatchedInferenceServer(model, max_latency=0.01) as server:
+        threads = [threading.Thread(target=_client_loop, args=(server.connect(), sequence, client_actions))
+                   for sequence, client_actions in zip(sequences, actions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # replay each sequence alone, in the first slot of the step model
+    for sequence, client_actions in zip(sequences, actions):
+        state = None
+        mask = [True] + [False] * (n_envs - 1)
+        for obs, action in zip(sequence, client_actions):
+            batch_obs = np.zeros((n_envs,), dtype=np.int64)
+            batch_obs[0] = obs
+            expected_action, state = model.predict(batch_obs, state=state, mask=mask, deterministic=True)
+            mask = [False] * n_envs
+            assert expected_action[0] == action
+
+
+def test_submit_racing_stop():
+    """
+    Test that every request accepted by the server is answered, even when it is submitted while the server stops
+    """
+    model = A2C(policy="MlpPolicy", env=DummyVecEnv([lambda: IdentityEnv(10)]))
+    server = BatchedInferenceServer(model, max_batch_size=4, max_latency=0.001).start()
+    futures = []
+    stopped = []
+
+    def _client_loop():
+        while True:
+            try:
+                futures.append(server.submit(np.int64(0)))
+            except RuntimeError:
+                stopped.append(True)
+                return
+
+    threads = [threading.Thread(target=_client_loop) for _ in range(N_CLIENTS)]
+    for thread in threads:
+        thread.start()
+    while len(futures) < 100:
+        time.sleep(0.001)
+    server.stop()
+    for thread in threads:
+        thread.join()
+
+    assert len(stopped) == N_CLIENTS
+    for future in futures:
+        future.result(timeout=5)
@@ -0,0 +1,71 @@
+import numpy as np
+import tensorflow as tf
+
+from stable_baselines.acktr.kfac import KfacOptimizer
+
+
+def _tower(input_tensor, name):
+    """
+    a MLP of two layers, like the policy and the value function of MlpPolicy
+    """
+    with tf.variable_scope(name):
+        hidden = tf.tanh(tf.nn.bias_add(tf.matmul(input_tensor, tf.get_variable("w1", [5, 8])),
+                                        tf.get_variable("b1", [8])))
+        return tf.nn.bias_add(tf.matmul(hidden, tf.get_variable("w2", [8, 3])), tf.get_variable("b2", [3]))
+
+
+def _n_eigen_ops(graph):
+    return len([op for op in graph.get_operations() if op.type.startswith("SelfAdjointEig")])
+
+
+def test_kfac_batch_factors():
+    """
+    test that the batched factor decompositions and preconditioning give the same gradients as the factor by factor
+    operations
+    """
+    rng = np.random.RandomState(0)
+    with tf.Graph().as_default() as graph, tf.Session() as sess:
+        obs_ph = tf.placeholder(tf.float32, [64, 5])
+        target_ph = tf.placeholder(tf.float32, [64, 3])
+        outputs = [_tower(obs_ph, "pi"), _tower(obs_ph, "vf")]
+        params = tf.trainable_variables()
+        loss = sum(tf.reduce_mean(tf.square(output - target_ph)) for output in outputs)
+        loss_sampled = sum(tf.reduce_mean(tf.square(output - tf.stop_gradient(output + tf.random_normal([64, 3]))))
+                           for output in outputs)
+        grads = tf.gradients(loss, params)
+
+        optim = KfacOptimizer(learning_rate=0.01, kfac_update=1, verbose=0)
+        optim.compute_and_apply_stats(loss_sampled, var_list=params)
+        optim.get_stats_eigen()
+        # the same optimizer (and statistics), with and without batch_factors
+        n_eigen_ops = _n_eigen_ops(graph)
+        eigen_op = tf.group(*optim.apply_stats_eigen(optim.compute_stats_eigen()))
+        single_eigen_ops = _n_eigen_ops(graph) - n_eigen_ops
+        single_grads = optim.get_kfac_precond_updates(grads, params)
+
+        optim._batch_factors = True
+        n_eigen_ops = _n_eigen_ops(graph)
+        batched_eigen_op = tf.group(*optim.apply_stats_eigen(optim.compute_stats_eigen()))
+        batched_eigen_ops = _n_eigen_ops(graph) - n_eigen_ops
+        batched_grads = optim.get_kfac_precond_updates(grads, params)
+        assert batched_eigen_ops < single_eigen_ops
+
+        sess.run(tf.global_variables_initializer())
+        feed_dict = {obs_ph: rng.randn(64, 5), target_ph: rng.randn(64, 3)}
+        for _ in range(5):
+            sess.run(optim._update_stats_op, feed_dict)
+
+        eigen_vars = [(eigen['e'], eigen['Q']) for eigen in optim.stats_eigen.values()]
+        sess.run(eigen_op)
+        single_eigen = sess.run(eigen_vars)
+        single_result = sess.run(single_grads, feed_dict)
+        sess.run(batched_eigen_op)
+        batched_eigen = sess.run(eigen_vars)
+        batched_result = sess.run(batched_grads, feed_dict)
+
+    for (values_1, vectors_1), (values_2, vectors_2) in zip(single_eigen, batched_eigen):
+        assert np.allclose(values_1, values_2, atol=1e-5)
+        assert np.allclose(vectors_1.dot(np.diag(values_1)).dot(vectors_1.T),
+                           vectors_2.dot(np.diag(values_2)).dot(vectors_2.T), atol=1e-5)
+    for grad_1, grad_2 in zip(single_result, batched_result):
+        assert np.allclose(grad_1, grad_2, rtol=1e-4, atol=1e-6)
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from stable_baselines import ACKTR, logger
+from stable_baselines.acktr.kfac import KfacOptimizer, KfacEigenWorker
+
+
+def _build_kfac_model():
+    """
+    builds a linear regression trained with K-FAC, and its eigen decompositions on the eigen worker
+
+    :return: (KfacOptimizer, TensorFlow Operation, function) the optimizer, the training operation and the function
+        returning a feed dict
+    """
+    rng = np.random.RandomState(0)
+    obs_ph = tf.placeholder(tf.float32, [32, 6])
+    target_ph = tf.placeholder(tf.float32, [32, 3])
+    weight = tf.get_variable("w", [6, 3])
+    bias = tf.get_variable("b", [3], initializer=tf.zeros_initializer())
+    output = tf.nn.bias_add(tf.matmul(obs_ph, weight), bias)
+    loss = tf.reduce_mean(tf.square(output - target_ph))
+    sampled_target = tf.stop_gradient(output + tf.random_normal(tf.shape(output)))
+    loss_sampled = tf.reduce_mean(tf.square(output - sampled_target))
+    optim = KfacOptimizer(learning_rate=0.01, kfac_update=1, cold_iter=2, eigen_worker=True, verbose=0)
+    train_op, queue_runner = optim.minimize(loss, loss_sampled, var_list=[weight, bias])
+    assert queue_runner is None
+    return optim, train_op, lambda: {obs_ph: rng.randn(32, 6), target_ph: rng.randn(32, 3)}
+
+
+def _snapshot(worker):
+    """
+    runs steps of the eigen worker (without training) until the statistics are snapshotted, and waits for the
+    decompositions
+    """
+    worker.step()
+    while worker.n_steps % worker.interval != 0:
+        worker.step()
+    worker.sync()
+
+
+def test_kfac_eigen_worker():
+    """
+    test that the eigen worker sets the eigen decompositions of the factor statistics
+    """
+    with tf.Graph().as_default(), tf.Session() as sess:
+        optim, train_op, feed_dict = _build_kfac_model()
+        sess.run(tf.global_variables_initializer())
+
+        worker = KfacEigenWorker(optim, sess)
+        stats = worker.get_stats()
+        assert np.isnan(stats["eigen_latency"]) and np.isnan(stats["eigen_staleness"])
+        for _ in range(10):
+            sess.run(train_op, feed_dict())
+            worker.step()
+        worker.sync()
+        assert sess.run(optim.factor_step) == worker.n_updates > 0
+        # without a training step in between, the last snapshot has the current statistics
+        worker.step()
+        worker.sync()
+        stats = worker.get_stats()
+        assert stats["eigen_staleness"] == 0 and stats["eigen_latency"] >= 0
+        for stats_var, eigen in optim.stats_eigen.items():
+            stat, eigen_values, eigen_vectors = sess.run([stats_var, eigen['e'], eigen['Q']])
+            assert np.allclose(eigen_vectors.dot(np.diag(eigen_values)).dot(eigen_vectors.T), stat, atol=1e-4)
+        worker.close()
+
+    with pytest.raises(ValueError):
+        KfacOptimizer(eigen_worker=True, async_eigen_decomp=True)
+
+
+def test_kfac_eigen_worker_error():
+    """
+    test that a failed eigen decomposition is raised by the eigen worker, which keeps running
+    """
+    with tf.Graph().as_default(), tf.Session() as sess:
+        optim, train_op, feed_dict = _build_kfac_model()
+        sess.run(tf.global_variables_initializer())
+
+        worker = KfacEigenWorker(optim, sess)
+        for _ in range(5):
+            sess.run(train_op, feed_dict())
+            worker.step()
+        worker.sync()
+        n_updates = worker.n_updates
+
+        stats_var = optim.eigen_stats_list[0]
+        shape = stats_var.get_shape().as_list()
+        dtype = stats_var.dtype.as_numpy_dtype
+        sess.run(stats_var.assign(np.full(shape, np.nan, dtype=dtype)))
+        with pytest.raises(RuntimeError):
+            _snapshot(worker)
+        assert worker.n_updates == n_updates
+
+        sess.run(stats_var.assign(np.eye(shape[0], dtype=dtype)))
+        _snapshot(worker)
+        assert worker.n_updates == n_updates + 1
+        worker.close()
+
+
+@pytest.mark.parametrize("kfac_eigen_worker", [True, False])
+def test_acktr_eigen_decomposition(kfac_eigen_worker):
+    """
+    test ACKTR with the eigen decompositions on the eigen worker and on the queue runner
+    """
+    model = ACKTR("MlpPolicy", "CartPole-v1", n_steps=8, kfac_eigen_worker=kfac_eigen_worker)
+    model.learn(total_timesteps=1000)
+    assert model.sess.run(model.optim.factor_step) > 0
+
+
+def test_acktr_eigen_stats_logging(tmp_path):
+    """
+    test that the eigen worker statistics can be logged before the first eigen update, in every output format
+    """
+    with logger.ScopedConfigure(str(tmp_path), ["stdout", "csv", "tensorboard"]):
+        model = ACKTR("MlpPolicy", "CartPole-v1", n_steps=8, verbose=1)
+        model.learn(total_timesteps=200, log_interval=5)
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+import types
+
+import pytest
+
+import stable_baselines
+from stable_baselines.common.lazy_import import lazy_module
+
+
+def _imports_tensorflow(statement):
+    """
+    runs an import statement in a new interpreter, and returns whether it imported TensorFlow
+    """
+    code = statement + "; import sys; print('tensorflow' in sys.modules)"
+    output = subprocess.check_output([sys.executable, "-c", code], universal_newlines=True)
+    return output.strip().splitlines()[-1] == "True"
+
+
+@pytest.mark.parametrize("statement", ["import stable_baselines",
+                                       "from stable_baselines.common.vec_env import DummyVecEnv, SubprocVecEnv",
+                                       "from stable_baselines.bench import Monitor",
+                                       "from stable_baselines.common import Dataset, zipsame"])
+def test_no_tensorflow(statement):
+    """
+    test that the light parts of the library do not import TensorFlow
+    """
+    assert not _imports_tensorflow(statement)
+
+
+def test_lazy_algorithms():
+    """
+    test that the algorithms are loaded on first access
+    """
+    assert _imports_tensorflow("from stable_baselines import PPO2")
+    from stable_baselines.ppo2 import PPO2
+    assert stable_baselines.PPO2 is PPO2
+    assert 'A2C' in dir(stable_baselines)
+    with pytest.raises(AttributeError):
+        _ = stable_baselines.NotAnAlgorithm
+
+
+def test_lazy_module(monkeypatch):
+    """
+    test the lazy attributes of a module, on a throwaway module
+    """
+    module = types.ModuleType("_lazy_test_module")
+    module.eager = 1
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+    lazy_module(module.__name__, {'RunningMeanStd': 'stable_baselines.common.running_mean_std'})
+    lazy_module(module.__name__, {'explained_variance': 'stable_baselines.common.math_util'})
+    assert 'RunningMeanStd' not in module.__dict__
+    assert {'eager', 'RunningMeanStd', 'explained_variance'} <= set(dir(module))
+
+    from stable_baselines.common.running_mean_std import RunningMeanStd
+    assert module.RunningMeanStd is RunningMeanStd
+    # cached in the module after the first access
+    assert module.__dict__['RunningMeanStd'] is RunningMeanStd
+    # the attributes that were already lazy stay lazy
+    assert callable(module.explained_variance)
+    assert module.eager == 1
+    with pytest.raises(AttributeError):
+        _ = module.missing
@@ -1,5 +1,10 @@
 import subprocess
 
+import numpy as np
+import tensorflow as tf
+
+from stable_baselines.common import tf_util
+from stable_baselines.common.mpi_adam import MpiAdam
 from .test_common import _assert_eq
 
 
@@ -16,3 +21,41 @@ def test_mpi_adam_ppo1():
                                    'python', '-m',
                                    'stable_baselines.ppo1.experiments.train_cartpole'])
     _assert_eq(return_code, 0)
+
+
+def test_mpi_adam_buckets():
+    """Test that the bucketed MpiAdam updates are the same as the updates of a single bucket and of tf Adam"""
+    initial_values = [np.random.randn(3).astype('float32'), np.random.randn(2, 5).astype('float32'),
+                      np.random.randn(4).astype('float32')]
+    learning_rate = 1e-2
+
+    final_params = []
+    for optimizer in ["tf", None, 4]:
+        with tf.Graph().as_default(), tf.Session() as sess:
+            var_list = [tf.Variable(value) for value in initial_values]
+            loss = tf.reduce_sum(tf.square(var_list[0])) + tf.reduce_sum(tf.sin(var_list[1])) + \
+                tf.reduce_sum(tf.abs(var_list[2]))
+            if optimizer == "tf":
+                do_update = tf_util.function([], loss, updates=[tf.train.AdamOptimizer(learning_rate).minimize(loss)])
+            else:
+                compute_grad = tf_util.function([], tf_util.flatgrad(loss, var_list))
+                adam = MpiAdam(var_list, sess=sess, bucket_size=optimizer)
+                assert len(adam.buckets) == (1 if optimizer is None else 2)
+            sess.run(tf.global_variables_initializer())
+            for _ in range(10):
+                if optimizer == "tf":
+                    do_update(sess=sess)
+                else:
+                    adam.update(compute_grad(sess=sess), learning_rate)
+            final_params.append(tf_util.GetFlat(var_list, sess=sess)())
+
+    assert np.allclose(final_params[0], final_params[1], atol=1e-5)
+    assert np.allclose(final_params[1], final_params[2])
+
+
+def test_mpi_adam_buckets_mpi():
+    """Test that the bucketed MpiAdam updates are the same as the updates of a single bucket, with 2 MPI workers"""
+    return_code = subprocess.call(['mpirun', '--allow-run-as-root', '-np', '2', 'python', '-c',
+                                   'from stable_baselines.common.mpi_adam import _helper_mpi_adam_buckets; '
+                                   '_helper_mpi_adam_buckets()'])
+    _assert_eq(return_code, 0)
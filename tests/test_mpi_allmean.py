@@ -0,0 +1,23 @@
+import subprocess
+
+from stable_baselines import TRPO
+from stable_baselines.common.mpi_allmean import _helper_allmean
+from .test_common import _assert_eq
+
+
+def test_allmean_single_worker():
+    """Test the MpiAllMean reductions without MPI workers"""
+    _helper_allmean()
+
+
+def test_mpi_allmean():
+    """Test the MpiAllMean reductions with MPI"""
+    return_code = subprocess.call(['mpirun', '--allow-run-as-root', '-np', '2',
+                                   'python', '-m', 'stable_baselines.common.mpi_allmean'])
+    _assert_eq(return_code, 0)
+
+
+def test_trpo_overlap_vf_allreduce():
+    """Test TRPO with the value function gradient reductions overlapped with the computations"""
+    model = TRPO("MlpPolicy", "CartPole-v1", timesteps_per_batch=256, overlap_vf_allreduce=True)
+    model.learn(total_timesteps=1000)
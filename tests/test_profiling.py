@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from stable_baselines import A2C, ACER, ACKTR, DQN, PPO1, PPO2, TRPO
+from stable_baselines.common.profiling import ProfilingPolicy
+
+MODEL_LIST = [A2C, ACER, ACKTR, DQN, PPO1, PPO2, TRPO]
+
+
+@pytest.mark.parametrize("model_class", MODEL_LIST)
+def test_profiling_policy(tmp_path, model_class):
+    """
+    Test that the training steps are only traced when the profiling policy asks for it
+
+    :param model_class: (BaseRLModel) A RL model
+    """
+    # DQN only trains after learning_starts steps
+    kwargs = dict(learning_starts=100) if model_class == DQN else {}
+    model = model_class("MlpPolicy", "CartPole-v1", **kwargs)
+    model.learn(total_timesteps=1000, seed=0)
+    assert model.profiling.mode == 'off' and model.profiling.n_traced_steps == 0
+    assert model.profiling.n_steps > 0
+
+    trace_dir = str(tmp_path / "traces")
+    model.set_profiling('sampled', interval=3, chrome_trace=True, trace_dir=trace_dir)
+    model.learn(total_timesteps=1000, seed=0)
+    n_steps, n_traced_steps = model.profiling.n_steps, model.profiling.n_traced_steps
+    assert n_traced_steps == n_steps // 3
+    assert len(os.listdir(trace_dir)) == n_traced_steps
+
+    model.set_profiling('always', tensorboard=False)
+    model.learn(total_timesteps=500, seed=0)
+    assert model.profiling.n_traced_steps == model.profiling.n_steps
+
+
+def test_profiling_policy_modes():
+    """
+    Test the traced steps of the profiling modes
+    """
+    policy = ProfilingPolicy('sampled', interval=4)
+    traced = [len(policy.start_step()) > 0 for _ in range(12)]
+    assert traced == [False, False, False, True] * 3
+    assert all(len(ProfilingPolicy('always').start_step()) > 0 for _ in range(3))
+    assert ProfilingPolicy().start_step() == {}
+    with pytest.raises(ValueError):
+        ProfilingPolicy('full')
+    with pytest.raises(ValueError):
+        ProfilingPolicy('sampled', interval=0)
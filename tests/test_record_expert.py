@@ -0,0 +1,33 @@
+import gym
+import numpy as np
+import pytest
+
+from stable_baselines import PPO2, A2C
+from stable_baselines.common.vec_env import DummyVecEnv, SubprocVecEnv
+from stable_baselines.gail.dataset.expert_dataset import ExpertDataset
+from stable_baselines.gail.dataset.record_expert import record_expert_trajectories
+
+
+@pytest.mark.parametrize("vec_env_class", [DummyVecEnv, SubprocVecEnv])
+@pytest.mark.parametrize("model_class", [PPO2, A2C])
+def test_record_expert(tmp_path, vec_env_class, model_class):
+    """
+    Test that the recorded episodes can be loaded as an expert dataset
+    """
+    env = vec_env_class([lambda: gym.make("CartPole-v1") for _ in range(4)])
+    model = model_class("MlpPolicy", env)
+    save_dir = str(tmp_path / "expert")
+    stats = record_expert_trajectories(model, save_dir, n_episodes=10, chunk_size=100, log_interval=None)
+    env.close()
+    assert stats["n_episodes"] == 10 and stats["episodes_per_sec"] > 0
+
+    dataset = ExpertDataset(save_dir)
+    assert dataset.num_traj == 10 and dataset.num_transition == stats["n_transitions"]
+    assert np.allclose(dataset.avg_ret, stats["mean_return"])
+    # CartPole gives a reward of 1 per step
+    assert np.sum(dataset.rets) == dataset.num_transition
+    ob_batch, ac_batch = dataset.get_next_batch(8, 'train')
+    assert ob_batch.shape == (8, 4) and ac_batch.shape == (8,)
+
+    with pytest.raises(ValueError):
+        record_expert_trajectories(model, str(tmp_path / "other"), n_episodes=1, env=gym.make("CartPole-v1"))
@@ -1,5 +1,7 @@
 import os
+import multiprocessing
 
+import numpy as np
 import pytest
 
 from stable_baselines import A2C, ACER, ACKTR, DQN, PPO1, PPO2, TRPO
@@ -99,3 +101,58 @@ def test_model_manipulation(model_class):
     finally:
         if os.path.exists("./test_model"):
             os.remove("./test_model")
+
+
+@pytest.mark.parametrize("model_class", MODEL_LIST)
+def test_load_parameters(model_class):
+    """
+    Test that the parameters can be set repeatedly without growing the graph
+
+    :param model_class: (BaseRLModel) A RL model
+    """
+    env = DummyVecEnv([lambda: IdentityEnv(10)])
+    model = model_class(policy="MlpPolicy", env=env)
+    params = model.sess.run(model.params)
+    new_params = [param + 1 for param in params]
+
+    model.load_parameters(new_params)
+    n_ops = len(model.graph.get_operations())
+    for _ in range(5):
+        model.load_parameters(params)
+        model.load_parameters({param.name: value for param, value in zip(model.params, new_params)})
+    assert len(model.graph.get_operations()) == n_ops
+
+    for param, value in zip(model.sess.run(model.params), new_params):
+        assert (param == value).all()
+
+    with pytest.raises(ValueError):
+        model.load_parameters(params[:-1])
+
+
+@pytest.mark.parametrize("model_class", MODEL_LIST)
+def test_parameters_flat(model_class):
+    """
+    Test that the parameters can be copied between models through a flat shared buffer
+
+    :param model_class: (BaseRLModel) A RL model
+    """
+    env = DummyVecEnv([lambda: IdentityEnv(10)])
+    model = model_class(policy="MlpPolicy", env=env)
+    other_model = model_class(policy="MlpPolicy", env=env)
+
+    flat_params = model.get_parameters_flat()
+    assert flat_params.dtype == np.float32
+    assert flat_params.size == sum(param.size for param in model.sess.run(model.params))
+
+    shared_buffer = multiprocessing.RawArray('f', flat_params.size)
+    model.get_parameters_flat(out=shared_buffer)
+    other_model.set_parameters_flat(shared_buffer)
+    assert np.array_equal(other_model.get_parameters_flat(), flat_params)
+
+    n_ops = len(other_model.graph.get_operations())
+    other_model.set_parameters_flat(flat_params + 1)
+    assert len(other_model.graph.get_operations()) == n_ops
+    assert np.allclose(other_model.get_parameters_flat(), flat_params + 1)
+
+    with pytest.raises(ValueError):
+        other_model.set_parameters_flat(flat_params[:-1])
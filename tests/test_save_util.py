@@ -0,0 +1,70 @@
+import os
+
+import cloudpickle
+import numpy as np
+import pytest
+
+from stable_baselines.common.save_util import save_checkpoint, load_checkpoint, is_checkpoint, CHECKPOINT_ALIGNMENT
+
+SAVE_PATH = "./test_checkpoint.pkl"
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_checkpoint_roundtrip(mmap):
+    """
+    Test that the data and the parameters are restored by the checkpoint format
+
+    :param mmap: (bool) memory map the parameters
+    """
+    data = {"gamma": 0.99, "policy": "MlpPolicy", "n_envs": 4}
+    params = [np.random.randn(3, 5).astype(np.float32), np.arange(7, dtype=np.int64),
+              np.array(2.5, dtype=np.float64), np.zeros((0, 4), dtype=np.float32),
+              np.random.randn(2, 3, 4).astype(np.float32)[:, 1]]
+    try:
+        save_checkpoint(SAVE_PATH, data=data, params=params)
+        assert is_checkpoint(SAVE_PATH)
+
+        loaded_data, loaded_params = load_checkpoint(SAVE_PATH, mmap=mmap)
+        assert loaded_data == data
+        assert len(loaded_params) == len(params)
+        for param, loaded_param in zip(params, loaded_params):
+            assert loaded_param.dtype == param.dtype
+            assert loaded_param.shape == param.shape
+            assert np.array_equal(param, loaded_param)
+            if mmap and param.size > 0:
+                assert isinstance(loaded_param, np.memmap)
+        del loaded_params
+    finally:
+        if os.path.exists(SAVE_PATH):
+            os.remove(SAVE_PATH)
+
+
+def test_checkpoint_alignment():
+    """
+    Test that every parameter array starts on an aligned offset of the file
+    """
+    params = [np.ones((3,), dtype=np.float32), np.ones((5,), dtype=np.float64)]
+    try:
+        save_checkpoint(SAVE_PATH, data={}, params=params)
+        _, loaded_params = load_checkpoint(SAVE_PATH)
+        for loaded_param in loaded_params:
+            assert loaded_param.offset % CHECKPOINT_ALIGNMENT == 0
+        del loaded_params
+    finally:
+        if os.path.exists(SAVE_PATH):
+            os.remove(SAVE_PATH)
+
+
+def test_legacy_pickle_detection():
+    """
+    Test that files in the legacy cloudpickle format are not detected as checkpoints
+    """
+    try:
+        with open(SAVE_PATH, "wb") as file:
+            cloudpickle.dump(({}, [np.ones(3)]), file)
+        assert not is_checkpoint(SAVE_PATH)
+        with pytest.raises(ValueError):
+            load_checkpoint(SAVE_PATH)
+    finally:
+        if os.path.exists(SAVE_PATH):
+            os.remove(SAVE_PATH)
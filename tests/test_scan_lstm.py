@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+from gym import spaces
+
+from stable_baselines.a2c.utils import lstm, scan_lstm, batch_to_seq, seq_to_batch, batch_to_time_major, \
+    time_major_to_batch
+from stable_baselines.common.policies import MlpLstmPolicy, MlpLnLstmPolicy
+
+
+@pytest.mark.parametrize("layer_norm", [False, True])
+def test_scan_lstm(layer_norm):
+    """
+    test that the scan LSTM gives the same outputs and final state as the unrolled LSTM, with the same variables
+    """
+    n_env, n_steps, n_input, n_hidden = 3, 7, 5, 8
+    rng = np.random.RandomState(0)
+    inputs = rng.randn(n_env * n_steps, n_input).astype(np.float32)
+    masks = (rng.rand(n_env * n_steps) < 0.3).astype(np.float32)
+    states = rng.randn(n_env, 2 * n_hidden).astype(np.float32)
+    with tf.Graph().as_default(), tf.Session() as sess:
+        input_ph = tf.placeholder(tf.float32, inputs.shape)
+        mask_ph = tf.placeholder(tf.float32, masks.shape)
+        state_ph = tf.placeholder(tf.float32, states.shape)
+        with tf.variable_scope("model"):
+            unrolled_output, unrolled_state = lstm(batch_to_seq(input_ph, n_env, n_steps),
+                                                   batch_to_seq(mask_ph, n_env, n_steps), state_ph, 'lstm1',
+                                                   n_hidden=n_hidden, layer_norm=layer_norm)
+            n_variables = len(tf.global_variables())
+        with tf.variable_scope("model", reuse=True):
+            scan_output, scan_state = scan_lstm(batch_to_time_major(input_ph, n_env, n_steps),
+                                                batch_to_time_major(mask_ph, n_env, n_steps), state_ph, 'lstm1',
+                                                n_hidden=n_hidden, layer_norm=layer_norm)
+        assert len(tf.global_variables()) == n_variables
+        sess.run(tf.global_variables_initializer())
+        results = sess.run([seq_to_batch(unrolled_output), unrolled_state, time_major_to_batch(scan_output),
+                            scan_state], {input_ph: inputs, mask_ph: masks, state_ph: states})
+    assert np.allclose(results[0], results[2], atol=1e-5)
+    assert np.allclose(results[1], results[3], atol=1e-5)
+
+
+@pytest.mark.parametrize("policy_class", [MlpLstmPolicy, MlpLnLstmPolicy])
+def test_lstm_policy_checkpoint(policy_class):
+    """
+    test that the scan and unrolled LSTM policies have the same variables, and that the size of the scan graph does
+    not depend on the number of steps
+    """
+    ob_space = spaces.Box(low=-1, high=1, shape=(4,), dtype=np.float32)
+    ac_space = spaces.Discrete(2)
+    variable_names = []
+    n_ops = []
+    for lstm_unroll, n_steps in [(True, 5), (False, 5), (False, 50)]:
+        with tf.Graph().as_default() as graph, tf.Session() as sess:
+            policy_class(sess, ob_space, ac_space, 2, n_steps, 2 * n_steps, n_lstm=16, lstm_unroll=lstm_unroll)
+            variable_names.append(sorted((var.name, tuple(var.get_shape().as_list()))
+                                         for var in tf.global_variables()))
+            n_ops.append(len(graph.get_operations()))
+    assert variable_names[0] == variable_names[1] == variable_names[2]
+    assert n_ops[1] == n_ops[2]
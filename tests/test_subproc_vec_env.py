@@ -0,0 +1,145 @@
+import os
+import time
+import multiprocessing
+
+import gym
+import numpy as np
+import pytest
+
+from stable_baselines.common.vec_env import SubprocVecEnv
+
+N_ENVS = 4
+
+
+def _make_env(rank):
+    def _thunk():
+        env = gym.make("CartPole-v1")
+        env.seed(rank)
+        return env
+    return _thunk
+
+
+@pytest.mark.parametrize("start_method", multiprocessing.get_all_start_methods())
+def test_start_methods(start_method):
+    """
+    test that the workers run with every start method
+    """
+    env = SubprocVecEnv([_make_env(rank) for rank in range(N_ENVS)], start_method=start_method)
+    assert env.start_method == start_method
+    obs = env.reset()
+    assert obs.shape == (N_ENVS, 4)
+    obs, rewards, dones, infos = env.step([env.action_space.sample() for _ in range(N_ENVS)])
+    assert obs.shape == (N_ENVS, 4) and rewards.shape == (N_ENVS,) and dones.shape == (N_ENVS,)
+    assert len(infos) == N_ENVS
+    env.close()
+
+
+def test_unknown_start_method():
+    """
+    test that an unknown start method is rejected
+    """
+    with pytest.raises(ValueError):
+        SubprocVecEnv([_make_env(0)], start_method='thread')
+
+
+def test_restart_worker():
+    """
+    test that a crashed worker can be restarted without affecting the other workers
+    """
+    env = SubprocVecEnv([_make_env(rank) for rank in range(N_ENVS)])
+    env.reset()
+    other_pids = [process.pid for process in env.processes[:2]] + [env.processes[3].pid]
+    env.processes[2].terminate()
+    env.processes[2].join()
+    assert env.get_dead_workers() == [2]
+
+    obs = env.restart_worker(2)
+    assert obs.shape == (4,)
+    assert env.get_dead_workers() == []
+    assert np.array_equal(env.restart_counts, [0, 0, 1, 0])
+    assert [process.pid for process in env.processes[:2]] + [env.processes[3].pid] == other_pids
+    obs, _, _, _ = env.step([env.action_space.sample() for _ in range(N_ENVS)])
+    assert obs.shape == (N_ENVS, 4)
+    env.close()
+
+
+class _FaultyEnv(gym.Wrapper):
+    """
+    CartPole, whose step 'fault_step' crashes the worker process or hangs
+    """
+
+    def __init__(self, fault, fault_step=3):
+        super(_FaultyEnv, self).__init__(gym.make("CartPole-v1"))
+        self.fault = fault
+        self.fault_step = fault_step
+        self.n_steps = 0
+
+    def reset(self, **kwargs):
+        return self.env.reset(**kwargs)
+
+    def step(self, action):
+        self.n_steps += 1
+        if self.n_steps == self.fault_step:
+            if self.fault == 'crash':
+                os._exit(1)
+            time.sleep(60)
+        return self.env.step(action)
+
+
+def _make_faulty_env(fault):
+    def _thunk():
+        return _FaultyEnv(fault)
+    return _thunk
+
+
+@pytest.mark.parametrize("fault", ['crash', 'timeout'])
+def test_auto_restart(fault):
+    """
+    test that a worker that crashes or hangs is restarted, and ends the episode of its environment
+    """
+    env_fns = [_make_env(rank) for rank in range(N_ENVS - 1)] + [_make_faulty_env(fault)]
+    env = SubprocVecEnv(env_fns, auto_restart=True, step_timeout=2)
+    env.reset()
+    for _ in range(2):
+        _, _, _, infos = env.step([0] * N_ENVS)
+        assert not any('worker_restarted' in info for info in infos)
+    obs, rewards, dones, infos = env.step([0] * N_ENVS)
+    assert obs.shape == (N_ENVS, 4)
+    assert dones[-1] and rewards[-1] == 0
+    assert infos[-1] == {'worker_restarted': True, 'worker_failure': fault}
+    assert not any('worker_restarted' in info for info in infos[:-1])
+    stats = env.get_restart_stats()
+    assert stats['env_restarts'] == 1 and stats['envs_restarted'] == 1
+    assert stats['env_crashes' if fault == 'crash' else 'env_timeouts'] == 1
+    # the new worker runs
+    _, _, _, infos = env.step([0] * N_ENVS)
+    assert 'worker_restarted' not in infos[-1]
+    env.close()
+
+
+def test_worker_failure_error():
+    """
+    test that a crashed worker raises an error without auto_restart
+    """
+    env = SubprocVecEnv([_make_env(0), _make_faulty_env('crash')])
+    env.reset()
+    env.step([0, 0])
+    env.step([0, 0])
+    with pytest.raises(RuntimeError):
+        env.step([0, 0])
+    env.close()
+
+
+def test_close_hung_worker():
+    """
+    test that close does not wait forever for a hung worker, without step_timeout
+    """
+    env = SubprocVecEnv([_make_env(0), _make_faulty_env('timeout')])
+    env.reset()
+    env.step([0, 0])
+    env.step([0, 0])
+    env.step_async([0, 0])
+    start_time = time.time()
+    env.close()
+    assert time.time() - start_time < 30
+    assert env.get_dead_workers() == [0, 1]
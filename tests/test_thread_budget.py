@@ -0,0 +1,68 @@
+import os
+import sys
+import multiprocessing
+
+import pytest
+
+from stable_baselines.common.thread_budget import BLAS_ENV_VARIABLES, ThreadBudget, available_cpus, \
+    configure_env_worker, configure_thread_budget, get_thread_budget, set_thread_budget
+
+
+def test_thread_budget_layout():
+    """
+    Test the sharing of the cores between TensorFlow and the env workers
+    """
+    budget = ThreadBudget(n_cpus=32, n_env_workers=8)
+    assert budget.env_cpus == 8 and budget.tf_threads == 24 and budget.blas_threads == 24
+    assert len(budget.main_cpus) == 24 and len(budget.worker_cpus) == 8
+
+    # at most half of the cores for the env workers
+    budget = ThreadBudget(n_cpus=8, n_env_workers=64, pin_env_workers=True)
+    assert budget.env_cpus == 4 and budget.tf_threads == 4
+    configs = [budget.env_worker_config(rank) for rank in range(64)]
+    assert all(config['blas_threads'] == 1 for config in configs)
+    assert {config['cpus'][0] for config in configs} == set(budget.worker_cpus)
+
+    budget = ThreadBudget(n_cpus=4, tf_threads=2, blas_threads=1)
+    assert budget.env_cpus == 0 and budget.tf_threads == 2 and budget.blas_threads == 1
+    assert budget.env_worker_config(0)['cpus'] is None
+
+    with pytest.raises(ValueError):
+        ThreadBudget(n_cpus=4, env_cpus=4)
+    with pytest.raises(ValueError):
+        ThreadBudget(n_cpus=0)
+
+
+def _worker_affinity(config, queue):
+    configure_env_worker(config)
+    queue.put((sorted(os.sched_getaffinity(0)), os.environ["OMP_NUM_THREADS"]))
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="no CPU affinity on this platform")
+def test_env_worker_pinning():
+    """
+    Test that an env worker is pinned to its core, with a single BLAS thread
+    """
+    cpu = available_cpus()[-1]
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_worker_affinity, args=(dict(cpus=[cpu], blas_threads=1), queue))
+    process.start()
+    assert queue.get(timeout=10) == ([cpu], "1")
+    process.join()
+
+
+def test_set_thread_budget(monkeypatch):
+    """
+    Test the thread budget of the process
+    """
+    # restored after the test, and the thread pools of the test process are not resized by threadpoolctl
+    for variable in BLAS_ENV_VARIABLES:
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.setitem(sys.modules, "threadpoolctl", None)
+    try:
+        budget = configure_thread_budget(n_cpus=2, n_env_workers=1)
+        assert get_thread_budget() is budget
+        assert all(os.environ[variable] == "1" for variable in BLAS_ENV_VARIABLES)
+    finally:
+        set_thread_budget(None)
+    assert get_thread_budget() is None
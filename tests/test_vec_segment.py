@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from stable_baselines import PPO1, TRPO
+from stable_baselines.common import set_global_seeds
+from stable_baselines.common.identity_env import IdentityEnvBox
+from stable_baselines.common.vec_env import DummyVecEnv
+from stable_baselines.trpo_mpi.utils import traj_segment_generator, add_vtarg_and_adv
+from tests.segment_helpers import LinearPolicy, CountingRewardGiver
+
+N_ENVS = 4
+HORIZON = 32
+
+
+def _make_vec_env():
+    return DummyVecEnv([lambda: IdentityEnvBox(ep_length=10) for _ in range(N_ENVS)])
+
+
+def test_vec_segment_advantage():
+    """
+    Test the shapes of a vectorized segment, and that the advantages are computed per environment
+    """
+    set_global_seeds(0)
+    seg_gen = traj_segment_generator(LinearPolicy(), _make_vec_env(), HORIZON)
+    seg = seg_gen.__next__()
+    add_vtarg_and_adv(seg, 0.99, 0.95)
+
+    assert seg["ob"].shape == (N_ENVS * HORIZON, 1)
+    assert seg["rew"].shape == seg["adv"].shape == (N_ENVS * HORIZON,)
+    assert seg["nextvpred"].shape == (N_ENVS,)
+    assert seg["total_timestep"] == N_ENVS * HORIZON
+    assert len(seg["ep_lens"]) == len(seg["ep_rets"]) == N_ENVS * (HORIZON // 10)
+
+    for env_idx in range(N_ENVS):
+        env_slice = slice(env_idx * HORIZON, (env_idx + 1) * HORIZON)
+        env_seg = {key: seg[key][env_slice] for key in ["rew", "vpred", "dones"]}
+        env_seg["nextvpred"] = seg["nextvpred"][env_idx]
+        add_vtarg_and_adv(env_seg, 0.99, 0.95)
+        assert np.allclose(env_seg["adv"], seg["adv"][env_slice])
+
+
+def test_vec_segment_gail_reward():
+    """
+    Test that the deferred gail rewards of a vectorized segment are the same as the per step rewards
+    """
+    segments = []
+    for defer_gail_reward in [False, True]:
+        set_global_seeds(0)
+        reward_giver = CountingRewardGiver()
+        seg_gen = traj_segment_generator(LinearPolicy(), _make_vec_env(), HORIZON, reward_giver=reward_giver,
+                                         gail=True, defer_gail_reward=defer_gail_reward)
+        segments.append({key: np.copy(value) for key, value in seg_gen.__next__().items()})
+        # one discriminator pass for all the environments
+        assert reward_giver.n_calls == (1 if defer_gail_reward else HORIZON)
+
+    for key in ["ob", "ac", "rew", "true_rew", "dones", "ep_lens"]:
+        assert np.array_equal(segments[0][key], segments[1][key]), key
+    assert np.allclose(segments[0]["ep_rets"], segments[1]["ep_rets"])
+
+
+@pytest.mark.parametrize("model_class", [PPO1, TRPO])
+def test_vec_env_learn(model_class):
+    """
+    Test that PPO1 and TRPO learn from a VecEnv of several environments
+
+    :param model_class: (BaseRLModel) A RL model
+    """
+    model = model_class(policy="MlpPolicy", env=_make_vec_env())
+    assert model.n_envs == N_ENVS
+    model.learn(total_timesteps=2000)
+    actions, _ = model.predict(np.zeros((N_ENVS, 1)))
+    assert actions.shape == (N_ENVS, 1)
+
+
+@pytest.mark.parametrize("model_class, batch_kwarg", [(PPO1, "timesteps_per_actorbatch"),
+                                                      (TRPO, "timesteps_per_batch")])
+def test_vec_env_batch_size(model_class, batch_kwarg):
+    """
+    Test that a batch size that can not be split evenly between the environments is rejected
+
+    :param model_class: (BaseRLModel) A RL model
+    :param batch_kwarg: (str) the name of the batch size parameter of the model
+    """
+    with pytest.raises(ValueError):
+        model_class(policy="MlpPolicy", env=_make_vec_env(), **{batch_kwarg: N_ENVS * HORIZON + 1})